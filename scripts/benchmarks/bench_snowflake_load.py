@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Rows/sec of loading CDRs into Snowflake: per-record MERGE vs staged bulk load
+- per-record MERGE (snowflake_loader.merge_rows, the original path): one
+  statement round trip per CDR
+- bulk load (snowflake_loader.BulkLoader): gzip CSV per chunk, PUT, COPY
+  INTO a temporary table and one set-based MERGE on uniqueid
+Runs offline against fake_snowflake, which charges --statement-ms per
+statement and PUTs at --upload-mbps, so the numbers are round trips and
+bytes, not warehouse speed. Also checks that both paths load the same
+uniqueids and that replaying a chunk inserts nothing.
+
+Usage: python3 benchmarks/bench_snowflake_load.py [--rows 100000] [--chunk-size 20000] [--row-rows 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_snowflake  # noqa: E402
+from snowflake_loader import BulkLoader, merge_rows  # noqa: E402
+
+DISPOSITIONS = ('ANSWERED', 'NO ANSWER', 'BUSY', 'FAILED')
+
+
+def synthetic_cdrs(count, seed=1):
+    """count CDR records shaped like MariaDB's (datetime, ints, strings, some NULLs)"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    records = []
+    for i in range(count):
+        src = f"1{rng.randrange(200, 299)}"
+        dst = f"+1555{rng.randrange(1000000, 9999999)}"
+        duration = rng.randrange(0, 1800)
+        uniqueid = f"{1704067200 + i}.{i}"
+        records.append({
+            'calldate': start + timedelta(seconds=i * 3),
+            'clid': f'"Ext {src}" <{src}>',
+            'src': src,
+            'dst': dst,
+            'dcontext': 'from-internal',
+            'channel': f"PJSIP/{src}-{i:08x}",
+            'dstchannel': f"PJSIP/trunk-{i:08x}",
+            'lastapp': 'Dial',
+            'lastdata': f"PJSIP/{dst}@trunk,300,Tt",
+            'duration': duration,
+            'billsec': max(0, duration - rng.randrange(0, 30)),
+            'disposition': rng.choice(DISPOSITIONS),
+            'amaflags': 3,
+            'accountcode': '',
+            'uniqueid': uniqueid,
+            'userfield': '',
+            'peeraccount': '',
+            'linkedid': uniqueid,
+            'sequence': i,
+            'cnum': src,
+            'cnam': f"Ext {src}",
+            'outbound_cnum': None,
+            'outbound_cnam': None,
+            'dst_cnam': None if i % 3 else Decimal('0.00'),
+        })
+    return records
+
+
+def connect(args, database=None):
+    """Fake connection with the benchmark's latencies"""
+    return fake_snowflake.connect(database=database, statement_ms=args.statement_ms, upload_mbps=args.upload_mbps)
+
+
+def row_rate(args, records):
+    """(rows/s, uniqueids loaded) of merge_rows"""
+    database = fake_snowflake.FakeDatabase()
+    conn = connect(args, database)
+    started = time.perf_counter()
+    merge_rows(conn, records)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return len(records) / elapsed, set(database.tables['cdr'])
+
+
+def bulk_rate(args, records):
+    """(rows/s, uniqueids loaded, loader stats, rows inserted by replaying the last chunk) of BulkLoader"""
+    database = fake_snowflake.FakeDatabase()
+    conn = connect(args, database)
+    loader = BulkLoader(conn)
+    chunks = [records[i:i + args.chunk_size] for i in range(0, len(records), args.chunk_size)]
+    started = time.perf_counter()
+    for chunk in chunks:
+        loader.load(chunk)
+    elapsed = time.perf_counter() - started
+    stats = loader.get_stats()
+    loader.load(chunks[-1])
+    replayed = loader.inserted - stats['inserted']
+    conn.close()
+    return len(records) / elapsed, set(database.tables['cdr']), stats, replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='CDRs for the bulk load')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='CDRs per bulk load (SYNC_CHUNK_SIZE)')
+    parser.add_argument('--row-rows', type=int, default=200, help='CDRs for the per-record MERGE (it is slow)')
+    parser.add_argument('--statement-ms', type=float, default=fake_snowflake.STATEMENT_MS)
+    parser.add_argument('--upload-mbps', type=float, default=fake_snowflake.UPLOAD_MBPS)
+    args = parser.parse_args()
+
+    records = synthetic_cdrs(max(args.rows, args.row_rows))
+    row_rps, row_ids = row_rate(args, records[:args.row_rows])
+    bulk_rps, bulk_ids, stats, replayed = bulk_rate(args, records[:args.rows])
+
+    expected = {record['uniqueid'] for record in records[:args.row_rows]}
+    same = row_ids == expected and expected <= bulk_ids and len(bulk_ids) == args.rows
+    print(f"Loaded uniqueids: {'match' if same else 'DIFFER'}, "
+          f"replayed chunk inserted {replayed} ({'ok' if replayed == 0 else 'DUPLICATES'})")
+
+    print(f"\n{'path':<28} {'rows':>8} {'statements':>11} {'rows/s':>10} {'speedup':>8}")
+    print(f"{'per-record MERGE':<28} {args.row_rows:>8} {args.row_rows:>11} {row_rps:>10,.0f} {1.0:>7.1f}x")
+    statements = stats['chunks'] * 4 + 2
+    print(f"{'bulk (PUT + COPY + MERGE)':<28} {args.rows:>8} {statements:>11} {bulk_rps:>10,.0f} "
+          f"{bulk_rps / row_rps:>7.1f}x")
+    print(f"\nBulk: {stats['chunks']} chunks, {stats['bytes_uploaded'] / 1e6:.1f} MB staged "
+          f"({stats['bytes_uploaded'] / max(1, stats['rows']):.0f} bytes/row)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Local stand-in for the parts of snowflake.connector used by the CDR sync
+- connect() returns a connection whose cursors run the statements
+  snowflake_loader.py issues: the per-record MERGE, CREATE TEMPORARY TABLE /
+  STAGE, TRUNCATE, PUT, COPY INTO and the set-based MERGE (plus
+  SELECT COUNT(*)), against in-memory tables keyed by uniqueid
+- Every statement costs statement_ms (compile, queue and round trip to the
+  warehouse) and PUT also its size at upload_mbps, so offline benchmarks
+  measure round trips and bytes moved, not SQL engine speed
+- Needs no account, network or connector (benchmarks/bench_snowflake_load.py)
+"""
+
+import csv
+import gzip
+import io
+import re
+import time
+
+from snowflake_loader import CDR_COLUMNS, NULL_MARKER
+
+STATEMENT_MS = 150  # Simulated latency per statement
+UPLOAD_MBPS = 20.0  # Simulated PUT bandwidth (megabytes per second)
+
+_ROW_MERGE = re.compile(r'^\s*MERGE INTO (\w+) AS target\s+USING \(\s*SELECT %s', re.I)
+_SET_MERGE = re.compile(r'^\s*MERGE INTO (\w+) AS target\s+USING \(\s*SELECT \* FROM (\w+)', re.I)
+_CREATE_TABLE = re.compile(r'^\s*CREATE TEMPORARY TABLE IF NOT EXISTS (\w+)', re.I)
+_CREATE_STAGE = re.compile(r'^\s*CREATE TEMPORARY STAGE IF NOT EXISTS (\w+)', re.I)
+_TRUNCATE = re.compile(r'^\s*TRUNCATE TABLE (\w+)', re.I)
+_PUT = re.compile(r"^\s*PUT 'file://([^']+)' @(\w+)", re.I)
+_COPY = re.compile(r"^\s*COPY INTO (\w+) \(([^)]*)\) FROM @(\w+) FILES = \('([^']+)'\)", re.I)
+_COUNT = re.compile(r'^\s*SELECT COUNT\(\*\) FROM (\w+)', re.I)
+
+
+class ProgrammingError(Exception):
+    """Statement the fake does not understand, or an unknown object"""
+
+
+def _csv_rows(data):
+    """Rows of a gzip CSV file (NULL_MARKER -> None)"""
+    text = io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(data)), encoding='utf-8', newline='')
+    return [[None if value == NULL_MARKER else value for value in row] for row in csv.reader(text)]
+
+
+class FakeDatabase:
+    """Tables shared by connections: permanent tables are dicts keyed by uniqueid"""
+
+    def __init__(self):
+        self.tables = {'cdr': {}}
+
+
+class FakeCursor:
+    """Cursor running the sync's statements on the in-memory tables"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+        self._result = []
+
+    def execute(self, query, params=None):
+        """Run one statement (after the simulated latency)"""
+        conn = self.conn
+        time.sleep(conn.statement_ms / 1000.0)
+        self._result = []
+
+        match = _ROW_MERGE.match(query)
+        if match:
+            table = conn.table(match.group(1))
+            row = dict(zip(CDR_COLUMNS, params))
+            inserted = row['uniqueid'] not in table
+            if inserted:
+                table[row['uniqueid']] = row
+            return self._done([(int(inserted),)])
+
+        match = _SET_MERGE.match(query)
+        if match:
+            table, source = conn.table(match.group(1)), conn.temp_table(match.group(2))
+            inserted = 0
+            for row in source:
+                if row['uniqueid'] not in table:
+                    table[row['uniqueid']] = row
+                    inserted += 1
+            return self._done([(inserted,)])
+
+        match = _CREATE_TABLE.match(query)
+        if match:
+            conn.temp_tables.setdefault(match.group(1), [])
+            return self._done([])
+
+        match = _CREATE_STAGE.match(query)
+        if match:
+            conn.stages.setdefault(match.group(1), {})
+            return self._done([])
+
+        match = _TRUNCATE.match(query)
+        if match:
+            conn.temp_table(match.group(1)).clear()
+            return self._done([])
+
+        match = _PUT.match(query)
+        if match:
+            path, stage = match.group(1), match.group(2)
+            with open(path, 'rb') as f:
+                data = f.read()
+            time.sleep(len(data) / (conn.upload_mbps * 1e6))
+            conn.stage(stage)[path.rsplit('/', 1)[-1]] = data
+            return self._done([(path, len(data), 'UPLOADED')])
+
+        match = _COPY.match(query)
+        if match:
+            table, stage = conn.temp_table(match.group(1)), conn.stage(match.group(3))
+            columns = [column.strip() for column in match.group(2).split(',')]
+            name = match.group(4)
+            if name not in stage:
+                raise ProgrammingError(f"File {name} not found in stage {match.group(3)}")
+            rows = _csv_rows(stage[name])
+            table.extend(dict(zip(columns, row)) for row in rows)
+            if re.search(r'PURGE\s*=\s*TRUE', query, re.I):
+                del stage[name]
+            return self._done([(name, 'LOADED', len(rows), len(rows))])
+
+        match = _COUNT.match(query)
+        if match:
+            name = match.group(1)
+            rows = conn.temp_tables[name] if name in conn.temp_tables else conn.table(name)
+            return self._done([(len(rows),)])
+
+        raise ProgrammingError(f"Fake Snowflake cannot run: {query.strip()[:60]}")
+
+    def _done(self, rows):
+        """Store the statement's result set"""
+        self._result = list(rows)
+        self.rowcount = len(self._result)
+        return self
+
+    def fetchone(self):
+        """Next result row, or None"""
+        return self._result.pop(0) if self._result else None
+
+    def fetchall(self):
+        """Remaining result rows"""
+        rows, self._result = self._result, []
+        return rows
+
+    def close(self):
+        """Nothing to release"""
+
+
+class FakeConnection:
+    """Session: temporary tables and stages are per connection, like Snowflake's"""
+
+    def __init__(self, database, statement_ms, upload_mbps):
+        self.database = database
+        self.statement_ms = statement_ms
+        self.upload_mbps = upload_mbps
+        self.temp_tables = {}
+        self.stages = {}
+
+    def table(self, name):
+        """Permanent table by name"""
+        try:
+            return self.database.tables[name]
+        except KeyError:
+            raise ProgrammingError(f"Table {name} does not exist") from None
+
+    def temp_table(self, name):
+        """Temporary table by name"""
+        try:
+            return self.temp_tables[name]
+        except KeyError:
+            raise ProgrammingError(f"Table {name} does not exist") from None
+
+    def stage(self, name):
+        """Stage by name"""
+        try:
+            return self.stages[name]
+        except KeyError:
+            raise ProgrammingError(f"Stage {name} does not exist") from None
+
+    def cursor(self):
+        """New cursor"""
+        return FakeCursor(self)
+
+    def close(self):
+        """Temporary tables and stages end with the session"""
+        self.temp_tables.clear()
+        self.stages.clear()
+
+
+def connect(database=None, statement_ms=STATEMENT_MS, upload_mbps=UPLOAD_MBPS, **kwargs):
+    """Connection to a FakeDatabase (a fresh one unless given); credentials are accepted and ignored"""
+    if not isinstance(database, FakeDatabase):
+        database = FakeDatabase()
+    return FakeConnection(database, statement_ms, upload_mbps)
@@ -0,0 +1,174 @@
+"""
+Loading CDR records into Snowflake
+- BulkLoader: each chunk is written to a gzip CSV file, PUT to a temporary
+  stage, COPY'd INTO a temporary table and merged into cdr with one
+  set-based MERGE on uniqueid (four statements per chunk, whatever its size,
+  plus two once per run to create the table and stage)
+- merge_rows: the original path, one MERGE round trip per record
+- Both skip records whose uniqueid is already in cdr, so replaying a chunk
+  after a crash inserts nothing twice
+"""
+
+import csv
+import gzip
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+CDR_COLUMNS = (
+    'calldate', 'clid', 'src', 'dst', 'dcontext', 'channel', 'dstchannel',
+    'lastapp', 'lastdata', 'duration', 'billsec', 'disposition', 'amaflags',
+    'accountcode', 'uniqueid', 'userfield', 'peeraccount', 'linkedid', 'sequence',
+    'cnum', 'cnam', 'outbound_cnum', 'outbound_cnam', 'dst_cnam',
+)
+
+# Written for SQL NULL in the CSV files (NULL_IF in the COPY file format)
+NULL_MARKER = '\\N'
+
+LOAD_TABLE = 'cdr_load'
+LOAD_STAGE = 'cdr_load_stage'
+# csv.writer quotes only fields that need it and never escapes backslashes,
+# so Snowflake must not treat backslashes in unenclosed fields as escapes
+# (its default): a trailing one would swallow the next delimiter
+FILE_FORMAT = (
+    "TYPE = CSV COMPRESSION = GZIP FIELD_OPTIONALLY_ENCLOSED_BY = '\"' "
+    "ESCAPE_UNENCLOSED_FIELD = NONE NULL_IF = ('\\\\N') EMPTY_FIELD_AS_NULL = FALSE"
+)
+
+_COLUMN_LIST = ', '.join(CDR_COLUMNS)
+_SOURCE_LIST = ', '.join(f'source.{column}' for column in CDR_COLUMNS)
+
+
+def merge_rows(snowflake_conn, records, table='cdr'):
+    """One MERGE per record (the original path); returns the number that succeeded"""
+    if not records:
+        logger.info("No records to sync")
+        return 0
+
+    cursor = snowflake_conn.cursor()
+
+    # Use MERGE to avoid duplicates (based on uniqueid)
+    merge_query = f"""
+        MERGE INTO {table} AS target
+        USING (
+            SELECT {', '.join(f'%s as {column}' for column in CDR_COLUMNS)}
+        ) AS source
+        ON target.uniqueid = source.uniqueid
+        WHEN NOT MATCHED THEN
+            INSERT ({_COLUMN_LIST})
+            VALUES ({_SOURCE_LIST})
+    """
+
+    synced = 0
+    for record in records:
+        try:
+            cursor.execute(merge_query, tuple(record[column] for column in CDR_COLUMNS))
+            synced += 1
+        except Exception as e:
+            logger.error(f"Failed to sync record {record['uniqueid']}: {e}")
+
+    cursor.close()
+    logger.info(f"Synced {synced} records to Snowflake")
+    return synced
+
+
+def write_csv_gz(records, path):
+    """Write records as gzip CSV in CDR_COLUMNS order; returns the file size in bytes"""
+    with gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        for record in records:
+            writer.writerow([NULL_MARKER if record[column] is None else record[column] for column in CDR_COLUMNS])
+    return os.path.getsize(path)
+
+
+class BulkLoader:
+    """Staged bulk load: gzip CSV -> PUT -> COPY INTO temp table -> one MERGE
+
+    The temporary table and stage live as long as the Snowflake session, so
+    one loader serves every chunk of a run. load() is all or nothing: it
+    raises if any statement fails, and the chunk can simply be loaded again.
+    """
+
+    def __init__(self, snowflake_conn, table='cdr', work_dir=None):
+        self.conn = snowflake_conn
+        self.table = table
+        self.work_dir = work_dir
+        self._prepared = False
+        self._files = 0
+
+        self.chunks = 0
+        self.rows = 0
+        self.inserted = 0
+        self.bytes_uploaded = 0
+        self.seconds = 0.0
+
+    def _prepare(self, cursor):
+        """Create the session's load table and stage"""
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {LOAD_TABLE} LIKE {self.table}")
+        cursor.execute(f"CREATE TEMPORARY STAGE IF NOT EXISTS {LOAD_STAGE} FILE_FORMAT = ({FILE_FORMAT})")
+        self._prepared = True
+
+    def load(self, records):
+        """Load one chunk of records; returns the number of records loaded"""
+        if not records:
+            logger.info("No records to sync")
+            return 0
+
+        started = time.monotonic()
+        self._files += 1
+        name = f"cdr-{os.getpid()}-{self._files}.csv.gz"
+        with tempfile.TemporaryDirectory(dir=self.work_dir) as tmp:
+            path = os.path.join(tmp, name)
+            size = write_csv_gz(records, path)
+
+            cursor = self.conn.cursor()
+            try:
+                if not self._prepared:
+                    self._prepare(cursor)
+                cursor.execute(f"TRUNCATE TABLE {LOAD_TABLE}")
+                cursor.execute(f"PUT 'file://{path}' @{LOAD_STAGE} AUTO_COMPRESS = FALSE "
+                               f"SOURCE_COMPRESSION = GZIP OVERWRITE = TRUE")
+                cursor.execute(f"COPY INTO {LOAD_TABLE} ({_COLUMN_LIST}) FROM @{LOAD_STAGE} "
+                               f"FILES = ('{name}') FILE_FORMAT = ({FILE_FORMAT}) "
+                               f"ON_ERROR = ABORT_STATEMENT PURGE = TRUE")
+
+                # Duplicates inside the chunk are collapsed so each uniqueid is inserted once
+                cursor.execute(f"""
+                    MERGE INTO {self.table} AS target
+                    USING (
+                        SELECT * FROM {LOAD_TABLE}
+                        QUALIFY ROW_NUMBER() OVER (PARTITION BY uniqueid ORDER BY calldate) = 1
+                    ) AS source
+                    ON target.uniqueid = source.uniqueid
+                    WHEN NOT MATCHED THEN
+                        INSERT ({_COLUMN_LIST})
+                        VALUES ({_SOURCE_LIST})
+                """)
+                result = cursor.fetchone()
+                inserted = result[0] if result else 0
+            finally:
+                cursor.close()
+
+        elapsed = time.monotonic() - started
+        self.chunks += 1
+        self.rows += len(records)
+        self.inserted += inserted
+        self.bytes_uploaded += size
+        self.seconds += elapsed
+        logger.info(f"Synced {len(records)} records to Snowflake ({inserted} new, "
+                    f"{size / 1024:.0f} KB staged, {len(records) / elapsed:,.0f} rows/s)")
+        return len(records)
+
+    def get_stats(self):
+        """Load statistics"""
+        return {
+            'chunks': self.chunks,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'bytes_uploaded': self.bytes_uploaded,
+            'rows_per_second': self.rows / self.seconds if self.seconds else 0.0,
+        }
+
@@ -2,15 +2,28 @@
 """
 Sync FreePBX CDR data to Snowflake
 Reads CDR records from MariaDB and pushes to Snowflake
+- Incremental: only rows past a durable high-water mark (cdr.id, or
+  calldate + uniqueid when the table has no id column) are read
+- Rows stream from a server-side (unbuffered) cursor in SYNC_CHUNK_SIZE
+  chunks, so memory does not grow with call volume
+- Each chunk is bulk loaded: staged as one gzip CSV file, COPY'd into a
+  temporary table and merged on uniqueid in a single statement
+  (SYNC_LOAD_MODE=row keeps the old one-MERGE-per-record path)
+- The mark is saved after each chunk is in Snowflake; a crash mid-run
+  replays at most one chunk, which the MERGE on uniqueid skips
 """
 
 import os
 import sys
+import json
+import fcntl
 import mysql.connector
 import snowflake.connector
 from datetime import datetime, timedelta
 import logging
 
+from snowflake_loader import CDR_COLUMNS, BulkLoader, merge_rows
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,9 +44,27 @@ SNOWFLAKE_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH')
 SNOWFLAKE_DATABASE = os.getenv('SNOWFLAKE_DATABASE', 'FREEPBX_CDR')
 SNOWFLAKE_SCHEMA = os.getenv('SNOWFLAKE_SCHEMA', 'CDR_DATA')
 
-# Sync window (how far back to look for new records)
+# First run only (no saved mark yet): how far back to start, 0 = all history
 SYNC_HOURS = int(os.getenv('SYNC_HOURS', '24'))
 
+# Incremental sync state
+SYNC_STATE_FILE = os.getenv('SYNC_STATE_FILE', '/var/lib/snowflake-sync/cdr-watermark.json')
+SYNC_CHUNK_SIZE = int(os.getenv('SYNC_CHUNK_SIZE', '20000'))  # Rows read and loaded per step
+SYNC_KEY = os.getenv('SYNC_KEY', 'auto')  # auto | id | calldate
+# calldate mode: CDRs are written at hangup with the call's start time, so
+# each run re-reads this much before the mark to catch long calls
+SYNC_OVERLAP_MINUTES = int(os.getenv('SYNC_OVERLAP_MINUTES', '120'))
+# Seconds MariaDB waits on a slow reader before dropping the streaming result
+MYSQL_NET_WRITE_TIMEOUT = int(os.getenv('MYSQL_NET_WRITE_TIMEOUT', '3600'))
+
+# bulk: each chunk staged as a gzip CSV file and merged with one statement
+# (snowflake_loader.BulkLoader); row: one MERGE per record (slow, needs no
+# CREATE TEMPORARY TABLE / STAGE privileges)
+SYNC_LOAD_MODE = os.getenv('SYNC_LOAD_MODE', 'bulk')
+SYNC_WORK_DIR = os.getenv('SYNC_WORK_DIR') or None  # Chunk files (default: system temp dir)
+
+SELECT_COLUMNS = ', '.join(CDR_COLUMNS)
+
 
 def connect_mysql():
     """Connect to MariaDB"""
@@ -69,93 +100,113 @@ def connect_snowflake():
         sys.exit(1)
 
 
-def get_cdr_records(mysql_conn):
-    """Fetch CDR records from MariaDB"""
-    cursor = mysql_conn.cursor(dictionary=True)
-    
-    # Get records from last SYNC_HOURS hours
-    sync_time = datetime.now() - timedelta(hours=SYNC_HOURS)
-    
-    query = """
-        SELECT 
-            calldate, clid, src, dst, dcontext, channel, dstchannel,
-            lastapp, lastdata, duration, billsec, disposition, amaflags,
-            accountcode, uniqueid, userfield, peeraccount, linkedid, sequence,
-            cnum, cnam, outbound_cnum, outbound_cnam, dst_cnam
-        FROM cdr
-        WHERE calldate >= %s
-        ORDER BY calldate DESC
-    """
-    
-    cursor.execute(query, (sync_time,))
-    records = cursor.fetchall()
+def lock_state(path):
+    """Exclusive lock next to the state file, so overlapping cron runs do not race"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    lock = open(f"{path}.lock", 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        logger.warning(f"Another sync holds {path}.lock, exiting")
+        sys.exit(0)
+    return lock
+
+
+def load_watermark(path):
+    """Saved high-water mark, or None before the first sync"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    state['calldate'] = datetime.fromisoformat(state['calldate'])
+    return state
+
+
+def save_watermark(path, watermark):
+    """Write the mark atomically (temp file, fsync, rename)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(dict(watermark, calldate=watermark['calldate'].isoformat(),
+                       updated=datetime.now().isoformat()), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def watermark_key(mysql_conn):
+    """'id' when cdr has the auto-increment id column (exact), else 'calldate'"""
+    if SYNC_KEY != 'auto':
+        return SYNC_KEY
+    cursor = mysql_conn.cursor()
+    cursor.execute("SHOW COLUMNS FROM cdr LIKE 'id'")
+    has_id = cursor.fetchone() is not None
     cursor.close()
-    
-    logger.info(f"Fetched {len(records)} CDR records from MariaDB")
-    return records
+    return 'id' if has_id else 'calldate'
 
 
-def sync_to_snowflake(snowflake_conn, records):
-    """Insert CDR records into Snowflake"""
-    if not records:
-        logger.info("No records to sync")
-        return
-    
-    cursor = snowflake_conn.cursor()
-    
-    # Use MERGE to avoid duplicates (based on uniqueid)
-    merge_query = """
-        MERGE INTO cdr AS target
-        USING (
-            SELECT 
-                %s as calldate, %s as clid, %s as src, %s as dst,
-                %s as dcontext, %s as channel, %s as dstchannel,
-                %s as lastapp, %s as lastdata, %s as duration,
-                %s as billsec, %s as disposition, %s as amaflags,
-                %s as accountcode, %s as uniqueid, %s as userfield,
-                %s as peeraccount, %s as linkedid, %s as sequence,
-                %s as cnum, %s as cnam, %s as outbound_cnum,
-                %s as outbound_cnam, %s as dst_cnam
-        ) AS source
-        ON target.uniqueid = source.uniqueid
-        WHEN NOT MATCHED THEN
-            INSERT (
-                calldate, clid, src, dst, dcontext, channel, dstchannel,
-                lastapp, lastdata, duration, billsec, disposition, amaflags,
-                accountcode, uniqueid, userfield, peeraccount, linkedid, sequence,
-                cnum, cnam, outbound_cnum, outbound_cnam, dst_cnam
-            )
-            VALUES (
-                source.calldate, source.clid, source.src, source.dst,
-                source.dcontext, source.channel, source.dstchannel,
-                source.lastapp, source.lastdata, source.duration,
-                source.billsec, source.disposition, source.amaflags,
-                source.accountcode, source.uniqueid, source.userfield,
-                source.peeraccount, source.linkedid, source.sequence,
-                source.cnum, source.cnam, source.outbound_cnum,
-                source.outbound_cnam, source.dst_cnam
-            )
-    """
+def cdr_query(key, watermark):
+    """SELECT for the rows after the mark, in mark order"""
+    if key == 'id' and watermark is not None and watermark.get('id') is not None:
+        return f"SELECT id, {SELECT_COLUMNS} FROM cdr WHERE id > %s ORDER BY id", (watermark['id'],)
+    if watermark is None:
+        since = datetime.now() - timedelta(hours=SYNC_HOURS) if SYNC_HOURS else datetime(1970, 1, 1)
+        order = 'id' if key == 'id' else 'calldate, uniqueid'
+        return (f"SELECT {'id, ' if key == 'id' else ''}{SELECT_COLUMNS} FROM cdr WHERE calldate >= %s ORDER BY {order}",
+                (since,))
+
+    # calldate + uniqueid keyset, starting SYNC_OVERLAP_MINUTES early
+    # (also used once when switching from an id mark to calldate)
+    if SYNC_OVERLAP_MINUTES or key != 'calldate':
+        start, uniqueid = watermark['calldate'] - timedelta(minutes=SYNC_OVERLAP_MINUTES), ''
+    else:
+        start, uniqueid = watermark['calldate'], watermark['uniqueid']
+    return (f"SELECT {'id, ' if key == 'id' else ''}{SELECT_COLUMNS} FROM cdr "
+            f"WHERE calldate > %s OR (calldate = %s AND uniqueid > %s) "
+            f"ORDER BY {'id' if key == 'id' else 'calldate, uniqueid'}",
+            (start, start, uniqueid))
+
+
+def get_cdr_chunks(mysql_conn, key, watermark):
+    """Yield lists of up to SYNC_CHUNK_SIZE CDR records after the mark, streamed from the server"""
+    setup = mysql_conn.cursor()
+    setup.execute("SET SESSION net_write_timeout = %s", (MYSQL_NET_WRITE_TIMEOUT,))
+    setup.close()
     
-    synced = 0
-    for record in records:
-        try:
-            cursor.execute(merge_query, (
-                record['calldate'], record['clid'], record['src'], record['dst'],
-                record['dcontext'], record['channel'], record['dstchannel'],
-                record['lastapp'], record['lastdata'], record['duration'],
-                record['billsec'], record['disposition'], record['amaflags'],
-                record['accountcode'], record['uniqueid'], record['userfield'],
-                record['peeraccount'], record['linkedid'], record['sequence'],
-                record['cnum'], record['cnam'], record['outbound_cnum'],
-                record['outbound_cnam'], record['dst_cnam']
-            ))
-            synced += 1
-        except Exception as e:
-            logger.error(f"Failed to sync record {record['uniqueid']}: {e}")
+    # Unbuffered: rows stay on the server until fetched
+    cursor = mysql_conn.cursor(dictionary=True, buffered=False)
+    query, params = cdr_query(key, watermark)
+    cursor.execute(query, params)
     
+    while True:
+        records = cursor.fetchmany(SYNC_CHUNK_SIZE)
+        if not records:
+            break
+        yield records
     cursor.close()
-    logger.info(f"Synced {synced} records to Snowflake")
+
+
+def advance_watermark(watermark, key, records):
+    """Mark after the last record of a chunk (records are in mark order)"""
+    last = records[-1]
+    position = (last['calldate'], last['uniqueid'] or '')
+    if watermark and (watermark['calldate'], watermark['uniqueid']) > position:
+        # Overlap re-read (or id order): never move the calldate mark back
+        position = (watermark['calldate'], watermark['uniqueid'])
+    return {
+        'key': key,
+        'id': last.get('id'),
+        'calldate': position[0],
+        'uniqueid': position[1],
+        'rows': (watermark or {}).get('rows', 0) + len(records),
+    }
+
+
+def sync_to_snowflake(snowflake_conn, records, loader=None):
+    """Insert CDR records into Snowflake (bulk through the loader, else one MERGE per record)"""
+    if loader is not None:
+        return loader.load(records)
+    return merge_rows(snowflake_conn, records)
 
 
 def main():
@@ -167,15 +218,41 @@ def main():
         logger.error("Missing required environment variables")
         sys.exit(1)
     
+    lock = lock_state(SYNC_STATE_FILE)
+    watermark = load_watermark(SYNC_STATE_FILE)
+    
     # Connect to databases
     mysql_conn = connect_mysql()
     snowflake_conn = connect_snowflake()
     
     try:
-        # Fetch and sync records
-        records = get_cdr_records(mysql_conn)
-        sync_to_snowflake(snowflake_conn, records)
+        key = watermark_key(mysql_conn)
+        if watermark is None:
+            logger.info(f"No sync mark yet, starting {f'{SYNC_HOURS} hours back' if SYNC_HOURS else 'from the first CDR'}")
+        else:
+            logger.info(f"Resuming after {key} mark: id={watermark.get('id')} calldate={watermark['calldate']} "
+                        f"uniqueid={watermark['uniqueid']} ({watermark.get('rows', 0)} rows read so far)")
+        
+        loader = BulkLoader(snowflake_conn, work_dir=SYNC_WORK_DIR) if SYNC_LOAD_MODE == 'bulk' else None
+        
+        # Fetch and sync one chunk at a time; the mark only moves past
+        # chunks that are fully in Snowflake
+        total = 0
+        for records in get_cdr_chunks(mysql_conn, key, watermark):
+            synced = sync_to_snowflake(snowflake_conn, records, loader)
+            if synced != len(records):
+                raise RuntimeError(f"{len(records) - synced} records of a chunk failed; "
+                                   f"mark kept at calldate={watermark['calldate'] if watermark else None}, "
+                                   f"the chunk is retried next run")
+            watermark = advance_watermark(watermark, key, records)
+            save_watermark(SYNC_STATE_FILE, watermark)
+            total += len(records)
         
+        logger.info(f"Fetched {total} new CDR records from MariaDB")
+        if loader is not None and loader.chunks:
+            stats = loader.get_stats()
+            logger.info(f"Bulk loaded {stats['rows']} records in {stats['chunks']} chunks "
+                        f"({stats['inserted']} new, {stats['rows_per_second']:,.0f} rows/s)")
         logger.info("Sync completed successfully")
     except Exception as e:
         logger.error(f"Sync failed: {e}")
@@ -183,6 +260,7 @@ def main():
     finally:
         mysql_conn.close()
         snowflake_conn.close()
+        lock.close()
 
 
 if __name__ == "__main__":
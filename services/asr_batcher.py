@@ -0,0 +1,202 @@
+"""
+Cross-call micro-batching for Whisper speech recognition
+- Collects ready chunks from many calls within a short window
+- Pads them to Whisper's 30 s input and decodes them as one batch
+- Routes each result back to the calling worker thread
+- Spoken language identification (one encoder pass, once per call) runs
+  directly on the calling thread
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+import torch
+import whisper
+
+from backends import best_language
+from metrics import summarize_latencies
+
+logger = logging.getLogger(__name__)
+
+# Number of recent request latencies kept for percentile reporting
+LATENCY_SAMPLES = 10000
+
+
+class _Request:
+    """One chunk waiting to be transcribed"""
+
+    __slots__ = ('audio', 'language', 'future', 'enqueued_at')
+
+    def __init__(self, audio, language):
+        self.audio = audio
+        self.language = language
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class WhisperBatcher:
+    """Batches transcription requests from concurrent calls
+
+    transcribe() is called from inference worker threads and blocks until the
+    batch containing the request has been decoded. A batch is dispatched when
+    it reaches max_batch_size or window_ms after its first request arrived,
+    whichever comes first. Requests are grouped by language because Whisper
+    decodes a batch with a single language token. It gives up after
+    request_timeout seconds, and stop() fails every request still queued,
+    so no caller waits forever on a batcher that is gone.
+    """
+
+    def __init__(self, model, max_batch_size=8, window_ms=50, request_timeout=120.0):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window_ms / 1000.0
+        self.request_timeout = request_timeout
+        self.fp16 = model.device.type == 'cuda'
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self.running = False
+
+        self.batches = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """Start the batching thread"""
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the batching thread and fail the requests it will not decode"""
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=5)
+
+        failed = 0
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request.future.cancelled():
+                continue
+            request.future.set_exception(RuntimeError("Whisper batcher stopped"))
+            failed += 1
+        if failed:
+            logger.warning(f"Whisper batcher stopped with {failed} requests queued")
+
+    def transcribe(self, audio, language, timeout=None):
+        """Transcribe 16 kHz float32 audio; returns the recognized text
+
+        Raises RuntimeError once the batcher is stopped and TimeoutError
+        after timeout seconds (default request_timeout); a request that
+        timed out is cancelled and the batching thread skips it.
+        """
+        if not self.running:
+            raise RuntimeError("Whisper batcher stopped")
+        request = _Request(np.asarray(audio, dtype=np.float32), language)
+        self._queue.put(request)
+        try:
+            return request.future.result(self.request_timeout if timeout is None else timeout)
+        except FutureTimeout:
+            request.future.cancel()
+            raise
+
+    def detect_language(self, audio, candidates=None):
+        """(language, probability) of 16 kHz float32 audio (first 30 s)"""
+        with torch.no_grad():
+            mel = whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)),
+                n_mels=self.model.dims.n_mels,
+                device=self.model.device
+            )
+            if self.fp16:
+                mel = mel.half()
+            _, probabilities = self.model.detect_language(mel)
+        return best_language(probabilities, candidates)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Batching thread body"""
+        logger.info(f"Whisper batcher started (batch={self.max_batch_size}, "
+                    f"window={self.window * 1000:.0f}ms)")
+
+        while self.running:
+            # Requests whose callers gave up (cancelled on timeout) are skipped
+            batch = [request for request in self._collect()
+                     if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            by_language = defaultdict(list)
+            for request in batch:
+                by_language[request.language].append(request)
+
+            for language, requests in by_language.items():
+                self._decode(language, requests)
+
+    def _decode(self, language, requests):
+        """Run one padded batch through the Whisper encoder/decoder"""
+        try:
+            with torch.no_grad():
+                mels = torch.stack([
+                    whisper.log_mel_spectrogram(
+                        whisper.pad_or_trim(request.audio),
+                        n_mels=self.model.dims.n_mels,
+                        device=self.model.device
+                    )
+                    for request in requests
+                ])
+                options = whisper.DecodingOptions(
+                    task='transcribe',
+                    language=language,
+                    without_timestamps=True,
+                    fp16=self.fp16
+                )
+                results = whisper.decode(self.model, mels, options)
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        done = time.monotonic()
+        self.batches += 1
+        self.requests += len(requests)
+
+        for request, result in zip(requests, results):
+            self.latencies.append(done - request.enqueued_at)
+            request.future.set_result(result.text.strip())
+
+    def get_stats(self):
+        """Batcher statistics"""
+        stats = {
+            'batches': self.batches,
+            'requests': self.requests,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+        stats.update({f'latency_{k}_ms': v for k, v in summarize_latencies(self.latencies.copy()).items()})
+        return stats
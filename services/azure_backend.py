@@ -0,0 +1,218 @@
+"""
+Azure Speech (ASR, TTS) and Azure Translator (MT) as a speech backend
+- ASR: continuous recognition over a push stream holding one utterance of
+  16 kHz PCM, so pauses inside the utterance do not cut it short
+- MT: Translator REST API v3.0; translate_batch sends up to
+  TRANSLATOR_BATCH texts in one request
+- TTS: raw 16 kHz 16-bit PCM synthesis, no container parsing
+- emulate=True runs against fake_speech (deterministic, simulated round
+  trip, no account or network) so routing and the pipeline can be
+  benchmarked offline
+"""
+
+import json
+import logging
+import threading
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+from backends import STAGE_ASR, STAGE_MT, STAGE_TTS, SpeechBackend
+
+try:
+    import azure.cognitiveservices.speech as speechsdk
+except ImportError:
+    speechsdk = None  # Optional: pip install azure-cognitiveservices-speech
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+REQUEST_TIMEOUT = 15.0
+TRANSLATOR_ENDPOINT = 'https://api.cognitive.microsofttranslator.com/translate'
+TRANSLATOR_BATCH = 100  # Texts per Translator request (API limit)
+
+# Speech locale and neural voice for the language codes the services use
+LOCALES = {
+    'en': 'en-US', 'es': 'es-ES', 'fr': 'fr-FR', 'de': 'de-DE', 'it': 'it-IT',
+    'pt': 'pt-BR', 'ja': 'ja-JP', 'zh': 'zh-CN', 'ko': 'ko-KR', 'ar': 'ar-SA',
+}
+VOICES = {
+    'en-US': 'en-US-JennyNeural', 'es-ES': 'es-ES-ElviraNeural', 'fr-FR': 'fr-FR-DeniseNeural',
+    'de-DE': 'de-DE-KatjaNeural', 'it-IT': 'it-IT-ElsaNeural', 'pt-BR': 'pt-BR-FranciscaNeural',
+    'ja-JP': 'ja-JP-NanamiNeural', 'zh-CN': 'zh-CN-XiaoxiaoNeural', 'ko-KR': 'ko-KR-SunHiNeural',
+    'ar-SA': 'ar-SA-ZariyahNeural',
+}
+# Translator codes that are not the language code itself
+TRANSLATOR_CODES = {'zh': 'zh-Hans'}
+
+
+def _locale(language):
+    """'es' -> 'es-ES'; full locales pass through"""
+    return language if '-' in language else LOCALES.get(language, language)
+
+
+def _pcm16(audio):
+    """float32 samples -> little-endian 16-bit PCM bytes"""
+    return (np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+
+class AzureBackend(SpeechBackend):
+    """Azure cloud speech services (stages depend on the credentials given)"""
+
+    name = 'azure'
+    tts_sample_rate = SAMPLE_RATE
+
+    def __init__(self, speech_key=None, speech_region=None, translator_key=None, translator_region=None,
+                 emulate=False, cost=10.0):
+        if emulate:
+            import fake_speech
+            self.sdk = fake_speech
+            self.name = 'azure-emulator'
+        else:
+            self.sdk = speechsdk
+
+        stages = []
+        if emulate or (self.sdk is not None and speech_key and speech_region):
+            stages += [STAGE_ASR, STAGE_TTS]
+        if emulate or translator_key:
+            stages.append(STAGE_MT)
+        super().__init__({stage: cost for stage in stages})
+
+        self.emulate = emulate
+        self.speech_key = speech_key
+        self.speech_region = speech_region
+        self.translator_key = translator_key
+        self.translator_region = translator_region or speech_region
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    def start(self):
+        """Check that at least one service is configured"""
+        if not self.costs:
+            raise RuntimeError("Azure backend needs the Speech SDK with AZURE_SPEECH_KEY / AZURE_SPEECH_REGION, "
+                               "or AZURE_TRANSLATOR_KEY")
+        logger.info(f"{self.name} backend: {', '.join(self.costs)}")
+
+    def _counted(self, fn, *args):
+        """Run one request with in-flight / failure accounting"""
+        with self._lock:
+            self._in_flight += 1
+            self.requests += 1
+        try:
+            return fn(*args)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _speech_config(self):
+        """A fresh SpeechConfig (per request: language and voice vary per call)"""
+        return self.sdk.SpeechConfig(subscription=self.speech_key, region=self.speech_region)
+
+    def transcribe(self, audio, language, degraded=False):
+        """16 kHz float32 audio -> text"""
+        return self._counted(self._transcribe, audio, language)
+
+    def _transcribe(self, audio, language):
+        config = self._speech_config()
+        config.speech_recognition_language = _locale(language)
+        stream_format = self.sdk.audio.AudioStreamFormat(samples_per_second=SAMPLE_RATE, bits_per_sample=16, channels=1)
+        stream = self.sdk.audio.PushAudioInputStream(stream_format=stream_format)
+        recognizer = self.sdk.SpeechRecognizer(
+            speech_config=config,
+            audio_config=self.sdk.audio.AudioConfig(stream=stream)
+        )
+
+        texts, errors = [], []
+        done = threading.Event()
+
+        def recognized(evt):
+            if evt.result.reason == self.sdk.ResultReason.RecognizedSpeech and evt.result.text:
+                texts.append(evt.result.text.strip())
+
+        def canceled(evt):
+            if evt.cancellation_details.reason == self.sdk.CancellationReason.Error:
+                errors.append(evt.cancellation_details.error_details)
+
+        recognizer.recognized.connect(recognized)
+        recognizer.canceled.connect(canceled)
+        recognizer.session_stopped.connect(lambda evt: done.set())
+        recognizer.start_continuous_recognition()
+        stream.write(_pcm16(audio))
+        stream.close()
+        finished = done.wait(REQUEST_TIMEOUT)
+        recognizer.stop_continuous_recognition()
+
+        if errors:
+            raise RuntimeError(f"Azure recognition failed: {errors[0]}")
+        if not finished:
+            raise TimeoutError("Azure recognition timed out")
+        return ' '.join(texts)
+
+    def translate(self, text, source_lang, target_lang):
+        """Text -> translated text"""
+        return self.translate_batch([text], source_lang, target_lang)[0]
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        """Translate several sentences, TRANSLATOR_BATCH per request"""
+        translated = []
+        for start in range(0, len(texts), TRANSLATOR_BATCH):
+            chunk = texts[start:start + TRANSLATOR_BATCH]
+            translated.extend(self._counted(self._translate, chunk, source_lang, target_lang))
+        return translated
+
+    def _translate(self, texts, source_lang, target_lang):
+        source = TRANSLATOR_CODES.get(source_lang, source_lang)
+        target = TRANSLATOR_CODES.get(target_lang, target_lang)
+        if self.emulate:
+            return self.sdk.translate_text(texts, source, target)
+
+        params = urllib.parse.urlencode({'api-version': '3.0', 'from': source, 'to': target})
+        headers = {'Ocp-Apim-Subscription-Key': self.translator_key, 'Content-Type': 'application/json'}
+        if self.translator_region:
+            headers['Ocp-Apim-Subscription-Region'] = self.translator_region
+        request = urllib.request.Request(
+            f"{TRANSLATOR_ENDPOINT}?{params}",
+            data=json.dumps([{'Text': text} for text in texts]).encode(),
+            headers=headers
+        )
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            body = json.load(response)
+        return [item['translations'][0]['text'] for item in body]
+
+    def synthesize(self, text, language):
+        """Text -> float32 audio at 16 kHz"""
+        return self._counted(self._synthesize, text, language)
+
+    def _synthesize(self, text, language):
+        locale = _locale(language)
+        config = self._speech_config()
+        config.speech_synthesis_language = locale
+        config.speech_synthesis_voice_name = VOICES.get(locale, '')
+        config.set_speech_synthesis_output_format(self.sdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm)
+        synthesizer = self.sdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+
+        result = synthesizer.speak_text_async(text).get()
+        if result.reason != self.sdk.ResultReason.SynthesizingAudioCompleted:
+            raise RuntimeError(f"Azure synthesis failed: {result.cancellation_details.error_details}")
+        return np.frombuffer(result.audio_data, dtype='<i2').astype(np.float32) / 32768.0
+
+    def get_stats(self):
+        """Request statistics (keys shared with InferenceWorkerPool)"""
+        return {
+            'workers': 0,
+            'ready': 0,
+            'in_flight': self._in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'retries': 0,
+            'restarts': 0,
+            'served': [],
+        }
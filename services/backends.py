@@ -0,0 +1,402 @@
+"""
+Pluggable speech backends (ASR / MT / TTS) shared by the translation services
+- SpeechBackend: transcribe / translate / synthesize, each with a batch form
+  and a Future-returning async form (submit), plus optional spoken language
+  identification (detect_language) and translation model prewarming
+- Implementations: local models (Whisper / MarianMT / Coqui TTS, in process
+  or in worker processes), Azure Speech + Translator (or its local emulator)
+  and the fixed-latency stub
+- BackendRouter sends each request to the cheapest backend whose recent
+  latency meets the stage budget, and moves off backends that fail
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from resample import resample
+
+logger = logging.getLogger(__name__)
+
+STAGE_ASR = 'asr'
+STAGE_MT = 'mt'
+STAGE_TTS = 'tts'
+STAGE_LID = 'lid'  # Spoken language identification (optional)
+STAGES = (STAGE_ASR, STAGE_MT, STAGE_TTS)
+ROUTED_STAGES = STAGES + (STAGE_LID,)
+
+# Relative cost of one request per backend (lower is cheaper); BACKEND_COSTS overrides
+DEFAULT_COSTS = {'stub': 0.0, 'models': 1.0, 'azure': 10.0, 'azure-emulator': 10.0}
+
+# Settings the backends read (services override them from their environment)
+DEFAULT_CONFIG = {
+    'whisper_model': 'large-v2',
+    'whisper_profile': 'fp32',
+    'fallback_whisper_model': None,
+    'fallback_whisper_profile': 'fp32',
+    'asr_batch_size': 8,
+    'asr_batch_window_ms': 50,
+    'mt_profile': 'fp32',
+    'mt_batch_size': 8,
+    'mt_batch_window_ms': 20,
+    'mt_num_beams': 1,
+    'translation_model_budget_mb': 4096,
+    'translation_model_wait': 0.5,
+    'translation_prewarm_pairs': ['en-es', 'es-en'],
+    'tts_model': 'tts_models/multilingual/multi-dataset/your_tts',
+    'model_cache_dir': '',
+    'inference_processes': 0,
+    'worker_threads': 8,
+    'stub_asr_ms': 150,
+    'stub_mt_ms': 50,
+    'stub_tts_ms': 100,
+    'stub_lid_ms': 50,
+    'stub_language': 'en',
+    'azure_speech_key': None,
+    'azure_speech_region': None,
+    'azure_translator_key': None,
+    'azure_translator_region': None,
+}
+
+# Router: latency window per backend and stage, and how long a failing backend is skipped
+ROUTER_WINDOW = 200
+FAILURE_COOLDOWN = 30.0
+PROBE_INTERVAL = 50  # Every Nth request of a stage re-measures the cheapest over-budget backend
+
+_STAGE_METHODS = {STAGE_ASR: 'transcribe', STAGE_MT: 'translate', STAGE_TTS: 'synthesize',
+                  STAGE_LID: 'detect_language'}
+
+
+def best_language(probabilities, candidates=None):
+    """(language, probability) with the highest probability, among candidates if given"""
+    if candidates:
+        probabilities = {language: p for language, p in probabilities.items() if language in candidates}
+    if not probabilities:
+        return None, 0.0
+    language = max(probabilities, key=probabilities.get)
+    return language, float(probabilities[language])
+
+
+class SpeechBackend:
+    """Base class of the speech backends
+
+    Subclasses implement the stages listed in costs and set tts_sample_rate
+    when they synthesize. The *_batch forms run their requests concurrently,
+    so cross-call batchers (Whisper / MarianMT) decode them together.
+    submit() runs any call on the backend's thread pool and returns a
+    concurrent.futures.Future (asyncio.wrap_future() for coroutines).
+    """
+
+    name = 'backend'
+    device = 'cpu'
+    tts_sample_rate = None
+    async_threads = 8
+
+    def __init__(self, costs=None):
+        self.costs = dict(costs or {})
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def supports(self, stage):
+        """True if the backend serves a stage"""
+        return stage in self.costs
+
+    @property
+    def tts_voice(self):
+        """Identity of the synthesized voice (cached speech is reused only for the same one)"""
+        return self.name
+
+    def start(self):
+        """Load models / connect (blocks until ready)"""
+
+    def stop(self):
+        """Release models, processes and threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def transcribe(self, audio, language, degraded=False):
+        """16 kHz float32 audio -> text"""
+        raise NotImplementedError(f"{self.name} has no ASR")
+
+    def translate(self, text, source_lang, target_lang):
+        """Text -> translated text, or None while the model is loading"""
+        raise NotImplementedError(f"{self.name} has no MT")
+
+    def synthesize(self, text, language):
+        """Text -> float32 audio at tts_sample_rate"""
+        raise NotImplementedError(f"{self.name} has no TTS")
+
+    def detect_language(self, audio, candidates=None):
+        """16 kHz float32 audio -> (language, probability), among candidates if given"""
+        raise NotImplementedError(f"{self.name} has no language identification")
+
+    def prepare(self, source_lang, target_lang):
+        """Start loading what a language pair needs, without waiting"""
+
+    def submit(self, method, *args):
+        """Run self.<method>(*args) on the backend's threads; returns a Future"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.async_threads, thread_name_prefix=f"{self.name}-async")
+        return self._executor.submit(getattr(self, method), *args)
+
+    def _batch(self, method, calls):
+        """Results of concurrent calls, in order"""
+        futures = [self.submit(method, *args) for args in calls]
+        return [future.result() for future in futures]
+
+    def transcribe_batch(self, audios, language, degraded=False):
+        """Transcribe several utterances at once"""
+        return self._batch('transcribe', [(audio, language, degraded) for audio in audios])
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        """Translate several sentences at once"""
+        return self._batch('translate', [(text, source_lang, target_lang) for text in texts])
+
+    def synthesize_batch(self, texts, language):
+        """Synthesize several sentences at once"""
+        return self._batch('synthesize', [(text, language) for text in texts])
+
+    def get_stats(self):
+        """Backend statistics"""
+        return {}
+
+
+class _Route:
+    """Observed latency and health of one backend for one stage"""
+
+    __slots__ = ('latencies', 'requests', 'failures', 'down_until')
+
+    def __init__(self):
+        self.latencies = deque(maxlen=ROUTER_WINDOW)
+        self.requests = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    def p95(self):
+        """95th percentile latency in seconds, None before the first request"""
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+
+class BackendRouter(SpeechBackend):
+    """Cheapest-that-meets-latency routing over several backends
+
+    budgets_ms maps a stage to its latency budget. A backend qualifies for a
+    stage while its p95 over the last ROUTER_WINDOW requests is within the
+    budget (an unmeasured backend qualifies); the cheapest qualifying one
+    is used, and the fastest one when none qualifies. Every PROBE_INTERVAL
+    requests a cheaper backend that is over budget gets one request, so it
+    is routed to again once it recovers. A backend that raises
+    is skipped for FAILURE_COOLDOWN seconds and the request is retried on
+    the next candidate. Synthesized audio is resampled to the router's
+    tts_sample_rate (that of the cheapest TTS backend). ASR, MT and TTS
+    must each have a backend; language identification is optional
+    (supports(STAGE_LID) tells whether any backend offers it).
+    """
+
+    name = 'router'
+
+    def __init__(self, backends, budgets_ms=None):
+        super().__init__()
+        self.backends = list(backends)
+        self.budgets = {stage: ms / 1000.0 for stage, ms in (budgets_ms or {}).items() if ms}
+        self.routes = {(backend.name, stage): _Route() for backend in self.backends for stage in ROUTED_STAGES}
+        for stage in ROUTED_STAGES:
+            if any(backend.supports(stage) for backend in self.backends):
+                self.costs[stage] = min(backend.costs[stage] for backend in self.backends if backend.supports(stage))
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(ROUTED_STAGES, 0)
+        self.load_times = {}
+
+    def start(self):
+        """Start every backend, recording start-up times (plus per-model ones where known)"""
+        for backend in self.backends:
+            started = time.monotonic()
+            backend.start()
+            self.load_times[backend.name] = time.monotonic() - started
+            self.load_times.update(getattr(backend, 'load_times', {}))
+        missing = [stage for stage in STAGES if not self.supports(stage)]
+        if missing:
+            raise RuntimeError(f"No backend for {', '.join(missing)}")
+
+    def stop(self):
+        """Stop every backend"""
+        for backend in self.backends:
+            backend.stop()
+        super().stop()
+
+    @property
+    def device(self):
+        """'cuda' if any backend runs on the GPU"""
+        return 'cuda' if any(backend.device == 'cuda' for backend in self.backends) else 'cpu'
+
+    @property
+    def tts_sample_rate(self):
+        """Output rate of the cheapest TTS backend"""
+        return self.candidates(STAGE_TTS)[0].tts_sample_rate
+
+    @property
+    def tts_voice(self):
+        """Voice of the cheapest TTS backend (where TTS is routed normally)"""
+        return self.candidates(STAGE_TTS)[0].tts_voice
+
+    def candidates(self, stage):
+        """Backends serving a stage, cheapest first"""
+        return sorted((backend for backend in self.backends if backend.supports(stage)),
+                      key=lambda backend: backend.costs[stage])
+
+    def choose(self, stage, exclude=()):
+        """Backend for the next request of a stage"""
+        now = time.monotonic()
+        budget = self.budgets.get(stage)
+        with self._lock:
+            usable = [backend for backend in self.candidates(stage)
+                      if backend not in exclude and self.routes[(backend.name, stage)].down_until <= now]
+            if not usable:
+                usable = [backend for backend in self.candidates(stage) if backend not in exclude]
+            if not usable:
+                raise RuntimeError(f"No {stage} backend available")
+            measured = [(self.routes[(backend.name, stage)].p95(), backend) for backend in usable]
+            self._counts[stage] += 1
+            probe = self._counts[stage] % PROBE_INTERVAL == 0
+        for p95, backend in measured:
+            if p95 is None or budget is None or p95 <= budget:
+                return backend
+            if probe:
+                return backend
+        return min(measured, key=lambda item: item[0])[1]
+
+    def _call(self, stage, *args):
+        """Route one request, retrying once on another backend if it fails"""
+        method = _STAGE_METHODS[stage]
+        tried = []
+        while True:
+            backend = self.choose(stage, exclude=tried)
+            route = self.routes[(backend.name, stage)]
+            started = time.monotonic()
+            try:
+                result = getattr(backend, method)(*args)
+            except Exception as e:
+                with self._lock:
+                    route.requests += 1
+                    route.failures += 1
+                    route.down_until = time.monotonic() + FAILURE_COOLDOWN
+                tried.append(backend)
+                if len(tried) > 1 or len(self.candidates(stage)) < 2:
+                    raise
+                logger.warning(f"{backend.name} {stage} failed ({e}), retrying on another backend")
+                continue
+            with self._lock:
+                route.requests += 1
+                route.latencies.append(time.monotonic() - started)
+            return backend, result
+
+    def transcribe(self, audio, language, degraded=False):
+        """16 kHz float32 audio -> text"""
+        return self._call(STAGE_ASR, audio, language, degraded)[1]
+
+    def translate(self, text, source_lang, target_lang):
+        """Text -> translated text, or None while the model is loading"""
+        return self._call(STAGE_MT, text, source_lang, target_lang)[1]
+
+    def synthesize(self, text, language):
+        """Text -> float32 audio at the router's tts_sample_rate"""
+        backend, audio = self._call(STAGE_TTS, text, language)
+        audio = np.asarray(audio, dtype=np.float32)
+        if backend.tts_sample_rate != self.tts_sample_rate:
+            audio = resample(audio, backend.tts_sample_rate, self.tts_sample_rate)
+        return audio
+
+    def detect_language(self, audio, candidates=None):
+        """16 kHz float32 audio -> (language, probability)"""
+        return self._call(STAGE_LID, audio, candidates)[1]
+
+    def prepare(self, source_lang, target_lang):
+        """Prewarm the pair on every MT backend (any of them may be routed to)"""
+        for backend in self.candidates(STAGE_MT):
+            backend.prepare(source_lang, target_lang)
+
+    def get_stats(self):
+        """Per backend statistics plus routing counters (keys shared with InferenceWorkerPool)"""
+        stats = {'workers': 0, 'ready': 0, 'in_flight': 0, 'requests': 0, 'failures': 0,
+                 'retries': 0, 'restarts': 0, 'served': [], 'backends': {}, 'routes': {}}
+        for backend in self.backends:
+            backend_stats = backend.get_stats()
+            stats['backends'][backend.name] = backend_stats
+            for key in ('workers', 'ready', 'in_flight', 'retries', 'restarts'):
+                stats[key] += backend_stats.get(key, 0)
+            stats['served'].extend(backend_stats.get('served', []))
+        with self._lock:
+            for (name, stage), route in self.routes.items():
+                if not route.requests:
+                    continue
+                p95 = route.p95()
+                stats['routes'][f"{name}/{stage}"] = {
+                    'requests': route.requests,
+                    'failures': route.failures,
+                    'p95_ms': p95 * 1000.0 if p95 is not None else 0.0,
+                }
+                stats['requests'] += route.requests
+                stats['failures'] += route.failures
+        return stats
+
+
+def parse_costs(spec):
+    """'azure=5,models=1' -> {'azure': 5.0, 'models': 1.0}"""
+    costs = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, value = item.split('=', 1)
+            costs[name.strip()] = float(value)
+    return costs
+
+
+def create_backend(name, config, cost=None):
+    """Build (not start) one backend by name: stub | models | azure | azure-emulator
+
+    config holds the DEFAULT_CONFIG keys; local models run in worker
+    processes when config['inference_processes'] > 0.
+    """
+    cost = DEFAULT_COSTS.get(name, 1.0) if cost is None else cost
+    if name == 'stub':
+        from stub_backend import StubBackend
+        return StubBackend(asr_ms=config.get('stub_asr_ms', 150), mt_ms=config.get('stub_mt_ms', 50),
+                           tts_ms=config.get('stub_tts_ms', 100), lid_ms=config.get('stub_lid_ms', 50),
+                           language=config.get('stub_language', 'en'), cost=cost)
+    if name == 'models':
+        if config.get('inference_processes', 0) > 0:
+            import torch
+
+            from worker_pool import InferenceWorkerPool
+            gpus = list(range(torch.cuda.device_count())) if torch.cuda.is_available() else []
+            return InferenceWorkerPool(config['inference_processes'], config, gpus=gpus, cost=cost)
+        from inference_worker import InferenceBackend
+        return InferenceBackend(config, cost=cost)
+    if name in ('azure', 'azure-emulator'):
+        from azure_backend import AzureBackend
+        return AzureBackend(
+            speech_key=config.get('azure_speech_key'),
+            speech_region=config.get('azure_speech_region'),
+            translator_key=config.get('azure_translator_key'),
+            translator_region=config.get('azure_translator_region'),
+            emulate=name == 'azure-emulator',
+            cost=cost
+        )
+    raise ValueError(f"Unknown inference backend: {name}")
+
+
+def create_router(names, config, costs=None, budgets_ms=None):
+    """BackendRouter over the named backends (comma separated or a list)"""
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    costs = costs or {}
+    config = dict(DEFAULT_CONFIG, **config)
+    return BackendRouter([create_backend(name, config, costs.get(name)) for name in names], budgets_ms)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Throughput vs latency report for cross-call Whisper batching
+Runs N concurrent "calls" that each submit 2-second chunks to a WhisperBatcher
+and sweeps batch size / window settings.
+
+Usage: python3 benchmarks/bench_asr_batching.py [--model base] [--calls 30]
+       [--wav sample-16k.wav] [--batch-sizes 1,4,8,16] [--windows 0,25,50,100]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+import whisper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr_batcher import WhisperBatcher  # noqa: E402
+from metrics import summarize_latencies  # noqa: E402
+
+
+def load_chunk(path):
+    """2 seconds of 16 kHz mono float32 audio (WAV file or synthetic tone)"""
+    if path:
+        with wave.open(path, 'rb') as wav:
+            if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise SystemExit("WAV must be 16 kHz mono 16-bit")
+            frames = wav.readframes(32000)
+        return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+    t = np.arange(32000) / 16000.0
+    return (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def run(model, chunk, calls, chunks_per_call, batch_size, window_ms, language):
+    """Run one configuration; returns (chunks/sec, latency summary, avg batch)"""
+    batcher = WhisperBatcher(model, max_batch_size=batch_size, window_ms=window_ms)
+    batcher.start()
+    latencies = []
+    lock = threading.Lock()
+
+    def call():
+        for _ in range(chunks_per_call):
+            started = time.monotonic()
+            batcher.transcribe(chunk, language)
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    threads = [threading.Thread(target=call) for _ in range(calls)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    stats = batcher.get_stats()
+    batcher.stop()
+    return len(latencies) / elapsed, summarize_latencies(latencies), stats['avg_batch_size']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.getenv('WHISPER_MODEL', 'base'))
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--wav', default=None)
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--calls', type=int, default=30)
+    parser.add_argument('--chunks-per-call', type=int, default=4)
+    parser.add_argument('--batch-sizes', default='1,4,8,16')
+    parser.add_argument('--windows', default='0,25,50,100')
+    args = parser.parse_args()
+
+    model = whisper.load_model(args.model, device=args.device)
+    chunk = load_chunk(args.wav)
+
+    # Warm up kernels / allocator before measuring
+    run(model, chunk, 2, 1, 2, 10, args.language)
+
+    print(f"model={args.model} device={model.device} calls={args.calls} "
+          f"chunks/call={args.chunks_per_call}")
+    print(f"{'batch':>5} {'window':>7} {'avg_batch':>9} {'chunks/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for batch_size in [int(v) for v in args.batch_sizes.split(',')]:
+        for window_ms in [int(v) for v in args.windows.split(',')]:
+            throughput, latency, avg_batch = run(
+                model, chunk, args.calls, args.chunks_per_call, batch_size, window_ms, args.language
+            )
+            print(f"{batch_size:>5} {window_ms:>5}ms {avg_batch:>9.2f} {throughput:>9.2f} "
+                  f"{latency['p50']:>9.1f} {latency['p99']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for translation-service-production.py
+Replays audio as N concurrent paced RTP streams (20 ms PCMU frames) to the
+service's port range, receives the translated RTP it sends back and
+reports throughput, end-to-end latency percentiles, packet loss and the
+service's CPU / GPU use for each call count.
+
+--spawn starts the service itself on 127.0.0.1 with the stub backend
+(fixed-latency fake ASR/MT/TTS, stub_backend.py), so the IO path can be
+measured on a plain CPU box without models or network. Without --spawn the
+service must already run; its replies arrive on RTP port + 1, which is
+where each stream's socket is bound.
+
+Latency of an utterance is measured from its first frame sent (ttfa) and
+from its last speech frame sent (eos) to the first translated audio frame
+received on the same call.
+
+Usage: python3 benchmarks/bench_load.py --spawn [--calls 10,50,100] [--duration 30]
+       [--stub-ms 150,50,100] [--wav speech-8k.wav | --pcmu speech.ul]
+       python3 benchmarks/bench_load.py --host 127.0.0.1 --base-port 4000 --calls 50
+       [--service-pid 1234] [--metrics-url http://127.0.0.1:9108/metrics]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import selectors
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import wave
+from collections import deque
+
+import numpy as np
+
+SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICES_DIR)
+
+import g711  # noqa: E402
+from resample import resample  # noqa: E402
+from rtp import RTPPacket  # noqa: E402
+
+FRAME_SAMPLES = 160
+FRAME_INTERVAL = FRAME_SAMPLES / 8000.0
+
+# Frame classification: speech in the replayed audio, translated audio in replies
+SPEECH_DBFS = -40.0
+REPLY_AUDIO_RMS = 300
+HANGOVER_FRAMES = 20  # 400 ms of silence ends an utterance
+ONSET_SILENCE_FRAMES = 10  # Reply talkspurt starts after >= 200 ms without audio
+MATCH_WINDOW = 20.0  # Utterances older than this without a reply count as unanswered
+
+
+def synthetic_frames(seconds=30.0, speech=1.2, pause=1.8):
+    """Tone bursts standing in for speech: PCMU frames"""
+    t = np.arange(int(seconds * 8000)) / 8000.0
+    voice = 0.15 * np.sin(2 * np.pi * 300 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    voice[(t % (speech + pause)) >= speech] = 0.0
+    return split_frames(g711.linear_to_pcmu(voice.astype(np.float32)))
+
+
+def load_frames(wav_path=None, pcmu_path=None):
+    """PCMU frames of the audio to replay"""
+    if pcmu_path:
+        with open(pcmu_path, 'rb') as f:
+            return split_frames(f.read())
+    if not wav_path:
+        return synthetic_frames()
+
+    with wave.open(wav_path, 'rb') as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise SystemExit("WAV must be mono 16-bit")
+        rate = wav.getframerate()
+        audio = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+    if rate != 8000:
+        audio = resample(audio, rate, 8000)
+    return split_frames(g711.linear_to_pcmu(audio))
+
+
+def split_frames(pcmu):
+    """Whole 20 ms frames"""
+    count = len(pcmu) // FRAME_SAMPLES
+    if not count:
+        raise SystemExit("Audio shorter than one frame")
+    return [pcmu[i * FRAME_SAMPLES:(i + 1) * FRAME_SAMPLES] for i in range(count)]
+
+
+def find_utterances(frames):
+    """(start, end) frame indices of speech runs, end being the last speech frame"""
+    speech = []
+    for frame in frames:
+        samples = g711.pcmu_to_linear(frame)
+        level = 10.0 * np.log10(float(np.dot(samples, samples)) / len(samples) + 1e-12)
+        speech.append(level > SPEECH_DBFS)
+
+    utterances, start, last = [], None, None
+    for i, active in enumerate(speech):
+        if active:
+            if start is None:
+                start = i
+            last = i
+        elif start is not None and i - last >= HANGOVER_FRAMES:
+            utterances.append((start, last))
+            start = None
+    if start is not None:
+        utterances.append((start, last))
+    return utterances
+
+
+def rtcp_bye(ssrc):
+    """RTCP BYE for one SSRC"""
+    return struct.pack('!BBHI', 0x81, 203, 1, ssrc)
+
+
+class Stream:
+    """One simulated call: a socket on service port + 1, sending and receiving"""
+
+    def __init__(self, index, host, service_port, bind_ip, offset):
+        self.index = index
+        self.dest = (host, service_port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((bind_ip, service_port + 1))
+        self.sock.setblocking(False)
+
+        self.ssrc = random.getrandbits(32)
+        self.sequence = random.getrandbits(16)
+        self.timestamp = random.getrandbits(32)
+        self.position = offset
+
+        self.pending = deque()  # [start, end] per utterance sent and not answered yet
+        self.sent = 0
+
+        self.received = 0
+        self.audio_frames = 0
+        self.first_seq = None
+        self.highest_seq = None  # Extended (wrap-counted) sequence number
+        self.silent_frames = ONSET_SILENCE_FRAMES
+        self.ttfa = []
+        self.eos = []
+        self.unmatched = 0
+        self.unanswered = 0
+
+    def receive(self, data, now):
+        """Account for one reply packet"""
+        packet = RTPPacket.parse(data)
+        if packet is None or packet['version'] != 2:
+            return
+        self.received += 1
+
+        sequence = packet['sequence']
+        if self.first_seq is None:
+            self.first_seq = self.highest_seq = sequence
+        else:
+            delta = (sequence - self.highest_seq) & 0xFFFF
+            if delta < 0x8000:
+                self.highest_seq += delta
+
+        samples = g711.decode(packet['payload'], packet['payload_type']).astype(np.float32)
+        if np.sqrt(np.dot(samples, samples) / max(len(samples), 1)) < REPLY_AUDIO_RMS:
+            self.silent_frames += 1
+            return
+
+        self.audio_frames += 1
+        if self.silent_frames >= ONSET_SILENCE_FRAMES:
+            self.match(now)
+        self.silent_frames = 0
+
+    def match(self, now):
+        """A reply talkspurt started: attribute it to the oldest pending utterance"""
+        while self.pending and now - self.pending[0][0] > MATCH_WINDOW:
+            self.pending.popleft()
+            self.unanswered += 1
+        if not self.pending:
+            self.unmatched += 1
+            return
+        start, end = self.pending.popleft()
+        self.ttfa.append(now - start)
+        if end is not None:
+            self.eos.append(now - end)
+
+    @property
+    def expected(self):
+        """Reply packets the service sent according to the sequence numbers"""
+        return 0 if self.first_seq is None else self.highest_seq - self.first_seq + 1
+
+
+class LoadGenerator:
+    """Paced senders and a receiver for a set of streams"""
+
+    def __init__(self, streams, frames, utterances):
+        self.streams = streams
+        self.frames = frames
+        self.starts = {start: end for start, end in utterances}
+        self.ends = {end for _, end in utterances}
+        self.talking = True
+        self.running = False
+        self.ticks = 0
+        self.late_ticks = 0
+
+    def _send_tick(self, now):
+        """One frame per stream"""
+        silence = bytes([g711.SILENCE_BYTE[g711.PAYLOAD_TYPE_PCMU]]) * FRAME_SAMPLES
+        count = len(self.frames)
+        for stream in self.streams:
+            position = stream.position % count
+            if self.talking:
+                payload = self.frames[position]
+                if position in self.starts:
+                    stream.pending.append([now, None])
+                if position in self.ends and stream.pending and stream.pending[-1][1] is None:
+                    stream.pending[-1][1] = now
+                stream.position += 1
+            else:
+                payload = silence  # Draining: keep the call up, no new utterances
+
+            packet = RTPPacket.create(payload, stream.sequence, stream.timestamp, stream.ssrc,
+                                      payload_type=g711.PAYLOAD_TYPE_PCMU, marker=stream.sent == 0)
+            try:
+                stream.sock.sendto(packet, stream.dest)
+            except OSError:
+                pass
+            stream.sent += 1
+            stream.sequence = (stream.sequence + 1) & 0xFFFF
+            stream.timestamp = (stream.timestamp + FRAME_SAMPLES) & 0xFFFFFFFF
+
+    def _send(self):
+        """Sender thread: absolute 20 ms deadlines"""
+        deadline = time.monotonic()
+        while self.running:
+            now = time.monotonic()
+            if now - deadline > FRAME_INTERVAL:
+                self.late_ticks += 1
+            if now - deadline > 5 * FRAME_INTERVAL:
+                deadline = now
+            self._send_tick(now)
+            self.ticks += 1
+            deadline += FRAME_INTERVAL
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _receive(self):
+        """Receiver thread: every stream socket in one selector"""
+        selector = selectors.DefaultSelector()
+        for stream in self.streams:
+            selector.register(stream.sock, selectors.EVENT_READ, stream)
+        while self.running:
+            for key, _ in selector.select(timeout=0.1):
+                stream = key.data
+                while True:
+                    try:
+                        data = stream.sock.recv(2048)
+                    except (BlockingIOError, OSError):
+                        break
+                    stream.receive(data, time.monotonic())
+        selector.close()
+
+    def run(self, duration, drain):
+        """Send for duration seconds, then silence for drain seconds"""
+        self.running = True
+        threads = [threading.Thread(target=self._send, daemon=True),
+                   threading.Thread(target=self._receive, daemon=True)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        self.talking = False
+        time.sleep(drain)
+        self.running = False
+        for thread in threads:
+            thread.join()
+
+        for stream in self.streams:
+            try:
+                stream.sock.sendto(rtcp_bye(stream.ssrc), stream.dest)
+            except OSError:
+                pass
+            stream.unanswered += len(stream.pending)
+            stream.sock.close()
+
+
+def process_tree(pid):
+    """pid and its direct children (worker processes)"""
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, ValueError, IndexError):
+                continue
+    return pids
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process tree"""
+    total = 0.0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+class GPUSampler:
+    """nvidia-smi utilization / memory samples once per second"""
+
+    def __init__(self):
+        self.available = shutil.which('nvidia-smi') is not None
+        self.samples = []
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            try:
+                output = subprocess.run(
+                    ['nvidia-smi', '--query-gpu=utilization.gpu,memory.used', '--format=csv,noheader,nounits'],
+                    capture_output=True, text=True, timeout=5
+                ).stdout
+                rows = [[float(v) for v in line.split(',')] for line in output.strip().splitlines()]
+                if rows:
+                    self.samples.append((sum(r[0] for r in rows) / len(rows), sum(r[1] for r in rows)))
+            except (OSError, ValueError, subprocess.SubprocessError):
+                pass
+            time.sleep(1.0)
+
+    def start(self):
+        if self.available:
+            self.running = True
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """(mean utilization %, max memory MB) or None"""
+        self.running = False
+        if not self.samples:
+            return None
+        return sum(s[0] for s in self.samples) / len(self.samples), max(s[1] for s in self.samples)
+
+
+def scrape_stages(url):
+    """{stage: (sum seconds, count)} from translation_stage_seconds on /metrics"""
+    stages = {}
+    try:
+        text = urllib.request.urlopen(url, timeout=5).read().decode()
+    except OSError:
+        return stages
+    for kind, stage, value in re.findall(r'^translation_stage_seconds_(sum|count)\{stage="(\w+)"\} (\S+)$', text, re.M):
+        total, count = stages.get(stage, (0.0, 0.0))
+        stages[stage] = (total + float(value), count) if kind == 'sum' else (total, count + float(value))
+    return stages
+
+
+def percentiles(values):
+    """p50 / p95 / p99 / max in milliseconds"""
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    values = np.asarray(values) * 1000.0
+    return {'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+            'p99': float(np.percentile(values, 99)), 'max': float(values.max())}
+
+
+def spawn_service(args, max_calls, workdir):
+    """Start the production service with the stub backend; returns the Popen"""
+    asr_ms, mt_ms, tts_ms = args.stub_ms.split(',')
+    ready_file = os.path.join(workdir, 'ready.json')
+    env = dict(
+        os.environ,
+        INFERENCE_BACKEND='stub',
+        STUB_ASR_MS=asr_ms,
+        STUB_MT_MS=mt_ms,
+        STUB_TTS_MS=tts_ms,
+        RTP_LISTEN_IP=args.host,
+        RTP_BASE_PORT=str(args.base_port),
+        MAX_CONCURRENT_CALLS=str(max_calls),
+        METRICS_PORT=str(args.metrics_port),
+        LOG_DIR=workdir,
+        READY_FILE=ready_file,
+        PHRASE_CACHE_PATH='',
+    )
+    log = open(os.path.join(workdir, 'service.out'), 'w')
+    service = subprocess.Popen(
+        [sys.executable, os.path.join(SERVICES_DIR, 'translation-service-production.py')],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.monotonic() + 60
+    while not os.path.exists(ready_file):
+        if service.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit(f"Service did not start, see {workdir}/service.out")
+        time.sleep(0.2)
+    time.sleep(0.5)  # Let the RTP engine finish binding
+    return service
+
+
+def run_step(args, calls, frames, utterances, pid, metrics_url):
+    """One load level; returns the report row"""
+    idle = sorted({end + HANGOVER_FRAMES for _, end in utterances if end + HANGOVER_FRAMES < len(frames)}) or [0]
+    streams = [
+        Stream(i, args.host, args.base_port + 2 * i, args.bind_ip, random.choice(idle))
+        for i in range(calls)
+    ]
+    generator = LoadGenerator(streams, frames, utterances)
+
+    stages_before = scrape_stages(metrics_url) if metrics_url else {}
+    cpu_before = cpu_seconds(pid) if pid else None
+    gpu = GPUSampler()
+    gpu.start()
+    started = time.monotonic()
+
+    generator.run(args.duration, args.drain)
+
+    elapsed = time.monotonic() - started
+    cpu = (cpu_seconds(pid) - cpu_before) / elapsed * 100.0 if pid else None
+    gpu_usage = gpu.stop()
+    stages_after = scrape_stages(metrics_url) if metrics_url else {}
+
+    ttfa = [v for s in streams for v in s.ttfa]
+    eos = [v for s in streams for v in s.eos]
+    expected = sum(s.expected for s in streams)
+    received = sum(s.received for s in streams)
+    answered = len(ttfa)
+    stages = {}
+    for stage, (total, count) in stages_after.items():
+        before_total, before_count = stages_before.get(stage, (0.0, 0.0))
+        if count > before_count:
+            stages[stage] = (total - before_total) / (count - before_count) * 1000.0
+
+    return {
+        'calls': calls,
+        'sent_pps': sum(s.sent for s in streams) / elapsed,
+        'received_pps': received / elapsed,
+        'loss_pct': (expected - received) / expected * 100.0 if expected else 0.0,
+        'utterances': answered + sum(s.unanswered for s in streams),
+        'answered': answered,
+        'unmatched': sum(s.unmatched for s in streams),
+        'utterances_per_s': answered / elapsed,
+        'ttfa_ms': percentiles(ttfa),
+        'eos_ms': percentiles(eos),
+        'cpu_pct': cpu,
+        'gpu': gpu_usage,
+        'stage_mean_ms': stages,
+        'sender_late_ticks': generator.late_ticks,
+    }
+
+
+def print_row(row):
+    """One line per load level plus the per-stage breakdown"""
+    cpu = f"{row['cpu_pct']:.0f}%" if row['cpu_pct'] is not None else '-'
+    gpu = f"{row['gpu'][0]:.0f}%/{row['gpu'][1]:.0f}MB" if row['gpu'] else '-'
+    print(f"{row['calls']:>5} {row['sent_pps']:>8.0f} {row['received_pps']:>8.0f} {row['loss_pct']:>6.2f}% "
+          f"{row['answered']:>5}/{row['utterances']:<5} {row['utterances_per_s']:>6.2f} "
+          f"{row['ttfa_ms']['p50']:>7.0f} {row['ttfa_ms']['p99']:>7.0f} "
+          f"{row['eos_ms']['p50']:>7.0f} {row['eos_ms']['p95']:>7.0f} {row['eos_ms']['p99']:>7.0f} "
+          f"{cpu:>6} {gpu:>12}")
+    if row['stage_mean_ms']:
+        print('      stage mean ms: ' + ', '.join(f"{k} {v:.3f}" for k, v in sorted(row['stage_mean_ms'].items())))
+    if row['sender_late_ticks']:
+        print(f"      load generator fell behind on {row['sender_late_ticks']} ticks; results understate capacity")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--bind-ip', default='0.0.0.0')
+    parser.add_argument('--base-port', type=int, default=int(os.getenv('RTP_BASE_PORT', '4000')))
+    parser.add_argument('--calls', default='10,50,100')
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--drain', type=float, default=5.0)
+    parser.add_argument('--wav', default=None)
+    parser.add_argument('--pcmu', default=None)
+    parser.add_argument('--spawn', action='store_true')
+    parser.add_argument('--stub-ms', default='150,50,100', help='ASR,MT,TTS latency of the stub backend')
+    parser.add_argument('--metrics-port', type=int, default=9108)
+    parser.add_argument('--metrics-url', default=None)
+    parser.add_argument('--service-pid', type=int, default=None)
+    parser.add_argument('--json', default=None, help='Also write the results to this file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.wav, args.pcmu)
+    utterances = find_utterances(frames)
+    if not utterances:
+        raise SystemExit("No speech found in the audio")
+    levels = [int(v) for v in args.calls.split(',')]
+
+    service = None
+    workdir = tempfile.mkdtemp(prefix='bench-load-')
+    pid = args.service_pid
+    metrics_url = args.metrics_url
+    if args.spawn:
+        service = spawn_service(args, max(levels), workdir)
+        pid = service.pid
+        metrics_url = metrics_url or f"http://{args.host}:{args.metrics_port}/metrics"
+
+    print(f"audio: {len(frames) * FRAME_INTERVAL:.1f}s loop, {len(utterances)} utterances; "
+          f"{args.duration:.0f}s per level + {args.drain:.0f}s drain"
+          f"{'; stub backend ' + args.stub_ms + ' ms' if args.spawn else ''}")
+    print(f"{'calls':>5} {'tx pps':>8} {'rx pps':>8} {'loss':>7} {'answered':>11} {'utt/s':>6} "
+          f"{'ttfa50':>7} {'ttfa99':>7} {'eos50':>7} {'eos95':>7} {'eos99':>7} {'cpu':>6} {'gpu':>12}")
+    results = []
+    try:
+        for calls in levels:
+            row = run_step(args, calls, frames, utterances, pid, metrics_url)
+            results.append(row)
+            print_row(row)
+            time.sleep(1.0)  # Let the service process the BYEs
+    finally:
+        if service is not None:
+            service.send_signal(signal.SIGINT)
+            try:
+                service.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                service.kill()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Sentences/sec for cross-call MarianMT batching
+Runs N concurrent "calls" that each translate a few sentences through a
+TranslationBatcher and sweeps call count / batch size.
+
+Usage: python3 benchmarks/bench_mt_batching.py [--pair en-es] [--calls 20,50,100]
+       [--batch-sizes 1,8,16,32] [--window 20] [--beams 1]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import torch
+from transformers import MarianMTModel, MarianTokenizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import summarize_latencies  # noqa: E402
+from mt_batcher import TranslationBatcher  # noqa: E402
+
+SENTENCES = [
+    "Hello, how can I help you today?",
+    "I would like to check the status of my order.",
+    "Can you repeat the last number, please?",
+    "The technician will arrive between nine and eleven tomorrow morning.",
+    "Thank you for calling, have a nice day.",
+    "My internet connection has been dropping every few minutes since yesterday.",
+]
+
+
+def run(tokenizer, model, pair, calls, sentences_per_call, batch_size, window_ms, beams):
+    """Run one configuration; returns (sentences/sec, latency summary, avg batch)"""
+    batcher = TranslationBatcher(
+        lambda source, target: (tokenizer, model),
+        max_batch_size=batch_size,
+        window_ms=window_ms,
+        num_beams=beams
+    )
+    batcher.start()
+    latencies = []
+    lock = threading.Lock()
+
+    def call(index):
+        for i in range(sentences_per_call):
+            text = SENTENCES[(index + i) % len(SENTENCES)]
+            started = time.monotonic()
+            batcher.translate(text, *pair)
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(calls)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    stats = batcher.get_stats()
+    batcher.stop()
+    return len(latencies) / elapsed, summarize_latencies(latencies), stats['avg_batch_size']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pair', default='en-es')
+    parser.add_argument('--device', default='cuda' if torch.cuda.is_available() else 'cpu')
+    parser.add_argument('--calls', default='20,50,100')
+    parser.add_argument('--sentences-per-call', type=int, default=4)
+    parser.add_argument('--batch-sizes', default='1,8,16,32')
+    parser.add_argument('--window', type=int, default=20)
+    parser.add_argument('--beams', type=int, default=1)
+    args = parser.parse_args()
+
+    model_name = f"Helsinki-NLP/opus-mt-{args.pair}"
+    tokenizer = MarianTokenizer.from_pretrained(model_name)
+    model = MarianMTModel.from_pretrained(model_name).to(args.device).eval()
+    pair = tuple(args.pair.split('-'))
+
+    # Warm up kernels / allocator before measuring
+    run(tokenizer, model, pair, 2, 1, 2, 10, args.beams)
+
+    print(f"model={model_name} device={args.device} beams={args.beams} "
+          f"window={args.window}ms sentences/call={args.sentences_per_call}")
+    print(f"{'calls':>5} {'batch':>5} {'avg_batch':>9} {'sent/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for calls in [int(v) for v in args.calls.split(',')]:
+        for batch_size in [int(v) for v in args.batch_sizes.split(',')]:
+            throughput, latency, avg_batch = run(
+                tokenizer, model, pair, calls, args.sentences_per_call,
+                batch_size, args.window, args.beams
+            )
+            print(f"{calls:>5} {batch_size:>5} {avg_batch:>9.2f} {throughput:>9.2f} "
+                  f"{latency['p50']:>9.1f} {latency['p99']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
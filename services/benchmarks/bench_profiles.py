@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Accuracy / latency comparison of model execution profiles (precision.py)
+Transcribes a fixed local audio corpus with Whisper and translates its
+reference transcripts with MarianMT under each profile, and reports word
+error rate, per-item latency, real-time factor and weight memory, so a
+profile can be picked per deployment (WHISPER_PROFILE / MT_PROFILE).
+
+Corpus layout (one directory, any number of items):
+    call-001.wav      mono 16-bit PCM, any sample rate (8 kHz phone audio is fine)
+    call-001.txt      reference transcript in the source language
+    call-001.es.txt   optional reference translation for --pair en-es;
+                      without it MT accuracy is measured against fp32 output
+
+Usage: python3 benchmarks/bench_profiles.py --corpus ./corpus [--model base]
+       [--pair en-es] [--profiles fp32,fp16,int8,ctranslate2] [--device cuda]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import summarize_latencies  # noqa: E402
+from model_cache import load_whisper  # noqa: E402
+from mt_batcher import generate_translations  # noqa: E402
+from phrase_cache import normalize  # noqa: E402
+from precision import (PROFILE_CTRANSLATE2, FasterWhisperTranscriber, apply_profile,  # noqa: E402
+                       model_bytes, resolve_profile)
+from resample import resample  # noqa: E402
+
+
+def load_corpus(path, target_lang):
+    """[(name, 16 kHz float32 audio, reference transcript, reference translation or None)]"""
+    items = []
+    for wav_path in sorted(glob.glob(os.path.join(path, '*.wav'))):
+        base = wav_path[:-4]
+        if not os.path.exists(base + '.txt'):
+            continue
+        with wave.open(wav_path, 'rb') as wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise SystemExit(f"{wav_path}: WAV must be mono 16-bit")
+            rate = wav.getframerate()
+            audio = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+        if rate != 16000:
+            audio = resample(audio, rate, 16000)
+        with open(base + '.txt') as f:
+            transcript = f.read().strip()
+        translation = None
+        if os.path.exists(f"{base}.{target_lang}.txt"):
+            with open(f"{base}.{target_lang}.txt") as f:
+                translation = f.read().strip()
+        items.append((os.path.basename(base), audio, transcript, translation))
+    if not items:
+        raise SystemExit(f"No .wav/.txt pairs in {path}")
+    return items
+
+
+def word_errors(reference, hypothesis):
+    """(word edit distance, reference length) after normalization"""
+    ref, hyp = normalize(reference).split(), normalize(hypothesis).split()
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1], len(ref)
+
+
+def wer(pairs):
+    """Corpus word error rate over (reference, hypothesis) pairs"""
+    errors = words = 0
+    for reference, hypothesis in pairs:
+        e, n = word_errors(reference, hypothesis)
+        errors += e
+        words += n
+    return errors / words if words else 0.0
+
+
+def bench_asr(items, model_name, profile, device, language):
+    """(WER, latency summary, real-time factor, weight MB) for one Whisper profile"""
+    if profile == PROFILE_CTRANSLATE2:
+        transcriber = FasterWhisperTranscriber(model_name, device=device, workers=1)
+        transcribe = transcriber.transcribe
+        weights_mb = float('nan')
+    else:
+        model = load_whisper(model_name, device=device, profile=profile)
+        fp16 = device == "cuda"
+        weights_mb = model_bytes(model) / 1e6
+
+        def transcribe(audio, language):
+            return model.transcribe(audio, language=language, fp16=fp16)["text"].strip()
+
+    transcribe(items[0][1], language)  # Warm up kernels / allocator
+
+    latencies, pairs, audio_seconds = [], [], 0.0
+    for _, audio, reference, _ in items:
+        started = time.perf_counter()
+        text = transcribe(audio, language)
+        latencies.append(time.perf_counter() - started)
+        pairs.append((reference, text))
+        audio_seconds += len(audio) / 16000.0
+    return wer(pairs), summarize_latencies(latencies), sum(latencies) / audio_seconds, weights_mb
+
+
+def bench_mt(sentences, pair, profile, device):
+    """(outputs, latency summary, weight MB) for one MarianMT profile"""
+    from transformers import MarianMTModel, MarianTokenizer
+
+    name = f"Helsinki-NLP/opus-mt-{pair}"
+    tokenizer = MarianTokenizer.from_pretrained(name)
+    model = apply_profile(MarianMTModel.from_pretrained(name).to(device), profile)
+
+    generate_translations(tokenizer, model, sentences[:1])  # Warm up
+    outputs, latencies = [], []
+    for sentence in sentences:
+        started = time.perf_counter()
+        outputs.append(generate_translations(tokenizer, model, [sentence])[0])
+        latencies.append(time.perf_counter() - started)
+    return outputs, summarize_latencies(latencies), model_bytes(model) / 1e6
+
+
+def profiles_for(requested, device, allow_ctranslate2):
+    """Requested profiles that actually run on this device (no silent substitutions)"""
+    runnable = []
+    for profile in requested:
+        if resolve_profile(profile, device, allow_ctranslate2) == profile:
+            runnable.append(profile)
+        else:
+            print(f"skipping {profile}: not available on {device}")
+    return runnable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', required=True)
+    parser.add_argument('--model', default=os.getenv('WHISPER_MODEL', 'base'))
+    parser.add_argument('--pair', default='en-es')
+    parser.add_argument('--device', default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument('--profiles', default='fp32,fp16,int8,ctranslate2')
+    parser.add_argument('--skip-mt', action='store_true')
+    args = parser.parse_args()
+
+    source_lang, target_lang = args.pair.split('-')
+    items = load_corpus(args.corpus, target_lang)
+    requested = [p.strip() for p in args.profiles.split(',') if p.strip()]
+    audio_seconds = sum(len(item[1]) for item in items) / 16000.0
+    print(f"corpus={args.corpus} items={len(items)} audio={audio_seconds:.0f}s device={args.device}")
+
+    print(f"\nWhisper {args.model}")
+    print(f"{'profile':>12} {'WER':>7} {'p50 ms':>9} {'p99 ms':>9} {'RTF':>7} {'weights MB':>11}")
+    for profile in profiles_for(requested, args.device, allow_ctranslate2=True):
+        error_rate, latency, rtf, weights_mb = bench_asr(items, args.model, profile, args.device, source_lang)
+        print(f"{profile:>12} {error_rate:>7.1%} {latency['p50']:>9.1f} {latency['p99']:>9.1f} "
+              f"{rtf:>7.3f} {weights_mb:>11.0f}")
+        if args.device == "cuda":
+            torch.cuda.empty_cache()
+
+    if args.skip_mt:
+        return
+
+    sentences = [item[2] for item in items]
+    references = [item[3] for item in items]
+    baseline = None
+    print(f"\nMarianMT {args.pair} (WER against reference translations where present, else fp32 output)")
+    print(f"{'profile':>12} {'WER':>7} {'p50 ms':>9} {'p99 ms':>9} {'weights MB':>11}")
+    mt_profiles = profiles_for(requested, args.device, allow_ctranslate2=False)
+    if 'fp32' in mt_profiles:
+        mt_profiles.remove('fp32')
+    for profile in ['fp32'] + mt_profiles:
+        outputs, latency, weights_mb = bench_mt(sentences, args.pair, profile, args.device)
+        if baseline is None:
+            baseline = outputs
+        pairs = [(reference or expected, output) for reference, expected, output in zip(references, baseline, outputs)]
+        print(f"{profile:>12} {wer(pairs):>7.1%} {latency['p50']:>9.1f} {latency['p99']:>9.1f} {weights_mb:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
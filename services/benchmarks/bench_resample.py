@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Resampler throughput: polyphase FIR vs np.repeat
+Reports input samples/sec for whole-utterance and streaming (20 ms block) use.
+
+Usage: python3 benchmarks/bench_resample.py [--seconds 10] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resample import PolyphaseResampler  # noqa: E402
+
+
+def measure(fn, samples, repeat):
+    """Best-of-N input samples/sec"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return samples / best
+
+
+def streaming(resampler, signal, block):
+    """Feed a signal through a resampler in fixed-size blocks"""
+    def run():
+        resampler.reset()
+        for start in range(0, len(signal), block):
+            resampler.process(signal[start:start + block])
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = []
+
+    # ASR input: 8 kHz -> 16 kHz
+    audio_8k = rng.standard_normal(int(8000 * args.seconds)).astype(np.float32) * 0.1
+    up = PolyphaseResampler(8000, 16000)
+    rows.append(("8k->16k np.repeat (utterance)",
+                 measure(lambda: np.repeat(audio_8k, 2), len(audio_8k), args.repeat)))
+    rows.append(("8k->16k polyphase (utterance)",
+                 measure(lambda: (up.reset(), up.process(audio_8k)), len(audio_8k), args.repeat)))
+    rows.append(("8k->16k polyphase (20 ms blocks)",
+                 measure(streaming(up, audio_8k, 160), len(audio_8k), args.repeat)))
+
+    # TTS output: 22.05 kHz / 24 kHz -> 8 kHz
+    for rate in (22050, 24000):
+        audio = rng.standard_normal(int(rate * args.seconds)).astype(np.float32) * 0.1
+        down = PolyphaseResampler(rate, 8000)
+        rows.append((f"{rate / 1000:g}k->8k polyphase (utterance)",
+                     measure(lambda: (down.reset(), down.process(audio)), len(audio), args.repeat)))
+        rows.append((f"{rate / 1000:g}k->8k polyphase (20 ms blocks)",
+                     measure(streaming(down, audio, rate // 50), len(audio), args.repeat)))
+
+    print(f"{'path':<36} {'samples/s':>14} {'x realtime':>11}")
+    for name, rate in rows:
+        source_rate = 8000 if name.startswith('8k') else float(name.split('k')[0]) * 1000
+        print(f"{name:<36} {rate:>14,.0f} {rate / source_rate:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Packets/sec of RTP parsing: the original dict parser vs rtp.parse_rtp
+- parse only: the same datagram parsed repeatedly
+- receive + parse: datagrams sent over loopback UDP by another process,
+  received with recvfrom(2048) + dict parse vs recvfrom_into a
+  preallocated buffer + parse_rtp (packets/s of receiver busy time)
+Also checks that CSRCs, header extensions and padding are stripped from
+the payload (the dict parser returns them as audio).
+
+Usage: python3 benchmarks/bench_rtp_parse.py [--packets 1000000] [--udp-packets 200000]
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rtp import RTPPacket, RTPReceiver, parse_rtp  # noqa: E402
+
+PAYLOAD = bytes(range(160))
+
+
+def legacy_parse(data):
+    """RTPPacket.parse as it was: dict per packet, payload copied, CC/X/P ignored"""
+    if len(data) < 12:
+        return None
+
+    header = struct.unpack('!BBHII', data[:12])
+    return {
+        'version': (header[0] >> 6) & 0x03,
+        'payload_type': header[1] & 0x7F,
+        'sequence': header[2],
+        'timestamp': header[3],
+        'ssrc': header[4],
+        'payload': data[12:]
+    }
+
+
+def tricky_packet():
+    """Two CSRCs, a one-word header extension and 4 bytes of padding around PAYLOAD"""
+    header = struct.pack('!BBHII', 0x80 | 0x20 | 0x10 | 2, 0, 1, 160, 0x1234)
+    csrcs = struct.pack('!II', 1, 2)
+    extension = struct.pack('!HH', 0xBEDE, 1) + b'\x10\xAA\x00\x00'
+    return header + csrcs + extension + PAYLOAD + b'\x00\x00\x00\x04'
+
+
+def rate(fn, data, count):
+    """Calls per second of fn(data)"""
+    started = time.perf_counter()
+    for _ in range(count):
+        fn(data)
+    return count / (time.perf_counter() - started)
+
+
+def _send(addr, packet, count):
+    """Sender process: count datagrams, yielding now and then so loopback does not overflow"""
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for i in range(count):
+        sender.sendto(packet, addr)
+        if i % 64 == 0:
+            time.sleep(0.0001)
+    sender.close()
+
+
+def udp_rate(count, zero_copy):
+    """Packets/sec received and parsed over loopback UDP (sender in another process)"""
+    receiver_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+    receiver_sock.bind(('127.0.0.1', 0))
+    receiver_sock.settimeout(1.0)
+    packet = RTPPacket.create(PAYLOAD, 1, 160, 0x1234)
+    received = 0
+    busy = 0.0  # Time spent receiving + parsing, excluding waits for the sender
+
+    sender = multiprocessing.Process(target=_send, args=(receiver_sock.getsockname(), packet, count))
+    sender.start()
+    try:
+        if zero_copy:
+            rtp_receiver = RTPReceiver(receiver_sock)
+            rtp_receiver.receive_rtp()
+            while received < count - 1:
+                started = time.perf_counter()
+                rtp_receiver.receive_rtp()
+                busy += time.perf_counter() - started
+                received += 1
+        else:
+            receiver_sock.recvfrom(2048)
+            while received < count - 1:
+                started = time.perf_counter()
+                data, _ = receiver_sock.recvfrom(2048)
+                legacy_parse(data)
+                busy += time.perf_counter() - started
+                received += 1
+    except socket.timeout:
+        pass  # Some datagrams were dropped by the kernel
+    sender.join()
+    receiver_sock.close()
+    return received / busy if busy else 0.0, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--packets', type=int, default=1000000)
+    parser.add_argument('--udp-packets', type=int, default=200000)
+    args = parser.parse_args()
+
+    tricky = tricky_packet()
+    legacy_payload = legacy_parse(tricky)['payload']
+    parsed = parse_rtp(tricky)
+    print(f"CC/X/P packet payload: dict parser {len(legacy_payload)} bytes "
+          f"({'corrupted' if legacy_payload != PAYLOAD else 'ok'}), "
+          f"parse_rtp {len(parsed.payload)} bytes ({'ok' if bytes(parsed.payload) == PAYLOAD else 'WRONG'})")
+
+    packet = RTPPacket.create(PAYLOAD, 1, 160, 0x1234)
+    view = memoryview(bytearray(packet))
+    print(f"\n{'parse only':<34} {'packets/s':>12}")
+    for name, fn, data in (
+        ('dict, bytes (original)', legacy_parse, packet),
+        ('RTPPacket.parse (dict, fixed)', RTPPacket.parse, packet),
+        ('parse_rtp, bytes', parse_rtp, packet),
+        ('parse_rtp, memoryview', parse_rtp, view),
+    ):
+        print(f"{name:<34} {rate(fn, data, args.packets):>12,.0f}")
+
+    print(f"\n{'receive + parse (loopback UDP)':<34} {'packets/s':>12} {'received':>10}")
+    for name, zero_copy in (('recvfrom(2048) + dict', False), ('recvfrom_into + parse_rtp', True)):
+        pps, received = udp_rate(args.udp_packets, zero_copy)
+        print(f"{name:<34} {pps:>12,.0f} {received:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the translation service's heavy dependencies
+Each step runs in a fresh interpreter so nothing is already imported or
+cached in memory: import time of torch / whisper / TTS, and Whisper load
+time via whisper.load_model vs the safetensors cache (model_cache.py; fp16
+weights for --profile fp16, fp32 otherwise, conversion to the profile
+included).
+
+Usage: python3 benchmarks/bench_startup.py [--model large-v2] [--profile fp16]
+       [--cache-dir /var/cache/translation-models] [--device cuda] [--repeat 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = {
+    'import torch': "import torch",
+    'import whisper': "import whisper",
+    'import TTS.api': "from TTS.api import TTS",
+    'import transformers.pipeline': "from transformers import pipeline",
+}
+
+WHISPER_LOAD = """
+import time
+started = time.perf_counter()
+import whisper
+whisper.load_model({model!r}, device={device!r})
+print(time.perf_counter() - started)
+"""
+
+CACHED_LOAD = """
+import sys, time
+sys.path.insert(0, {services!r})
+started = time.perf_counter()
+from model_cache import load_whisper
+load_whisper({model!r}, device={device!r}, cache_dir={cache_dir!r}, profile={profile!r})
+print(time.perf_counter() - started)
+"""
+
+
+def timed(code):
+    """Seconds reported by a snippet run in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def best(code, repeat):
+    """Best of N fresh-interpreter runs"""
+    return min(timed(code) for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.getenv('WHISPER_MODEL', 'base'))
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--profile', default='fp32', choices=('fp32', 'fp16', 'int8'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='model-cache-')
+    rows = []
+
+    for name, statement in IMPORTS.items():
+        code = f"import time\nstarted = time.perf_counter()\n{statement}\nprint(time.perf_counter() - started)"
+        try:
+            rows.append((name, best(code, args.repeat)))
+        except subprocess.CalledProcessError:
+            rows.append((name, None))
+
+    rows.append((f"whisper.load_model({args.model})",
+                 best(WHISPER_LOAD.format(model=args.model, device=args.device), args.repeat)))
+
+    cached = CACHED_LOAD.format(services=SERVICES_DIR, model=args.model, device=args.device, cache_dir=cache_dir,
+                                profile=args.profile)
+    rows.append((f"first load via cache ({args.model})", timed(cached)))  # Fills an empty cache
+    rows.append((f"cached load ({args.model})", best(cached, args.repeat)))
+
+    print(f"model={args.model} device={args.device or 'auto'} profile={args.profile} cache={cache_dir}")
+    print(f"{'step':<36} {'seconds':>9}")
+    for name, seconds in rows:
+        print(f"{name:<36} {'n/a' if seconds is None else f'{seconds:.2f}':>9}")
+
+
+if __name__ == "__main__":
+    main()
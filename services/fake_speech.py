@@ -0,0 +1,329 @@
+"""
+Local stand-in for the parts of the Azure Speech SDK used by
+translation-service.py and azure_backend.py
+- Same names, event signals and callback arguments as
+  azure.cognitiveservices.speech (SpeechConfig, SpeechRecognizer,
+  SpeechSynthesizer, translation.SpeechTranslationConfig,
+  translation.TranslationRecognizer, audio.PushAudioInputStream /
+  AudioStreamFormat / AudioConfig, ResultReason, CancellationReason), so
+  the calling code is identical against either
+- Recognition is an energy VAD over the pushed PCM; each utterance fires
+  recognizing / recognized with deterministic text (and translation), then
+  for translation synthesizing with a WAV two-tone "voice" and an empty
+  completion event
+- translate_text() stands in for the Translator REST API
+- Every result costs ROUND_TRIP_MS, like a call to the cloud service
+- Callbacks run on the recognizer's own thread, fed by stream writes
+- Needs no network, credentials or SDK (SPEECH_BACKEND=fake,
+  INFERENCE_BACKEND=azure-emulator)
+"""
+
+import io
+import itertools
+import logging
+import queue
+import threading
+import time
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+
+from vad import VADSegmenter, create_vad
+
+logger = logging.getLogger(__name__)
+
+SYNTHESIS_SAMPLE_RATE = 16000  # The SDK's translation synthesis output is 16 kHz 16-bit mono WAV
+WORDS_PER_SECOND = 2.5
+SECONDS_PER_WORD = 0.3
+TONE_LEVEL = 0.25
+PARTIAL_INTERVAL_MS = 500  # Audio between recognizing events within an utterance
+ROUND_TRIP_MS = 150  # Simulated service latency per result
+
+_CLOSED = object()  # Stream queue marker: writer closed the stream
+_STOP = object()  # Stream queue marker: recognition stopped
+
+
+class ResultReason:
+    """Subset of speechsdk.ResultReason"""
+    NoMatch = 0
+    Canceled = 1
+    RecognizingSpeech = 2
+    RecognizedSpeech = 3
+    TranslatingSpeech = 6
+    TranslatedSpeech = 7
+    SynthesizingAudio = 8
+    SynthesizingAudioCompleted = 9
+
+
+class CancellationReason:
+    """Subset of speechsdk.CancellationReason"""
+    Error = 1
+    EndOfStream = 2
+
+
+class EventSignal:
+    """Callbacks connected to one recognizer event"""
+
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        """Call callback(evt) on every event"""
+        self._callbacks.append(callback)
+
+    def disconnect_all(self):
+        """Drop all callbacks"""
+        self._callbacks = []
+
+    def fire(self, evt):
+        """Invoke callbacks; exceptions are logged like the SDK does, not raised"""
+        for callback in list(self._callbacks):
+            try:
+                callback(evt)
+            except Exception as e:
+                logger.error(f"Speech event callback failed: {e}")
+
+
+class SpeechSynthesisOutputFormat:
+    """Subset of speechsdk.SpeechSynthesisOutputFormat"""
+    Raw16Khz16BitMonoPcm = 'raw-16khz-16bit-mono-pcm'
+
+
+class SpeechConfig:
+    """Recognition language, voice and output format; credentials are accepted and ignored"""
+
+    def __init__(self, subscription=None, region=None, **kwargs):
+        self.speech_recognition_language = 'en-US'
+        self.speech_synthesis_language = 'en-US'
+        self.speech_synthesis_voice_name = ''
+        self.output_format = SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm
+
+    def set_speech_synthesis_output_format(self, output_format):
+        """Only raw 16 kHz 16-bit PCM is produced"""
+        if output_format != SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm:
+            raise ValueError(f"Fake synthesizer does not produce {output_format}")
+        self.output_format = output_format
+
+
+class SpeechTranslationConfig:
+    """Languages and voice; credentials are accepted and ignored"""
+
+    def __init__(self, subscription=None, region=None, **kwargs):
+        self.speech_recognition_language = 'en-US'
+        self.target_languages = []
+        self.voice_name = ''
+
+    def add_target_language(self, language):
+        """Translate into language (short code, e.g. 'es')"""
+        if language not in self.target_languages:
+            self.target_languages.append(language)
+
+
+class AudioStreamFormat:
+    """PCM format of a push stream"""
+
+    def __init__(self, samples_per_second=16000, bits_per_sample=16, channels=1):
+        if bits_per_sample != 16 or channels != 1:
+            raise ValueError("Fake recognizer supports 16-bit mono PCM only")
+        self.samples_per_second = samples_per_second
+        self.bits_per_sample = bits_per_sample
+        self.channels = channels
+
+
+class PushAudioInputStream:
+    """Audio pushed by the caller; write() never blocks"""
+
+    def __init__(self, stream_format=None):
+        self.format = stream_format or AudioStreamFormat()
+        self._queue = queue.Queue()
+
+    def write(self, buffer):
+        """Append PCM bytes"""
+        self._queue.put(bytes(buffer))
+
+    def close(self):
+        """End of audio: recognition finishes and reports EndOfStream"""
+        self._queue.put(_CLOSED)
+
+
+class AudioConfig:
+    """Audio input of a recognizer"""
+
+    def __init__(self, stream=None, **kwargs):
+        if stream is None:
+            raise ValueError("Fake recognizer needs a push stream")
+        self.stream = stream
+
+
+class _Recognizer:
+    """Continuous recognition over a push stream with the SDK's event signals"""
+
+    partial_reason = ResultReason.RecognizingSpeech
+    final_reason = ResultReason.RecognizedSpeech
+
+    def __init__(self, config, audio_config, latency_ms=ROUND_TRIP_MS):
+        self.config = config
+        self.stream = audio_config.stream
+        self.latency = latency_ms / 1000.0  # Per utterance, like a round trip to the service
+
+        self.session_started = EventSignal()
+        self.session_stopped = EventSignal()
+        self.recognizing = EventSignal()
+        self.recognized = EventSignal()
+        self.synthesizing = EventSignal()
+        self.canceled = EventSignal()
+
+        self.session_id = f"fake-{id(self):x}"
+        self._ids = itertools.count()
+        self._thread = None
+
+    def start_continuous_recognition(self):
+        """Start recognizing on a background thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="fake-recognizer", daemon=True)
+        self._thread.start()
+
+    def stop_continuous_recognition(self):
+        """Stop and wait for session_stopped"""
+        if self._thread is None:
+            return
+        self.stream._queue.put(_STOP)
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def start_continuous_recognition_async(self):
+        """Same as start_continuous_recognition; .get() on the result returns at once"""
+        self.start_continuous_recognition()
+        return SimpleNamespace(get=lambda: None)
+
+    def stop_continuous_recognition_async(self):
+        """Same as stop_continuous_recognition"""
+        self.stop_continuous_recognition()
+        return SimpleNamespace(get=lambda: None)
+
+    def _run(self):
+        """Consume the stream until it is closed or recognition is stopped"""
+        rate = self.stream.format.samples_per_second
+        segmenter = VADSegmenter(create_vad(sample_rate=rate), sample_rate=rate)
+        partial_samples = rate * PARTIAL_INTERVAL_MS // 1000
+        last_partial = 0
+
+        self.session_started.fire(SimpleNamespace(session_id=self.session_id))
+        while True:
+            buffer = self.stream._queue.get()
+            if buffer is _STOP:
+                break
+            if buffer is _CLOSED:
+                for segment in segmenter.flush():
+                    self._utterance(segment, rate)
+                self.canceled.fire(SimpleNamespace(
+                    session_id=self.session_id,
+                    reason=CancellationReason.EndOfStream,
+                    error_details='',
+                    cancellation_details=SimpleNamespace(reason=CancellationReason.EndOfStream, error_details=''),
+                ))
+                break
+
+            samples = np.frombuffer(buffer, dtype='<i2').astype(np.float32) / 32768.0
+            for segment in segmenter.feed(samples):
+                last_partial = 0
+                self._utterance(segment, rate)
+            if segmenter.partial_samples - last_partial >= partial_samples:
+                last_partial = segmenter.partial_samples
+                self._fire_result(self.recognizing, self.partial_reason, self._words(last_partial / rate, 'partial'))
+        self.session_stopped.fire(SimpleNamespace(session_id=self.session_id))
+
+    def _words(self, seconds, tag):
+        """Deterministic text: one word per 1/WORDS_PER_SECOND of speech"""
+        return f"{tag} " + ' '.join(['word'] * max(1, int(seconds * WORDS_PER_SECOND)))
+
+    def _fire_result(self, signal, reason, text):
+        """Fire a recognition event with the text 'translated' into every target"""
+        translations = {language: f"[{language}] {text}" for language in getattr(self.config, 'target_languages', ())}
+        result = SimpleNamespace(reason=reason, text=text, translations=translations)
+        signal.fire(SimpleNamespace(session_id=self.session_id, result=result))
+        return translations
+
+    def _utterance(self, segment, rate):
+        """Final result for one utterance, then its synthesized audio (translation only)"""
+        time.sleep(self.latency)
+        text = self._words(len(segment) / rate, f"utterance {next(self._ids)}")
+        translations = self._fire_result(self.recognized, self.final_reason, text)
+
+        if getattr(self.config, 'voice_name', '') and translations:
+            spoken = next(iter(translations.values()))
+            audio = SimpleNamespace(reason=ResultReason.SynthesizingAudio, audio=_tone_wav(len(spoken.split())))
+            self.synthesizing.fire(SimpleNamespace(session_id=self.session_id, result=audio))
+            done = SimpleNamespace(reason=ResultReason.SynthesizingAudioCompleted, audio=b'')
+            self.synthesizing.fire(SimpleNamespace(session_id=self.session_id, result=done))
+
+
+class SpeechRecognizer(_Recognizer):
+    """Speech-to-text recognizer"""
+
+    def __init__(self, speech_config, audio_config, latency_ms=ROUND_TRIP_MS):
+        super().__init__(speech_config, audio_config, latency_ms)
+
+
+class TranslationRecognizer(_Recognizer):
+    """Speech translation recognizer (with synthesis when voice_name is set)"""
+
+    partial_reason = ResultReason.TranslatingSpeech
+    final_reason = ResultReason.TranslatedSpeech
+
+    def __init__(self, translation_config, audio_config, latency_ms=ROUND_TRIP_MS):
+        super().__init__(translation_config, audio_config, latency_ms)
+
+
+class SpeechSynthesizer:
+    """Text-to-speech into memory (audio_config=None)"""
+
+    def __init__(self, speech_config, audio_config=None, latency_ms=ROUND_TRIP_MS):
+        self.config = speech_config
+        self.latency = latency_ms / 1000.0
+
+    def speak_text_async(self, text):
+        """Future-like object; get() returns the result with raw PCM audio_data"""
+        def get():
+            time.sleep(self.latency)
+            return SimpleNamespace(reason=ResultReason.SynthesizingAudioCompleted,
+                                   audio_data=_tone_pcm(len(text.split())).tobytes())
+        return SimpleNamespace(get=get)
+
+
+def translate_text(texts, source_lang, target_lang):
+    """Translator REST API stand-in: one round trip for the whole list"""
+    time.sleep(ROUND_TRIP_MS / 1000.0)
+    return [f"[{target_lang}] {text}" for text in texts]
+
+
+def _tone_pcm(words):
+    """16 kHz 16-bit samples of a two-tone signal lasting SECONDS_PER_WORD per word"""
+    t = np.arange(int(words * SECONDS_PER_WORD * SYNTHESIS_SAMPLE_RATE), dtype=np.float32) / SYNTHESIS_SAMPLE_RATE
+    tone = TONE_LEVEL * 0.5 * (np.sin(2 * np.pi * 300 * t) + np.sin(2 * np.pi * 700 * t))
+    return (tone * 32767).astype('<i2')
+
+
+def _tone_wav(words):
+    """_tone_pcm as a 16 kHz mono WAV file"""
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SYNTHESIS_SAMPLE_RATE)
+        wav.writeframes(_tone_pcm(words).tobytes())
+    return out.getvalue()
+
+
+# Mirror the SDK's module layout (speechsdk.audio.*, speechsdk.translation.*)
+audio = SimpleNamespace(
+    AudioStreamFormat=AudioStreamFormat,
+    PushAudioInputStream=PushAudioInputStream,
+    AudioConfig=AudioConfig,
+)
+translation = SimpleNamespace(
+    SpeechTranslationConfig=SpeechTranslationConfig,
+    TranslationRecognizer=TranslationRecognizer,
+)
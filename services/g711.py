@@ -0,0 +1,143 @@
+"""
+G.711 codec (PCMU / PCMA) shared by the translation services
+- Table driven: 256-entry decode tables, 64K-entry encode tables
+- Vectorized with NumPy fancy indexing (no per-sample Python loops)
+- Bit-exact with the ITU-T G.711 / G.191 reference implementation
+"""
+
+import numpy as np
+
+# RTP static payload types (RFC 3551)
+PAYLOAD_TYPE_PCMU = 0
+PAYLOAD_TYPE_PCMA = 8
+PAYLOAD_TYPES = (PAYLOAD_TYPE_PCMU, PAYLOAD_TYPE_PCMA)
+
+_SIGN_BIT = 0x80
+_QUANT_MASK = 0x0F
+_SEG_SHIFT = 4
+_SEG_MASK = 0x70
+
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_ULAW_SEG_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+_ALAW_SEG_END = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF], dtype=np.int32)
+
+
+def _build_ulaw_decode_table():
+    """256-entry μ-law -> int16 table"""
+    u_val = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = ((u_val & _QUANT_MASK) << 3) + _ULAW_BIAS
+    t <<= (u_val & _SEG_MASK) >> _SEG_SHIFT
+    return np.where(u_val & _SIGN_BIT, _ULAW_BIAS - t, t - _ULAW_BIAS).astype(np.int16)
+
+
+def _build_alaw_decode_table():
+    """256-entry A-law -> int16 table"""
+    a_val = np.arange(256, dtype=np.int32) ^ 0x55
+    t = (a_val & _QUANT_MASK) << 4
+    seg = (a_val & _SEG_MASK) >> _SEG_SHIFT
+    t = np.where(seg == 0, t + 8, t + 0x108)
+    t = np.where(seg > 1, t << np.maximum(seg - 1, 0), t)
+    return np.where(a_val & _SIGN_BIT, t, -t).astype(np.int16)
+
+
+def _build_ulaw_encode_table():
+    """64K-entry int16 -> μ-law table, indexed by the sample's uint16 bit pattern"""
+    pcm_val = np.arange(65536, dtype=np.int32).astype(np.uint16).view(np.int16).astype(np.int32)
+    pcm_val >>= 2
+    mask = np.where(pcm_val < 0, 0x7F, 0xFF)
+    pcm_val = np.minimum(np.abs(pcm_val), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    seg = np.searchsorted(_ULAW_SEG_END, pcm_val)
+    uval = (seg << _SEG_SHIFT) | ((pcm_val >> (seg + 1)) & _QUANT_MASK)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    return (uval ^ mask).astype(np.uint8)
+
+
+def _build_alaw_encode_table():
+    """64K-entry int16 -> A-law table, indexed by the sample's uint16 bit pattern"""
+    pcm_val = np.arange(65536, dtype=np.int32).astype(np.uint16).view(np.int16).astype(np.int32)
+    pcm_val >>= 3
+    mask = np.where(pcm_val >= 0, 0xD5, 0x55)
+    pcm_val = np.where(pcm_val >= 0, pcm_val, -pcm_val - 1)
+    seg = np.searchsorted(_ALAW_SEG_END, pcm_val)
+    shift = np.where(seg < 2, 1, seg)
+    aval = (seg << _SEG_SHIFT) | ((pcm_val >> np.minimum(shift, 7)) & _QUANT_MASK)
+    aval = np.where(seg >= 8, 0x7F, aval)
+    return (aval ^ mask).astype(np.uint8)
+
+
+ULAW_DECODE_TABLE = _build_ulaw_decode_table()
+ALAW_DECODE_TABLE = _build_alaw_decode_table()
+ULAW_ENCODE_TABLE = _build_ulaw_encode_table()
+ALAW_ENCODE_TABLE = _build_alaw_encode_table()
+
+_DECODE_TABLES = {
+    PAYLOAD_TYPE_PCMU: ULAW_DECODE_TABLE,
+    PAYLOAD_TYPE_PCMA: ALAW_DECODE_TABLE,
+}
+_ENCODE_TABLES = {
+    PAYLOAD_TYPE_PCMU: ULAW_ENCODE_TABLE,
+    PAYLOAD_TYPE_PCMA: ALAW_ENCODE_TABLE,
+}
+
+# Encoded digital silence for each payload type
+SILENCE_BYTE = {
+    PAYLOAD_TYPE_PCMU: 0xFF,
+    PAYLOAD_TYPE_PCMA: 0xD5,
+}
+
+
+def decode(data, payload_type=PAYLOAD_TYPE_PCMU):
+    """Decode G.711 bytes to int16 samples"""
+    table = _DECODE_TABLES.get(payload_type)
+    if table is None:
+        raise ValueError(f"Unsupported G.711 payload type: {payload_type}")
+    return table[np.frombuffer(data, dtype=np.uint8)]
+
+
+def encode(samples, payload_type=PAYLOAD_TYPE_PCMU):
+    """Encode int16 samples to G.711 bytes"""
+    table = _ENCODE_TABLES.get(payload_type)
+    if table is None:
+        raise ValueError(f"Unsupported G.711 payload type: {payload_type}")
+    samples = np.asarray(samples, dtype=np.int16)
+    return table[samples.view(np.uint16)].tobytes()
+
+
+def to_linear(data, payload_type=PAYLOAD_TYPE_PCMU):
+    """Decode G.711 bytes to float32 samples in [-1.0, 1.0)"""
+    return decode(data, payload_type).astype(np.float32) / 32768.0
+
+
+def from_linear(linear_data, payload_type=PAYLOAD_TYPE_PCMU):
+    """Encode float samples in [-1.0, 1.0) to G.711 bytes"""
+    linear_data = np.asarray(linear_data, dtype=np.float32)
+    samples = np.clip(linear_data * 32768.0, -32768, 32767).astype(np.int16)
+    return encode(samples, payload_type)
+
+
+def pcmu_to_linear(pcmu_data):
+    """Convert PCMU to linear PCM"""
+    return to_linear(pcmu_data, PAYLOAD_TYPE_PCMU)
+
+
+def linear_to_pcmu(linear_data):
+    """Convert linear PCM to PCMU"""
+    return from_linear(linear_data, PAYLOAD_TYPE_PCMU)
+
+
+def pcma_to_linear(pcma_data):
+    """Convert PCMA to linear PCM"""
+    return to_linear(pcma_data, PAYLOAD_TYPE_PCMA)
+
+
+def linear_to_pcma(linear_data):
+    """Convert linear PCM to PCMA"""
+    return from_linear(linear_data, PAYLOAD_TYPE_PCMA)
+
+
+def transcode(data, from_payload_type, to_payload_type):
+    """Convert G.711 bytes between PCMU and PCMA"""
+    if from_payload_type == to_payload_type:
+        return bytes(data)
+    return encode(decode(data, from_payload_type), to_payload_type)
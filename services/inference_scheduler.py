@@ -0,0 +1,216 @@
+"""
+Bounded inference scheduler for per-call audio chunks
+- Fixed pool of worker threads (no thread per chunk)
+- Per-session single-flight: a call's chunks are processed in order, one at a time
+- Bounded backlog with an explicit overload policy
+- Queue depth and wait-time metrics
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from metrics import summarize_latencies
+
+logger = logging.getLogger(__name__)
+
+# Overload policies
+POLICY_DROP_OLDEST = 'drop_oldest'  # Discard the oldest queued chunk when the backlog is full
+POLICY_DEGRADE = 'degrade'          # Also run chunks on a smaller model while the backlog is high
+OVERLOAD_POLICIES = (POLICY_DROP_OLDEST, POLICY_DEGRADE)
+
+# Number of recent wait times kept for percentile reporting
+WAIT_SAMPLES = 10000
+
+
+class InferenceScheduler:
+    """Fixed-size worker pool with per-session single-flight
+
+    handler(session, chunk, degraded) runs on a worker thread. `degraded` is
+    True when the degrade policy is active and the backlog was above the
+    degrade threshold when the chunk was picked up.
+    """
+
+    def __init__(self, handler, workers=4, max_backlog=100,
+                 policy=POLICY_DROP_OLDEST, degrade_threshold=0.5):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy: {policy}")
+
+        self.handler = handler
+        self.workers = workers
+        self.max_backlog = max_backlog
+        self.policy = policy
+        self.degrade_backlog = max(1, int(max_backlog * degrade_threshold))
+
+        self._cond = threading.Condition()
+        self._pending = {}       # session -> deque of (chunk, enqueued_at)
+        self._ready = deque()    # sessions with pending chunks and nothing in flight
+        self._in_flight = set()
+        self._closing = {}       # session -> on_done, called once its chunks are finished
+        self._backlog = 0
+        self._threads = []
+        self.running = False
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.degraded = 0
+        self.wait_times = deque(maxlen=WAIT_SAMPLES)
+
+    def start(self):
+        """Start the worker threads"""
+        self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the workers; queued chunks are discarded"""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+        with self._cond:
+            closing, self._closing = self._closing, {}
+        for session, on_done in closing.items():
+            self._finish(session, on_done)
+
+    def submit(self, session, chunk):
+        """Queue a chunk for a session; never blocks"""
+        finished = None
+        with self._cond:
+            if self._backlog >= self.max_backlog:
+                finished = self._drop_oldest()
+
+            pending = self._pending.get(session)
+            if pending is None:
+                pending = self._pending[session] = deque()
+            pending.append((chunk, time.monotonic()))
+            self._backlog += 1
+            self.submitted += 1
+
+            if len(pending) == 1 and session not in self._in_flight:
+                self._ready.append(session)
+                self._cond.notify()
+
+        if finished is not None:
+            self._finish(*finished)
+
+    def discard(self, session):
+        """Drop any queued chunks for a session (e.g. call ended)"""
+        with self._cond:
+            pending = self._pending.pop(session, None)
+            if pending:
+                self._backlog -= len(pending)
+            try:
+                self._ready.remove(session)
+            except ValueError:
+                pass
+
+    def close(self, session, on_done):
+        """Call on_done(session) once a session's queued and in-flight chunks are processed
+
+        For a call that ended (no more chunks will be submitted). Runs
+        on_done right away when nothing is left or the scheduler is stopped
+        (queued chunks are then discarded).
+        """
+        with self._cond:
+            if self.running and (session in self._in_flight or self._pending.get(session)):
+                self._closing[session] = on_done
+                return
+        self.discard(session)
+        self._finish(session, on_done)
+
+    def _finish(self, session, on_done):
+        """Run a close callback (no lock held)"""
+        try:
+            on_done(session)
+        except Exception as e:
+            logger.error(f"[{getattr(session, 'session_id', session)}] Close callback error: {e}")
+
+    def _drop_oldest(self):
+        """Discard the oldest queued chunk across all sessions (lock held)
+
+        Returns (session, on_done) when that was the last chunk of a closed
+        session, for the caller to finish outside the lock.
+        """
+        oldest = None
+        for session, pending in self._pending.items():
+            if pending and (oldest is None or pending[0][1] < self._pending[oldest][0][1]):
+                oldest = session
+        if oldest is None:
+            return
+
+        pending = self._pending[oldest]
+        pending.popleft()
+        self._backlog -= 1
+        self.dropped += 1
+        logger.debug(f"[{getattr(oldest, 'session_id', oldest)}] Inference backlog full, dropped oldest chunk")
+
+        if not pending:
+            del self._pending[oldest]
+            try:
+                self._ready.remove(oldest)
+            except ValueError:
+                pass
+            if oldest in self._closing and oldest not in self._in_flight:
+                return oldest, self._closing.pop(oldest)
+        return None
+
+    def _worker(self):
+        """Worker thread body"""
+        while True:
+            with self._cond:
+                while self.running and not self._ready:
+                    self._cond.wait()
+                if not self.running:
+                    return
+
+                session = self._ready.popleft()
+                chunk, enqueued_at = self._pending[session].popleft()
+                if not self._pending[session]:
+                    del self._pending[session]
+                self._in_flight.add(session)
+                degraded = self.policy == POLICY_DEGRADE and self._backlog >= self.degrade_backlog
+                if degraded:
+                    self.degraded += 1
+                self._backlog -= 1
+
+            self.wait_times.append(time.monotonic() - enqueued_at)
+
+            on_done = None
+            try:
+                self.handler(session, chunk, degraded)
+            except Exception as e:
+                logger.error(f"Inference handler error: {e}")
+            finally:
+                with self._cond:
+                    self.processed += 1
+                    self._in_flight.discard(session)
+                    if self._pending.get(session):
+                        self._ready.append(session)
+                        self._cond.notify()
+                    else:
+                        on_done = self._closing.pop(session, None)
+            if on_done is not None:
+                self._finish(session, on_done)
+
+    def get_stats(self):
+        """Scheduler statistics"""
+        with self._cond:
+            stats = {
+                'queue_depth': self._backlog,
+                'max_backlog': self.max_backlog,
+                'in_flight': len(self._in_flight),
+                'closing': len(self._closing),
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'degraded': self.degraded,
+            }
+        stats.update({f'wait_{k}_ms': v for k, v in summarize_latencies(self.wait_times.copy()).items()})
+        return stats
@@ -0,0 +1,313 @@
+"""
+Inference worker process (child side of worker_pool.InferenceWorkerPool)
+- Pins itself to one GPU (CUDA_VISIBLE_DEVICES) and/or a CPU set before the
+  model libraries are imported
+- Loads Whisper, the MarianMT model pool and Coqui TTS once, in the
+  configured execution profiles (precision.py); the same InferenceBackend
+  serves in process when the service runs without worker processes
+- Serves transcribe / translate / synthesize / detect_language requests
+  (and translation model prewarming) on a few threads so
+  the in-process batchers can group requests from different calls
+- Audio in and out moves through shared-memory rings; only metadata is
+  pickled
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backends import ROUTED_STAGES, SpeechBackend
+from precision import (PROFILE_CTRANSLATE2, PROFILE_FP32, FasterWhisperTranscriber, apply_profile, model_bytes,
+                       resolve_profile)
+from shm_ring import AudioRing, RingFull
+
+logger = logging.getLogger(__name__)
+
+# How long a worker waits for the IO process to drain its output ring
+RESPONSE_RING_WAIT = 5.0
+
+
+class InferenceBackend(SpeechBackend):
+    """Local Whisper / MarianMT / Coqui TTS models (loaded by start())"""
+
+    name = 'models'
+
+    def __init__(self, config, cost=1.0):
+        super().__init__({stage: cost for stage in ROUTED_STAGES})
+        self.config = config
+        self.load_times = {}
+        self.pivots = 0
+
+    @property
+    def tts_voice(self):
+        """The Coqui TTS model"""
+        return f"{self.name}:{self.config['tts_model']}"
+
+    def _timed(self, name, fn, *args, **kwargs):
+        """Run one model load and record how long it took"""
+        started = time.monotonic()
+        result = fn(*args, **kwargs)
+        self.load_times[name] = time.monotonic() - started
+        return result
+
+    def start(self):
+        """Load every model and start the batchers"""
+        import torch
+        from transformers import pipeline
+        from TTS.api import TTS
+
+        from asr_batcher import WhisperBatcher
+        from model_cache import load_whisper
+        from model_pool import ModelPool
+        from mt_batcher import TranslationBatcher
+
+        config = self.config
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if self.device == "cpu":
+            logger.warning("GPU not available! Running on CPU (slow)")
+        else:
+            logger.info(f"Using GPU: {torch.cuda.get_device_name(0)} "
+                        f"({torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB)")
+        self._torch = torch
+        self._pipeline = pipeline
+        self.mt_profile = resolve_profile(config.get('mt_profile', PROFILE_FP32), self.device, allow_ctranslate2=False)
+
+        whisper_profile = resolve_profile(config.get('whisper_profile', PROFILE_FP32), self.device)
+        logger.info(f"Loading Whisper {config['whisper_model']} on {self.device} ({whisper_profile})...")
+        cache_dir = config.get('model_cache_dir')
+        if whisper_profile == PROFILE_CTRANSLATE2:
+            # CTranslate2 schedules concurrent requests itself
+            self.whisper_model = None
+            self.asr_batcher = self._timed(
+                'whisper', FasterWhisperTranscriber,
+                config['whisper_model'], device=self.device, workers=config['asr_batch_size']
+            )
+        else:
+            self.whisper_model = self._timed(
+                'whisper', load_whisper,
+                config['whisper_model'], device=self.device, cache_dir=cache_dir, profile=whisper_profile
+            )
+            # Cross-call batching in front of the main Whisper model
+            self.asr_batcher = WhisperBatcher(
+                self.whisper_model,
+                max_batch_size=config['asr_batch_size'],
+                window_ms=config['asr_batch_window_ms']
+            )
+
+        # Smaller Whisper used while the inference backlog is high
+        self.fallback_whisper_model = None
+        if config.get('fallback_whisper_model'):
+            logger.info(f"Loading fallback Whisper {config['fallback_whisper_model']}...")
+            self.fallback_whisper_model = self._timed(
+                'fallback_whisper', load_whisper,
+                config['fallback_whisper_model'], device=self.device, cache_dir=cache_dir,
+                profile=resolve_profile(config.get('fallback_whisper_profile', PROFILE_FP32), self.device,
+                                        allow_ctranslate2=False)
+            )
+
+        # Translation models: loaded in the background, LRU-evicted within the budget
+        self.translation_models = ModelPool(
+            self._load_translation_model,
+            size_fn=lambda translator: model_bytes(translator.model),
+            unload=self._unload_translation_model,
+            budget_bytes=config['translation_model_budget_mb'] * 1024 * 1024
+        )
+        logger.info(f"Prewarming translation models: {', '.join(config['translation_prewarm_pairs']) or 'none'}")
+        self._timed('translation', self.translation_models.prewarm, config['translation_prewarm_pairs'], wait=True)
+        # Cross-call batching of sentences per language pair
+        self.mt_batcher = TranslationBatcher(
+            self._resolve_translation_model,
+            max_batch_size=config['mt_batch_size'],
+            window_ms=config['mt_batch_window_ms'],
+            num_beams=config['mt_num_beams']
+        )
+
+        logger.info("Loading TTS model...")
+        self.tts = self._timed('tts', TTS, model_name=config['tts_model'], progress_bar=False, gpu=self.device == "cuda")
+        self.tts_sample_rate = self.tts.synthesizer.output_sample_rate
+        logger.info(f"TTS output sample rate: {self.tts_sample_rate} Hz")
+
+        self.asr_batcher.start()
+        self.mt_batcher.start()
+
+    def _load_translation_model(self, key):
+        """Load a MarianMT pipeline for a "src-tgt" key"""
+        translator = self._pipeline(
+            "translation",
+            model=f"Helsinki-NLP/opus-mt-{key}",
+            device=0 if self.device == "cuda" else -1
+        )
+        translator.model = apply_profile(translator.model, self.mt_profile)
+        return translator
+
+    def _unload_translation_model(self, key, translator):
+        """Release memory held by an evicted translation model"""
+        del translator
+        if self.device == "cuda":
+            self._torch.cuda.empty_cache()
+
+    def _resolve_translation_model(self, source_lang, target_lang):
+        """(tokenizer, model) of an already loaded pair for the MT batcher"""
+        translator = self.translation_models.peek(f"{source_lang}-{target_lang}")
+        return (translator.tokenizer, translator.model) if translator is not None else None
+
+    def transcribe(self, audio, language, degraded=False):
+        """16 kHz float32 audio -> text"""
+        if degraded and self.fallback_whisper_model is not None:
+            return self.fallback_whisper_model.transcribe(audio, language=language)["text"].strip()
+        return self.asr_batcher.transcribe(audio, language)
+
+    def translate(self, text, source_lang, target_lang):
+        """Text -> translated text, or None while the model is loading"""
+        wait = self.config['translation_model_wait']
+        if self.translation_models.get(f"{source_lang}-{target_lang}", wait=wait) is not None:
+            return self.mt_batcher.translate(text, source_lang, target_lang)
+
+        # Still loading: pivot through English if both legs are already loaded
+        if (source_lang != 'en' and target_lang != 'en'
+                and self.translation_models.peek(f"{source_lang}-en") is not None
+                and self.translation_models.peek(f"en-{target_lang}") is not None):
+            self.pivots += 1
+            english = self.mt_batcher.translate(text, source_lang, 'en')
+            return self.mt_batcher.translate(english, 'en', target_lang)
+        return None
+
+    def synthesize(self, text, language):
+        """Text -> float32 audio at tts_sample_rate"""
+        return np.asarray(self.tts.tts(text=text, language=language), dtype=np.float32)
+
+    def detect_language(self, audio, candidates=None):
+        """16 kHz float32 audio -> (language, probability) from the main Whisper model"""
+        return self.asr_batcher.detect_language(audio, candidates)
+
+    def prepare(self, source_lang, target_lang):
+        """Start loading the pair's translation model in the background"""
+        if source_lang != target_lang:
+            self.translation_models.prewarm([f"{source_lang}-{target_lang}"])
+
+    def stop(self):
+        """Stop the batchers and loader threads"""
+        if hasattr(self, 'asr_batcher'):
+            self.asr_batcher.stop()
+            self.mt_batcher.stop()
+            self.translation_models.shutdown()
+        super().stop()
+
+    def get_stats(self):
+        """Batcher, translation model pool and pivot statistics"""
+        if not hasattr(self, 'mt_batcher'):
+            return {'workers': 0, 'ready': 0}
+        return {
+            'workers': 1,
+            'ready': 1,
+            'pivots': self.pivots,
+            'asr': self.asr_batcher.get_stats(),
+            'mt': self.mt_batcher.get_stats(),
+            'translation_models': self.translation_models.get_stats(),
+        }
+
+
+def _pin(gpu, cpus):
+    """Restrict this process to one GPU and a CPU set (before importing torch)"""
+    if gpu is not None:
+        os.environ['CUDA_VISIBLE_DEVICES'] = str(gpu)
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+        os.environ['OMP_NUM_THREADS'] = str(len(cpus))
+
+
+def worker_main(index, config, jobs, results, request_ring, response_ring, gpu=None, cpus=None):
+    """Worker process entry point
+
+    jobs carries (request_id, op, args, position, size) tuples, where
+    position/size locate float32 audio in request_ring (or are None).
+    results receives (request_id, ok, value, position, size); audio results
+    are placed in response_ring. request_id None with ok=True announces that
+    the worker is ready.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s'
+    )
+    _pin(gpu, cpus)
+    logger.info(f"Inference worker {index} starting (pid {os.getpid()}, gpu={gpu}, "
+                f"cpus={sorted(cpus) if cpus else 'all'})")
+
+    requests = AudioRing.attach(request_ring)
+    responses = AudioRing.attach(response_ring)
+    response_lock = threading.Lock()
+    parent = os.getppid()
+
+    backend = InferenceBackend(config)
+    backend.start()
+    results.put((None, True, {'tts_sample_rate': backend.tts_sample_rate, 'pid': os.getpid()}, None, 0))
+
+    def run(request_id, op, args, audio):
+        try:
+            if op == 'transcribe':
+                value = backend.transcribe(audio, *args)
+            elif op == 'translate':
+                value = backend.translate(*args)
+            elif op == 'synthesize':
+                value = backend.synthesize(*args)
+            elif op == 'detect_language':
+                value = backend.detect_language(audio, *args)
+            elif op == 'prepare':
+                value = backend.prepare(*args)
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+        except Exception as e:
+            results.put((request_id, False, f"{type(e).__name__}: {e}", None, 0))
+            return
+
+        if isinstance(value, np.ndarray):
+            with response_lock:
+                try:
+                    position = _write_waiting(responses, value)
+                except RingFull as e:
+                    results.put((request_id, False, f"RingFull: {e}", None, 0))
+                    return
+                results.put((request_id, True, None, position, value.nbytes))
+        else:
+            results.put((request_id, True, value, None, 0))
+
+    executor = ThreadPoolExecutor(max_workers=config['worker_threads'], thread_name_prefix=f"worker-{index}")
+    while True:
+        try:
+            message = jobs.get(timeout=1.0)
+        except queue.Empty:
+            if os.getppid() != parent:
+                logger.warning("IO process exited, stopping worker")
+                break
+            continue
+        if message is None:
+            break
+
+        request_id, op, args, position, size = message
+        audio = None
+        if position is not None:
+            audio = np.frombuffer(requests.read(position, size), dtype=np.float32)
+            requests.release(position, size)
+        executor.submit(run, request_id, op, args, audio)
+
+    executor.shutdown(wait=False)
+    backend.stop()
+    requests.close()
+    responses.close()
+
+
+def _write_waiting(ring, array):
+    """Write to a ring, waiting for the consumer to free space"""
+    deadline = time.monotonic() + RESPONSE_RING_WAIT
+    while True:
+        try:
+            return ring.write(np.ascontiguousarray(array, dtype=np.float32))
+        except RingFull:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
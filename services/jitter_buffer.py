@@ -0,0 +1,152 @@
+"""
+Inbound RTP jitter buffer
+- Orders packets by RTP sequence number (16-bit wraparound aware)
+- Drops duplicates and packets that arrive after their slot was played out
+- Waits for reordered packets within an adaptive window, then conceals the gap
+  (one repeat of the previous frame, then silence)
+- Packet driven: in-order packets are released immediately, no timer needed
+- Per-call loss / reorder / late / duplicate counters
+"""
+
+# Sequence jump treated as a stream restart rather than loss
+MAX_SEQUENCE_JUMP = 3000
+
+# Played-out packets remembered for duplicate detection (bitmask width)
+HISTORY_BITS = 64
+HISTORY_MASK = (1 << HISTORY_BITS) - 1
+
+
+class JitterBuffer:
+    """Reorders one call's RTP payloads
+
+    push() returns the payloads that are ready for playout, in sequence
+    order, with concealment frames inserted for lost packets.
+    """
+
+    __slots__ = (
+        'silence_byte', 'min_depth', 'max_depth', 'depth', '_stable',
+        '_packets', '_next', '_highest', '_played', '_last_payload', '_concealed_run',
+        'received', 'duplicates', 'reordered', 'late', 'lost', 'resets',
+    )
+
+    def __init__(self, silence_byte=0xFF, min_depth=2, max_depth=10):
+        self.silence_byte = silence_byte
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.depth = min_depth
+        self._stable = 0
+
+        self._packets = {}  # extended sequence -> payload
+        self._next = None   # extended sequence of the next packet to play
+        self._highest = None
+        self._played = 0    # bit i set: packet _next - 1 - i was played (not concealed)
+        self._last_payload = None
+        self._concealed_run = 0
+
+        self.received = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.late = 0
+        self.lost = 0
+        self.resets = 0
+
+    def push(self, sequence, payload):
+        """Add a packet; returns payloads ready for playout"""
+        self.received += 1
+
+        if self._next is None:
+            self._next = self._highest = sequence
+        else:
+            # Signed 16-bit distance from the next expected packet
+            delta = ((sequence - self._next + 32768) & 0xFFFF) - 32768
+            if abs(delta) > MAX_SEQUENCE_JUMP:
+                ready = self.flush()
+                self.resets += 1
+                self._next = self._highest = sequence
+                self._packets[sequence] = payload
+                return ready + self._release()
+            sequence = self._next + delta
+
+        if sequence < self._next:
+            offset = self._next - 1 - sequence
+            if offset < HISTORY_BITS and (self._played >> offset) & 1:
+                self.duplicates += 1
+            else:
+                # Its slot was already concealed: too late
+                self.late += 1
+                self._grow()
+            return []
+        if sequence in self._packets:
+            self.duplicates += 1
+            return []
+
+        if sequence < self._highest:
+            self.reordered += 1
+            self._grow()
+        else:
+            self._highest = sequence
+            self._shrink()
+
+        self._packets[sequence] = payload
+        return self._release()
+
+    def flush(self):
+        """Release everything still buffered (e.g. at end of call)"""
+        ready = []
+        while self._packets:
+            ready.extend(self._release(force=True))
+        return ready
+
+    def _release(self, force=False):
+        """Play out in-order packets; conceal gaps once the window is exceeded"""
+        ready = []
+        while True:
+            payload = self._packets.pop(self._next, None)
+            if payload is not None:
+                ready.append(payload)
+                self._last_payload = payload
+                self._concealed_run = 0
+                self._played = ((self._played << 1) | 1) & HISTORY_MASK
+            elif self._packets and (force or self._highest - self._next >= self.depth):
+                ready.append(self._conceal())
+                self._played = (self._played << 1) & HISTORY_MASK
+            else:
+                break
+            self._next += 1
+        return ready
+
+    def _conceal(self):
+        """Fill for one lost packet: repeat the previous frame once, then silence"""
+        self.lost += 1
+        self._concealed_run += 1
+        last = self._last_payload
+        if last is None:
+            return bytes([self.silence_byte]) * 160
+        if self._concealed_run == 1:
+            return last
+        return bytes([self.silence_byte]) * len(last)
+
+    def _grow(self):
+        """Network is reordering: wait longer before declaring loss"""
+        self._stable = 0
+        if self.depth < self.max_depth:
+            self.depth += 1
+
+    def _shrink(self):
+        """Slowly return to the minimum window while packets arrive in order"""
+        self._stable += 1
+        if self._stable >= 500 and self.depth > self.min_depth:
+            self.depth -= 1
+            self._stable = 0
+
+    def get_stats(self):
+        """Per-call jitter buffer counters"""
+        return {
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'reordered': self.reordered,
+            'late': self.late,
+            'lost': self.lost,
+            'resets': self.resets,
+            'depth': self.depth,
+        }
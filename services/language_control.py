@@ -0,0 +1,298 @@
+"""
+Per-call language selection for the translation services
+- LanguageDirectory: source / target languages registered for an RTP
+  stream, keyed by the service port it is sent to or by Asterisk's sending
+  address ("ip:port", UNICASTRTP_LOCAL_ADDRESS / UNICASTRTP_LOCAL_PORT of
+  the ExternalMedia channel); source 'auto' means identify it from audio
+- LanguageControlServer: local UDP socket taking one registration per
+  datagram, from the dialplan (System()) or an ARI application, e.g.
+      port=4002 source=auto target=fr
+      {"remote": "10.0.0.5:17230", "source": "de", "target": "en"}
+  and answering "OK" or "ERR <reason>"; a registration by remote address
+  for a stream that is already up changes its languages at once, one by
+  port only waits for the next stream to that port
+- ARIChannelLanguages: reads TRANSLATION_SOURCE_LANG /
+  TRANSLATION_TARGET_LANG from the ExternalMedia (UnicastRTP) channel over
+  the Asterisk REST Interface, for streams nobody registered
+"""
+
+import base64
+import json
+import logging
+import re
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+AUTO = 'auto'  # Source language identified from the caller's audio
+
+# Registrations not picked up by a stream within this long are dropped
+REGISTRATION_TTL = 120.0
+
+# Channel variables read over ARI
+SOURCE_VARIABLE = 'TRANSLATION_SOURCE_LANG'
+TARGET_VARIABLE = 'TRANSLATION_TARGET_LANG'
+
+_LANGUAGE = re.compile(r'^[a-z]{2,3}([-_][A-Za-z0-9]{2,8})?$')
+
+
+def normalize_language(value, allow_auto=False):
+    """'es', 'es-ES' or 'es_ES' -> 'es' ('auto' -> None when allowed); ValueError otherwise
+
+    The models are chosen per language, so regional variants collapse to
+    the language itself ('zh-Hans' -> 'zh').
+    """
+    value = (value or '').strip()
+    if allow_auto and value.lower() == AUTO:
+        return None
+    if not _LANGUAGE.match(value):
+        raise ValueError(f"invalid language: {value!r}")
+    return value[:3].rstrip('-_').lower()
+
+
+def parse_address(value):
+    """'10.0.0.5:17230' -> ('10.0.0.5', 17230)"""
+    host, _, port = str(value).rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"invalid address: {value!r}")
+    return host, int(port)
+
+
+def parse_command(data):
+    """One control datagram (JSON object or key=value words) -> dict"""
+    text = data.decode('utf-8', errors='replace').strip()
+    if text.startswith('{'):
+        command = json.loads(text)
+        if not isinstance(command, dict):
+            raise ValueError("expected a JSON object")
+        return command
+    command = {}
+    for word in text.split():
+        key, sep, value = word.partition('=')
+        if not sep:
+            raise ValueError(f"expected key=value, got {word!r}")
+        command[key.strip().lower()] = value.strip()
+    return command
+
+
+class LanguageDirectory:
+    """Languages registered for RTP streams that have not (all) arrived yet
+
+    register() keeps the pair for REGISTRATION_TTL seconds. A registration by
+    port is claimed by the first new stream to that port (the port is shared
+    with other calls' streams, so it says nothing about them); one by remote
+    address lasts until release() (the call ended). on_update(port, remote,
+    source, target) is called for every registration so a stream that is
+    already up can switch languages; source is None for 'auto'.
+    """
+
+    def __init__(self, ttl=REGISTRATION_TTL, on_update=None):
+        self.ttl = ttl
+        self.on_update = on_update
+        self._entries = {}  # ('port', port) | ('remote', (ip, port)) -> (source, target, expires)
+        self._lock = threading.Lock()
+
+        self.registrations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, source, target, port=None, remote=None):
+        """Languages for the stream sent to port, or sent from remote ((ip, port))"""
+        if port is None and remote is None:
+            raise ValueError("registration needs a port or a remote address")
+        key = ('remote', tuple(remote)) if remote is not None else ('port', int(port))
+        with self._lock:
+            self._purge()
+            self._entries[key] = (source, target, time.monotonic() + self.ttl)
+            self.registrations += 1
+        logger.info(f"Languages for {key[0]} {key[1]}: {source or AUTO} -> {target}")
+        if self.on_update:
+            self.on_update(port, tuple(remote) if remote is not None else None, source, target)
+
+    def lookup(self, port, remote):
+        """(source, target) registered for a new stream, or None
+
+        The sending address is more specific than the port (several calls
+        may share one port, told apart by SSRC) and wins. A port
+        registration is used up by the stream that claims it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in (('remote', tuple(remote)), ('port', port)):
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] > now:
+                    if key[0] == 'port':
+                        del self._entries[key]
+                    self.hits += 1
+                    return entry[0], entry[1]
+            self.misses += 1
+        return None
+
+    def release(self, remote):
+        """Forget the registration of a stream whose call ended
+
+        Only its own: a port registration still pending belongs to the next
+        call on that port.
+        """
+        with self._lock:
+            self._entries.pop(('remote', tuple(remote)), None)
+
+    def _purge(self):
+        """Drop expired registrations (lock held)"""
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[2] <= now]:
+            del self._entries[key]
+
+    def get_stats(self):
+        """Registration counters"""
+        with self._lock:
+            self._purge()
+            pending = len(self._entries)
+        return {
+            'pending': pending,
+            'registrations': self.registrations,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class LanguageControlServer:
+    """UDP control socket feeding a LanguageDirectory
+
+    Keys per datagram: port (service port the stream is sent to) or remote
+    ("ip:port" Asterisk sends from), source (language or 'auto'), target.
+    """
+
+    def __init__(self, directory, host='127.0.0.1', port=9109):
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self._sock = None
+        self._thread = None
+        self.running = False
+
+        self.commands = 0
+        self.rejected = 0
+
+    def start(self):
+        """Bind and serve on a daemon thread"""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.host, self.port))
+        self._sock.settimeout(1.0)
+        self.running = True
+        self._thread = threading.Thread(target=self._serve, name="language-control", daemon=True)
+        self._thread.start()
+        logger.info(f"Language control on udp://{self.host}:{self.port}")
+
+    def stop(self):
+        """Stop serving"""
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+
+    def _serve(self):
+        """Receive loop"""
+        while self.running:
+            try:
+                data, addr = self._sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                self.handle(data)
+                reply = b'OK'
+            except (ValueError, TypeError) as e:
+                self.rejected += 1
+                logger.warning(f"Rejected language control message from {addr[0]}: {e}")
+                reply = f"ERR {e}".encode()
+            try:
+                self._sock.sendto(reply, addr)
+            except OSError:
+                pass
+
+    def handle(self, data):
+        """Apply one control datagram; ValueError if it is malformed"""
+        command = parse_command(data)
+        port = int(command['port']) if command.get('port') not in (None, '') else None
+        remote = parse_address(command['remote']) if command.get('remote') else None
+        if 'target' not in command:
+            raise ValueError("missing target")
+        source = normalize_language(command.get('source', AUTO), allow_auto=True)
+        target = normalize_language(command['target'])
+        self.directory.register(source, target, port=port, remote=remote)
+        self.commands += 1
+
+
+class ARIChannelLanguages:
+    """Languages from channel variables of the ExternalMedia channel (Asterisk REST Interface)
+
+    An ExternalMedia channel is named UnicastRTP/<service ip>:<service
+    port>-<id>, and UNICASTRTP_LOCAL_PORT is the port Asterisk sends from,
+    which tells calls sharing one service port apart. Set the variables
+    when creating it (POST /channels/externalMedia?...&variables=...).
+    """
+
+    def __init__(self, url, user, password, timeout=2.0,
+                 source_variable=SOURCE_VARIABLE, target_variable=TARGET_VARIABLE):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.source_variable = source_variable
+        self.target_variable = target_variable
+        self._auth = 'Basic ' + base64.b64encode(f"{user}:{password}".encode()).decode()
+
+        self.lookups = 0
+        self.found = 0
+        self.failures = 0
+
+    def _get(self, path, **params):
+        """GET an ARI resource as JSON; None on 404"""
+        query = f"?{urllib.parse.urlencode(params)}" if params else ''
+        request = urllib.request.Request(f"{self.url}{path}{query}", headers={'Authorization': self._auth})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def _variable(self, channel_id, name):
+        """Value of a channel variable, or None if unset"""
+        result = self._get(f"/channels/{urllib.parse.quote(channel_id)}/variable", variable=name)
+        return result.get('value') or None if result else None
+
+    def lookup(self, port, remote):
+        """(source, target) of the stream Asterisk sends from remote to our port, or None
+
+        Either language may be None (unset); blocking, call it off the RTP path.
+        """
+        self.lookups += 1
+        try:
+            for channel in self._get('/channels') or []:
+                name = channel.get('name', '')
+                if not name.startswith('UnicastRTP/') or f":{port}-" not in name:
+                    continue
+                local_port = self._variable(channel['id'], 'UNICASTRTP_LOCAL_PORT')
+                if local_port is not None and local_port != str(remote[1]):
+                    continue
+                source = self._variable(channel['id'], self.source_variable)
+                target = self._variable(channel['id'], self.target_variable)
+                if source or target:
+                    self.found += 1
+                    return source, target
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"ARI channel lookup for port {port} failed: {e}")
+        return None
+
+    def get_stats(self):
+        """Lookup counters"""
+        return {'lookups': self.lookups, 'found': self.found, 'failures': self.failures}
@@ -0,0 +1,233 @@
+"""
+Lightweight latency statistics and metrics shared by the translation services
+- Counters and histograms are sharded per thread: each thread updates its
+  own slot list without locking, a scrape sums the shards
+- Gauges and per-session values are read from callbacks at scrape time, so
+  nothing is maintained for them on the packet path
+- Prometheus text exposition on a local HTTP /metrics endpoint
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) for per-stage latency histograms: 10 us .. 30 s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def summarize_latencies(samples):
+    """p50/p99/max in milliseconds for a collection of durations in seconds"""
+    samples = sorted(samples)
+    if not samples:
+        return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+    
+    def pick(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000.0
+    
+    return {'p50': pick(0.50), 'p99': pick(0.99), 'max': samples[-1] * 1000.0}
+
+
+def _format_labels(labels):
+    """{'a': 'x'} -> '{a="x"}'"""
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+class _Sharded:
+    """Per-thread slot lists; only the owning thread ever writes to its list"""
+
+    def __init__(self, slots):
+        self._slots = slots
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # Taken once per thread, when its shard is created
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self._slots
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _totals(self):
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0] * self._slots
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    """Monotonic counter"""
+
+    def __init__(self, name, help, labels=None):
+        super().__init__(1)
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+
+    def inc(self, amount=1):
+        """Add to the counter (calling thread's shard)"""
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        """Current total over all threads"""
+        return self._totals()[0]
+
+    def samples(self):
+        """Exposition lines"""
+        yield f"{self.name}_total{_format_labels(self.labels)} {self.value}"
+
+
+class Histogram(_Sharded):
+    """Cumulative-bucket histogram of durations in seconds"""
+
+    def __init__(self, name, help, labels=None, buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(len(self.bounds) + 2)  # One slot per bucket, +Inf, sum
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+
+    def observe(self, value):
+        """Record one observation (calling thread's shard)"""
+        shard = self._shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def samples(self):
+        """Exposition lines"""
+        totals = self._totals()
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), totals[:-1]):
+            cumulative += count
+            labels = dict(self.labels, le=bound if bound == '+Inf' else repr(float(bound)))
+            yield f"{self.name}_bucket{_format_labels(labels)} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(self.labels)} {totals[-1]}"
+        yield f"{self.name}_count{_format_labels(self.labels)} {cumulative}"
+
+
+class _Callback:
+    """Values read from a function at scrape time"""
+
+    def __init__(self, name, help, kind, fn):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        """Exposition lines; fn returns a number or an iterable of (labels, value)"""
+        suffix = '_total' if self.kind == 'counter' else ''
+        result = self.fn()
+        if result is None:
+            return
+        if isinstance(result, (int, float)):
+            result = [({}, result)]
+        for labels, value in result:
+            yield f"{self.name}{suffix}{_format_labels(labels)} {value}"
+
+
+class MetricsRegistry:
+    """Named metrics and their Prometheus text rendering"""
+
+    def __init__(self):
+        self._families = {}  # name -> (kind, help, [metrics])
+        self._lock = threading.Lock()
+
+    def _add(self, kind, metric):
+        with self._lock:
+            family = self._families.setdefault(metric.name, (kind, metric.help, []))
+            if family[0] != kind:
+                raise ValueError(f"Metric {metric.name} already registered as {family[0]}")
+            family[2].append(metric)
+        return metric
+
+    def counter(self, name, help, labels=None):
+        """New sharded counter"""
+        return self._add('counter', Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=None, buckets=LATENCY_BUCKETS):
+        """New sharded histogram"""
+        return self._add('histogram', Histogram(name, help, labels, buckets))
+
+    def gauge_callback(self, name, help, fn):
+        """Gauge read from fn() at scrape time"""
+        return self._add('gauge', _Callback(name, help, 'gauge', fn))
+
+    def counter_callback(self, name, help, fn):
+        """Counter read from fn() at scrape time (for totals kept elsewhere)"""
+        return self._add('counter', _Callback(name, help, 'counter', fn))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            families = sorted(self._families.items())
+        lines = []
+        for name, (kind, help, metrics) in families:
+            if kind == 'counter':
+                name += '_total'
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics:
+                try:
+                    lines.extend(metric.samples())
+                except Exception as e:
+                    logger.debug(f"Metric {name} unavailable: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Local HTTP server exposing a registry at /metrics"""
+
+    def __init__(self, registry, host='127.0.0.1', port=9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Bind and serve on a daemon thread"""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are too frequent for the service log
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop serving"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
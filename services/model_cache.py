@@ -0,0 +1,120 @@
+"""
+Warm on-disk cache of pre-converted model weights
+- Whisper checkpoints are re-saved once as safetensors plus a small JSON
+  file with the model dimensions, one file per weight precision: fp16 for
+  the fp16 profile, fp32 (the weights exactly as whisper.load_model gives
+  them) for every other one, so a cached start runs the same weights as a
+  cold one
+- Loading from the cache skips the SHA-256 check whisper.load_model runs
+  over the full checkpoint on every start (and reads half the bytes in fp16)
+- A miss (or a damaged cache) falls back to whisper.load_model and fills
+  the cache for the next start
+- The loaded model is converted to its execution profile (precision.py)
+- torch / whisper are imported only when a model is actually loaded
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import time
+
+from precision import PROFILE_FP16, PROFILE_FP32, apply_profile
+
+try:
+    from safetensors.torch import load_file, save_file
+except ImportError:  # Optional: pip install safetensors
+    load_file = save_file = None
+
+logger = logging.getLogger(__name__)
+
+
+def _paths(cache_dir, name, dtype):
+    """Weights and metadata file for a cached Whisper model"""
+    base = os.path.join(cache_dir, f"whisper-{name}-{dtype}")
+    return base + '.safetensors', base + '.json'
+
+
+def cache_dtype(profile):
+    """Precision of the cached weights a profile loads from
+
+    Only the fp16 profile may start from fp16-rounded weights; fp32 and
+    int8 (quantized from fp32) need the unrounded ones.
+    """
+    return PROFILE_FP16 if profile == PROFILE_FP16 else PROFILE_FP32
+
+
+def load_whisper(name, device=None, cache_dir=None, profile=PROFILE_FP32):
+    """whisper.load_model() backed by the safetensors cache
+
+    profile is a resolved PyTorch profile (fp32 / fp16 / int8); the cache
+    always holds the unquantized weights.
+    """
+    model = _load_whisper(name, device, cache_dir, cache_dtype(profile))
+    if profile != PROFILE_FP32:
+        started = time.monotonic()
+        model = apply_profile(model, profile)
+        logger.info(f"Whisper {name} converted to {profile} in {time.monotonic() - started:.1f}s")
+    return model
+
+
+def _load_whisper(name, device, cache_dir, dtype):
+    """fp32 Whisper model, from the cache of dtype weights when possible"""
+    import whisper
+
+    if not cache_dir or load_file is None:
+        return whisper.load_model(name, device=device)
+
+    weights_path, meta_path = _paths(cache_dir, name, dtype)
+    if os.path.exists(weights_path) and os.path.exists(meta_path):
+        started = time.monotonic()
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            model = whisper.model.Whisper(whisper.model.ModelDimensions(**meta['dims']))
+            model.load_state_dict(load_file(weights_path))
+            if meta.get('alignment_heads'):
+                model.set_alignment_heads(meta['alignment_heads'].encode('ascii'))
+            model = model.to(device or ("cuda" if _cuda_available() else "cpu"))
+            logger.info(f"Whisper {name} loaded from {dtype} cache in {time.monotonic() - started:.1f}s")
+            return model
+        except Exception as e:
+            logger.warning(f"Whisper cache for {name} unusable, reloading checkpoint: {e}")
+
+    model = whisper.load_model(name, device=device)
+    try:
+        save_whisper(model, name, cache_dir, dtype)
+    except Exception as e:
+        logger.warning(f"Could not write Whisper cache for {name}: {e}")
+    return model
+
+
+def save_whisper(model, name, cache_dir, dtype=PROFILE_FP16):
+    """Write a loaded Whisper model to the cache as dtype ('fp16' / 'fp32') safetensors"""
+    import whisper
+
+    os.makedirs(cache_dir, exist_ok=True)
+    weights_path, meta_path = _paths(cache_dir, name, dtype)
+
+    half = dtype == PROFILE_FP16
+    state = {
+        key: (value.half() if half and value.is_floating_point() else value).detach().cpu().contiguous()
+        for key, value in model.state_dict().items()
+    }
+    alignment_heads = getattr(whisper, '_ALIGNMENT_HEADS', {}).get(name)
+
+    # Write to temporary names first so a crash never leaves a half-written cache
+    save_file(state, weights_path + '.tmp')
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({
+            'dims': dataclasses.asdict(model.dims),
+            'alignment_heads': alignment_heads.decode('ascii') if alignment_heads else None,
+        }, f)
+    os.replace(weights_path + '.tmp', weights_path)
+    os.replace(meta_path + '.tmp', meta_path)
+    logger.info(f"Cached Whisper {name} as {dtype} safetensors in {cache_dir}")
+
+
+def _cuda_available():
+    import torch
+    return torch.cuda.is_available()
@@ -0,0 +1,162 @@
+"""
+LRU model pool with a memory budget
+- Loads models in background threads, never on the audio path
+- Single-flight: concurrent requests for the same model share one load
+- Evicts least-recently-used models to stay within a VRAM/RAM budget
+- Prewarms a configured list of models at startup
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ModelPool:
+    """Keyed cache of loaded models
+
+    loader(key) loads and returns a model, size_fn(model) returns its memory
+    footprint in bytes and unload(key, model) releases it (e.g. frees CUDA
+    memory) after eviction.
+    """
+
+    def __init__(self, loader, size_fn, unload=None, budget_bytes=4 << 30, loader_threads=1):
+        self.loader = loader
+        self.size_fn = size_fn
+        self.unload = unload
+        self.budget_bytes = budget_bytes
+
+        self._models = OrderedDict()  # key -> (model, size), least recently used first
+        self._loading = {}            # key -> Future
+        self._failed = {}             # key -> monotonic time of last failure
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=loader_threads, thread_name_prefix="model-loader")
+        self.used_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, key, wait=0.0):
+        """Loaded model for key, or None if it is not ready within `wait` seconds
+
+        A miss starts a background load (at most one per key), so a later
+        call finds the model ready.
+        """
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            future = self._start_load(key)
+
+        if future is None or wait <= 0:
+            return None
+        try:
+            return future.result(timeout=wait)
+        except Exception:  # Timed out or failed to load
+            return None
+
+    def peek(self, key):
+        """Loaded model for key without loading or touching LRU order"""
+        entry = self._models.get(key)
+        return entry[0] if entry is not None else None
+
+    def prewarm(self, keys, wait=False):
+        """Start loading keys in the background; optionally block until done"""
+        with self._lock:
+            futures = [self._start_load(key) for key in keys if key not in self._models]
+        if wait:
+            for future in futures:
+                if future is not None:
+                    try:
+                        future.result()
+                    except Exception:
+                        pass
+
+    def is_loading(self, key):
+        """True while a background load for key is in progress"""
+        return key in self._loading
+
+    def _start_load(self, key, retry_after=60.0):
+        """Schedule a load unless one is running or recently failed (lock held)"""
+        future = self._loading.get(key)
+        if future is not None:
+            return future
+        failed_at = self._failed.get(key)
+        if failed_at is not None and time.monotonic() - failed_at < retry_after:
+            return None
+
+        future = self._executor.submit(self._load, key)
+        self._loading[key] = future
+        return future
+
+    def _load(self, key):
+        """Loader thread body for one key"""
+        started = time.monotonic()
+        try:
+            logger.info(f"Loading model: {key}")
+            model = self.loader(key)
+            size = int(self.size_fn(model))
+        except Exception as e:
+            logger.error(f"Failed to load model {key}: {e}")
+            with self._lock:
+                self._loading.pop(key, None)
+                self._failed[key] = time.monotonic()
+                self.load_failures += 1
+            raise
+
+        elapsed = time.monotonic() - started
+        evicted = []
+        with self._lock:
+            # Make room, oldest first; the new model is always admitted
+            while self._models and self.used_bytes + size > self.budget_bytes:
+                old_key, (old_model, old_size) = self._models.popitem(last=False)
+                self.used_bytes -= old_size
+                self.evictions += 1
+                evicted.append((old_key, old_model))
+
+            self._models[key] = (model, size)
+            self.used_bytes += size
+            self._loading.pop(key, None)
+            self._failed.pop(key, None)
+            self.loads += 1
+            self.load_seconds += elapsed
+
+        logger.info(f"Model {key} loaded in {elapsed:.1f}s ({size / 1e6:.0f} MB)")
+        for old_key, old_model in evicted:
+            logger.info(f"Evicted model {old_key} (memory budget)")
+            if self.unload:
+                try:
+                    self.unload(old_key, old_model)
+                except Exception as e:
+                    logger.error(f"Failed to unload model {old_key}: {e}")
+        return model
+
+    def shutdown(self):
+        """Stop loader threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        """Pool statistics"""
+        with self._lock:
+            return {
+                'loaded': list(self._models.keys()),
+                'loading': list(self._loading.keys()),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'load_failures': self.load_failures,
+                'evictions': self.evictions,
+                'avg_load_seconds': self.load_seconds / self.loads if self.loads else 0.0,
+            }
@@ -0,0 +1,182 @@
+"""
+Cross-call batching for MarianMT text translation
+- Collects sentences from many calls within a short window
+- Groups them by language pair and runs one padded generate() per group
+- Greedy (or small-beam) decoding with a bounded output length
+- Routes each translation back to the calling worker thread
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+import torch
+
+from metrics import summarize_latencies
+
+logger = logging.getLogger(__name__)
+
+# Number of recent request latencies kept for percentile reporting
+LATENCY_SAMPLES = 10000
+
+
+def generate_translations(tokenizer, model, texts, num_beams=1, max_new_tokens=256):
+    """Translate a list of sentences with one padded generate() call"""
+    inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+    inputs = {k: v.to(model.device) for k, v in inputs.items()}
+    with torch.no_grad():
+        output_ids = model.generate(**inputs, num_beams=num_beams, max_new_tokens=max_new_tokens)
+    return [text.strip() for text in tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+
+
+class _Request:
+    """One sentence waiting to be translated"""
+
+    __slots__ = ('text', 'pair', 'future', 'enqueued_at')
+
+    def __init__(self, text, pair):
+        self.text = text
+        self.pair = pair
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class TranslationBatcher:
+    """Batches translation requests from concurrent calls
+
+    resolve(source_lang, target_lang) returns the (tokenizer, model) for a
+    language pair, or None if it is not loaded. translate() is called from
+    inference worker threads and blocks until the batch containing the
+    request has been generated. A batch is dispatched when it reaches
+    max_batch_size or window_ms after its first request arrived. It gives
+    up after request_timeout seconds, and stop() fails every request still
+    queued, so no caller waits forever on a batcher that is gone.
+    """
+
+    def __init__(self, resolve, max_batch_size=16, window_ms=20, num_beams=1, max_new_tokens=256,
+                 request_timeout=120.0):
+        self.resolve = resolve
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window_ms / 1000.0
+        self.request_timeout = request_timeout
+        self.num_beams = max(1, num_beams)
+        self.max_new_tokens = max_new_tokens
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self.running = False
+
+        self.batches = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """Start the batching thread"""
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="mt-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the batching thread and fail the requests it will not translate"""
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=5)
+
+        failed = 0
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("MarianMT batcher stopped"))
+            failed += 1
+        if failed:
+            logger.warning(f"MarianMT batcher stopped with {failed} requests queued")
+
+    def translate(self, text, source_lang, target_lang, timeout=None):
+        """Translate one sentence; returns the translated text
+
+        Raises RuntimeError once the batcher is stopped and TimeoutError
+        after timeout seconds (default request_timeout).
+        """
+        if not self.running:
+            raise RuntimeError("MarianMT batcher stopped")
+        request = _Request(text, (source_lang, target_lang))
+        self._queue.put(request)
+        return request.future.result(self.request_timeout if timeout is None else timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Batching thread body"""
+        logger.info(f"Translation batcher started (batch={self.max_batch_size}, "
+                    f"window={self.window * 1000:.0f}ms, beams={self.num_beams})")
+
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            by_pair = defaultdict(list)
+            for request in batch:
+                by_pair[request.pair].append(request)
+
+            for pair, requests in by_pair.items():
+                self._generate(pair, requests)
+
+    def _generate(self, pair, requests):
+        """Run one padded batch through the pair's model"""
+        try:
+            resolved = self.resolve(*pair)
+            if resolved is None:
+                raise RuntimeError(f"Translation model {pair[0]}-{pair[1]} not loaded")
+            tokenizer, model = resolved
+            results = generate_translations(
+                tokenizer,
+                model,
+                [request.text for request in requests],
+                num_beams=self.num_beams,
+                max_new_tokens=self.max_new_tokens
+            )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        done = time.monotonic()
+        self.batches += 1
+        self.requests += len(requests)
+
+        for request, result in zip(requests, results):
+            self.latencies.append(done - request.enqueued_at)
+            request.future.set_result(result)
+
+    def get_stats(self):
+        """Batcher statistics"""
+        stats = {
+            'batches': self.batches,
+            'requests': self.requests,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+        stats.update({f'latency_{k}_ms': v for k, v in summarize_latencies(self.latencies.copy()).items()})
+        return stats
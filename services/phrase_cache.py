@@ -0,0 +1,230 @@
+"""
+Phrase-level translation + TTS result cache
+- Keyed on normalized source text, language pair and the TTS voice and
+  output rate, so a persisted store never replays another model's speech
+- Stores the translated text and the synthesized audio as 8 kHz PCMU
+- In-memory LRU in front of an optional append-only on-disk store (mmap),
+  so common phrases survive restarts
+- Hit ratio and inference time saved for monitoring
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+STORE_MAGIC = b'PHRASES2'  # 2: keys carry the TTS voice
+
+# key length, translated text length, audio length, seconds the entry cost to compute
+_RECORD = struct.Struct('<HHIf')
+
+
+def normalize(text):
+    """Case-, punctuation- and whitespace-insensitive form of a phrase"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+    return ' '.join(text.split())
+
+
+class PhraseStore:
+    """Append-only phrase file, read through a memory map
+
+    Records are never rewritten; the file stops growing at max_bytes. A
+    partially written record at the end (crash mid-append) is truncated on
+    open.
+    """
+
+    def __init__(self, path, max_bytes=256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}  # key -> (offset of translated text, text length, audio length, cost)
+        self._map = None
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a+b')
+        self._file.seek(0)
+        if self._file.read(len(STORE_MAGIC)) != STORE_MAGIC:
+            if os.path.getsize(path):
+                logger.warning(f"Phrase store {path} has an unknown format, starting empty")
+            self._file.truncate(0)
+            self._file.write(STORE_MAGIC)
+            self._file.flush()
+        self._scan()
+
+    def _remap(self):
+        """Map the whole file (called after it grows)"""
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan(self):
+        """Build the in-memory index from the file"""
+        self._remap()
+        size = len(self._map)
+        pos = len(STORE_MAGIC)
+        while pos + _RECORD.size <= size:
+            key_len, text_len, audio_len, cost = _RECORD.unpack_from(self._map, pos)
+            start = pos + _RECORD.size
+            end = start + key_len + text_len + audio_len
+            if end > size:
+                break
+            key = self._map[start:start + key_len].decode('utf-8')
+            self._index[key] = (start + key_len, text_len, audio_len, cost)
+            pos = end
+
+        if pos < size:
+            logger.warning(f"Phrase store {self.path}: truncating {size - pos} bytes of a partial record")
+            self._map.close()
+            self._map = None
+            self._file.truncate(pos)
+            self._remap()
+        logger.info(f"Phrase store {self.path}: {len(self._index)} entries, {pos / 1e6:.1f} MB")
+
+    def get(self, key):
+        """(translated, pcmu, cost) for key, or None"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            offset, text_len, audio_len, cost = entry
+            translated = self._map[offset:offset + text_len].decode('utf-8')
+            audio = self._map[offset + text_len:offset + text_len + audio_len]
+        return translated, audio, cost
+
+    def put(self, key, translated, pcmu, cost):
+        """Append an entry; returns False if present or the store is full"""
+        key_bytes = key.encode('utf-8')
+        text_bytes = translated.encode('utf-8')
+        if len(key_bytes) > 0xFFFF or len(text_bytes) > 0xFFFF:
+            return False
+
+        with self._lock:
+            size = len(self._map)
+            record_size = _RECORD.size + len(key_bytes) + len(text_bytes) + len(pcmu)
+            if key in self._index or size + record_size > self.max_bytes:
+                return False
+
+            self._file.write(_RECORD.pack(len(key_bytes), len(text_bytes), len(pcmu), cost))
+            self._file.write(key_bytes + text_bytes + bytes(pcmu))
+            self._file.flush()
+            self._index[key] = (size + _RECORD.size + len(key_bytes), len(text_bytes), len(pcmu), cost)
+            self._remap()
+        return True
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        """Flush and close the store file"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+
+
+class PhraseCache:
+    """Two-level cache of (translated text, PCMU audio) per phrase
+
+    Only phrases of at most max_words words are cached; longer utterances
+    rarely repeat. store is an optional PhraseStore behind the memory LRU.
+    voice names the TTS that synthesizes the audio (set_voice() once the
+    backend is known); entries of other voices are never returned.
+    """
+
+    def __init__(self, max_entries=2000, max_words=8, store=None, voice=''):
+        self.max_entries = max_entries
+        self.max_words = max_words
+        self.store = store
+        self.voice = voice
+
+        self._entries = OrderedDict()  # key -> (translated, pcmu, cost), least recently used first
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def set_voice(self, voice, sample_rate):
+        """TTS model / voice and its output rate, e.g. ('models:tts_models/...', 16000)"""
+        self.voice = f"{voice}@{sample_rate}"
+        logger.info(f"Phrase cache voice: {self.voice}")
+
+    def key(self, text, source_lang, target_lang):
+        """Cache key for a phrase, or None if it should not be cached"""
+        phrase = normalize(text)
+        if not phrase or len(phrase.split()) > self.max_words:
+            return None
+        return f"{self.voice}\t{source_lang}\t{target_lang}\t{phrase}"
+
+    def get(self, text, source_lang, target_lang):
+        """(translated, pcmu) for a phrase, or None on a miss"""
+        key = self.key(text, source_lang, target_lang)
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0], entry[1]
+
+        entry = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.saved_seconds += entry[2]
+            self._insert(key, entry)
+        return entry[0], entry[1]
+
+    def put(self, text, source_lang, target_lang, translated, pcmu, cost_seconds):
+        """Cache a computed phrase; cost_seconds is the inference time it took"""
+        key = self.key(text, source_lang, target_lang)
+        if key is None:
+            return
+        entry = (translated, bytes(pcmu), cost_seconds)
+        with self._lock:
+            self._insert(key, entry)
+        if self.store is not None:
+            try:
+                self.store.put(key, translated, entry[1], cost_seconds)
+            except OSError as e:
+                logger.error(f"Phrase store write failed: {e}")
+
+    def _insert(self, key, entry):
+        """Add to the memory LRU, evicting the oldest entry (lock held)"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self):
+        """Close the on-disk store"""
+        if self.store is not None:
+            self.store.close()
+
+    def get_stats(self):
+        """Hit ratio and time saved"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'disk_entries': len(self.store) if self.store is not None else 0,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'saved_seconds': self.saved_seconds,
+            'saved_ms_per_hit': self.saved_seconds * 1000 / hits if hits else 0.0,
+        }
@@ -0,0 +1,148 @@
+"""
+Model execution profiles, selected per model
+- fp32: PyTorch defaults (what the services used so far)
+- fp16: half-precision weights on CUDA; Whisper LayerNorms stay fp32
+- int8: dynamic int8 quantization of Linear layers, for CPU inference
+- auto: fp16 on CUDA, int8 on CPU
+- ctranslate2: Whisper through faster-whisper (CTranslate2 runtime,
+  float16 on CUDA / int8 on CPU), optional dependency
+"""
+
+import logging
+import time
+from collections import deque
+
+from backends import best_language
+from metrics import summarize_latencies
+
+try:
+    from faster_whisper import WhisperModel as FasterWhisperModel
+except ImportError:  # Optional: pip install faster-whisper
+    FasterWhisperModel = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FP32 = 'fp32'
+PROFILE_FP16 = 'fp16'
+PROFILE_INT8 = 'int8'
+PROFILE_AUTO = 'auto'
+PROFILE_CTRANSLATE2 = 'ctranslate2'
+PROFILES = (PROFILE_FP32, PROFILE_FP16, PROFILE_INT8, PROFILE_AUTO, PROFILE_CTRANSLATE2)
+
+# Number of recent request latencies kept for percentile reporting
+LATENCY_SAMPLES = 10000
+
+
+def resolve_profile(profile, device, allow_ctranslate2=True):
+    """Concrete profile for a device (auto, and fallbacks for unsupported combinations)"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown execution profile: {profile}")
+
+    if profile == PROFILE_CTRANSLATE2:
+        if allow_ctranslate2 and FasterWhisperModel is not None:
+            return profile
+        logger.warning("ctranslate2 profile unavailable here (faster-whisper not installed or "
+                       "unsupported for this model), using auto")
+        profile = PROFILE_AUTO
+    if profile == PROFILE_AUTO:
+        return PROFILE_FP16 if device == "cuda" else PROFILE_INT8
+    if profile == PROFILE_FP16 and device != "cuda":
+        logger.warning("fp16 needs CUDA, using fp32 on CPU")
+        return PROFILE_FP32
+    if profile == PROFILE_INT8 and device == "cuda":
+        logger.warning("Dynamic int8 quantization runs on CPU only, using fp16 on CUDA")
+        return PROFILE_FP16
+    return profile
+
+
+def apply_profile(model, profile):
+    """Convert a loaded PyTorch model (Whisper or MarianMT) in place; returns it"""
+    import torch
+
+    if profile == PROFILE_FP16:
+        model.half()
+        # Whisper's LayerNorm computes in fp32 and needs fp32 weights for that
+        for module in model.modules():
+            if isinstance(module, torch.nn.LayerNorm) and type(module).__module__.startswith('whisper'):
+                module.float()
+    elif profile == PROFILE_INT8:
+        model.to('cpu')
+        # Whisper subclasses nn.Linear only to cast weights to the input dtype,
+        # which is a no-op in fp32; quantize_dynamic matches exact types
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+                module.__class__ = torch.nn.Linear
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    model.eval()
+    return model
+
+
+def model_bytes(model):
+    """Weight memory of a (possibly quantized) PyTorch model"""
+    import torch
+
+    size = sum(p.numel() * p.element_size() for p in model.parameters())
+    # Quantized Linear weights are packed outside parameters()
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            size += module.weight().numel()
+    return size
+
+
+class FasterWhisperTranscriber:
+    """Whisper on CTranslate2 with the WhisperBatcher interface
+
+    CTranslate2 schedules concurrent requests across its own workers, so
+    there is no batching window here.
+    """
+
+    def __init__(self, name, device="cuda", workers=4):
+        if FasterWhisperModel is None:
+            raise RuntimeError("faster-whisper is not installed")
+        compute_type = "float16" if device == "cuda" else "int8"
+        self.model = FasterWhisperModel(name, device=device, compute_type=compute_type, num_workers=workers)
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """Nothing to start (interface parity with WhisperBatcher)"""
+
+    def stop(self):
+        """Nothing to stop (interface parity with WhisperBatcher)"""
+
+    def transcribe(self, audio, language, timeout=None):
+        """Transcribe 16 kHz float32 audio; returns the recognized text"""
+        started = time.monotonic()
+        segments, _ = self.model.transcribe(
+            audio,
+            language=language,
+            beam_size=1,
+            without_timestamps=True,
+            vad_filter=False
+        )
+        text = ''.join(segment.text for segment in segments).strip()
+        self.requests += 1
+        self.latencies.append(time.monotonic() - started)
+        return text
+
+    def detect_language(self, audio, candidates=None):
+        """(language, probability) of 16 kHz float32 audio
+
+        Language detection runs inside transcribe() before any segment is
+        decoded; the segment generator is never consumed.
+        """
+        _, info = self.model.transcribe(audio, language=None, beam_size=1, without_timestamps=True, vad_filter=False)
+        if candidates and info.all_language_probs:
+            return best_language(dict(info.all_language_probs), candidates)
+        return info.language, float(info.language_probability)
+
+    def get_stats(self):
+        """Transcriber statistics (same keys as WhisperBatcher)"""
+        stats = {
+            'batches': self.requests,
+            'requests': self.requests,
+            'avg_batch_size': 1.0 if self.requests else 0.0,
+            'queued': 0,
+        }
+        stats.update({f'latency_{k}_ms': v for k, v in summarize_latencies(self.latencies.copy()).items()})
+        return stats
@@ -0,0 +1,85 @@
+"""
+Streaming polyphase FIR resampler
+- Rational up/down conversion (8 kHz -> 16 kHz for ASR, 16/22.05/24 kHz -> 8 kHz for TTS)
+- Kaiser-windowed sinc filters, precomputed once per rate pair
+- Vectorized with NumPy; carries filter history between blocks
+"""
+
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+DEFAULT_TAPS_PER_PHASE = 32  # At the lower of the two rates
+KAISER_BETA = 8.0
+CUTOFF_RATIO = 0.92  # Fraction of the lower Nyquist frequency kept
+
+
+@lru_cache(maxsize=32)
+def _design_phases(up, down, taps_per_phase):
+    """Low-pass prototype split into `up` polyphase branches, shape (up, taps)"""
+    num_taps = up * taps_per_phase
+    cutoff = CUTOFF_RATIO / (2.0 * max(up, down))  # cycles per upsampled sample
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(num_taps, KAISER_BETA)
+    h *= up / h.sum()  # unity DC gain after zero-stuffing
+
+    # phases[p, k] = h[p + k * up]
+    phases = h.reshape(taps_per_phase, up).T.astype(np.float32)
+    phases.setflags(write=False)
+    return phases
+
+
+class PolyphaseResampler:
+    """Resamples a stream of float32 blocks from one rate to another
+
+    Output sample n is taken at upsampled time n * down; its filter phase is
+    (n * down) % up and it uses the last taps_per_phase input samples. Blocks
+    may be any length; state carries over so a stream resampled in pieces is
+    identical to the same stream resampled in one go.
+    """
+
+    def __init__(self, from_rate, to_rate, taps_per_phase=DEFAULT_TAPS_PER_PHASE):
+        divisor = gcd(int(from_rate), int(to_rate))
+        self.up = int(to_rate) // divisor
+        self.down = int(from_rate) // divisor
+        # Decimation needs proportionally longer branches for the same transition band
+        self.taps = -(-taps_per_phase * max(self.up, self.down) // self.up)
+        self.passthrough = self.up == self.down
+        self.phases = None if self.passthrough else _design_phases(self.up, self.down, self.taps)
+        self._tap_offsets = np.arange(self.taps)
+        self.reset()
+
+    def reset(self):
+        """Forget filter history (start of a new, unrelated stream)"""
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._t = 0  # Upsampled time of the next output, relative to the next block
+
+    def process(self, block):
+        """Resample one block; returns float32 output samples"""
+        block = np.asarray(block, dtype=np.float32)
+        if self.passthrough:
+            return block.copy()
+
+        length = len(block)
+        buffer = np.concatenate((self._history, block))
+        self._history = buffer[len(buffer) - (self.taps - 1):]
+
+        span = length * self.up
+        if self._t >= span:
+            self._t -= span
+            return np.empty(0, dtype=np.float32)
+
+        count = (span - self._t + self.down - 1) // self.down
+        t = self._t + np.arange(count) * self.down
+        self._t = self._t + count * self.down - span
+
+        # Input index of each output (shifted by the carried history) and its phase
+        index = t // self.up + (self.taps - 1)
+        gather = buffer[index[:, None] - self._tap_offsets[None, :]]
+        return np.einsum('nk,nk->n', gather, self.phases[t % self.up]).astype(np.float32)
+
+
+def resample(samples, from_rate, to_rate, taps_per_phase=DEFAULT_TAPS_PER_PHASE):
+    """One-shot resample of a complete signal"""
+    return PolyphaseResampler(from_rate, to_rate, taps_per_phase).process(samples)
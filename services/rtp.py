@@ -0,0 +1,166 @@
+"""
+RTP packet helpers shared by the translation services
+- parse_rtp() reads the fixed header with one precompiled struct.Struct and
+  returns the payload as a slice of its input (a memoryview slice, no copy,
+  for received buffers), skipping CSRCs and header extensions and
+  stripping padding (RFC 3550 5.1 / 5.3.1)
+- RTPReceiver receives into one preallocated buffer with recvfrom_into
+"""
+
+import struct
+
+RTP_HEADER_SIZE = 12
+RTP_VERSION = 2
+
+RTCP_BYE = 203
+
+# Largest datagram accepted by RTPReceiver (bigger ones are truncated)
+RECEIVE_BUFFER_SIZE = 2048
+
+# V/P/X/CC, M/PT, sequence, timestamp, SSRC
+_HEADER = struct.Struct('!BBHII')
+# Header extension: profile-defined id, length in 32-bit words
+_EXTENSION = struct.Struct('!HH')
+
+
+class RTPHeader:
+    """Parsed RTP packet; payload (and extension data) slice the parsed buffer"""
+
+    __slots__ = ('marker', 'payload_type', 'sequence', 'timestamp', 'ssrc', 'csrcs', 'extension', 'payload')
+
+    def __init__(self, marker, payload_type, sequence, timestamp, ssrc, csrcs, extension, payload):
+        self.marker = marker
+        self.payload_type = payload_type
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.ssrc = ssrc
+        self.csrcs = csrcs
+        self.extension = extension
+        self.payload = payload
+
+
+def parse_rtp(data):
+    """Parse an RTP packet; None if malformed
+
+    The payload is a slice of data: a memoryview (no copy) when data is one.
+    Copy it (bytes(...)) before the underlying buffer is reused.
+    """
+    size = len(data)
+    if size < RTP_HEADER_SIZE:
+        return None
+    first, second, sequence, timestamp, ssrc = _HEADER.unpack_from(data)
+    if first == 0x80:
+        # V=2 without padding, extension or CSRCs: nearly every packet
+        return RTPHeader(second >> 7, second & 0x7F, sequence, timestamp, ssrc, (), None, data[RTP_HEADER_SIZE:])
+    if first >> 6 != RTP_VERSION:
+        return None
+
+    offset = RTP_HEADER_SIZE
+    csrc_count = first & 0x0F
+    csrcs = ()
+    if csrc_count:
+        end = offset + 4 * csrc_count
+        if end > size:
+            return None
+        csrcs = struct.unpack_from(f'!{csrc_count}I', data, offset)
+        offset = end
+
+    extension = None
+    if first & 0x10:
+        if offset + 4 > size:
+            return None
+        profile, words = _EXTENSION.unpack_from(data, offset)
+        end = offset + 4 + 4 * words
+        if end > size:
+            return None
+        extension = (profile, data[offset + 4:end])
+        offset = end
+
+    if first & 0x20:
+        padding = data[size - 1]
+        if padding == 0 or offset + padding > size:
+            return None
+        size -= padding
+
+    return RTPHeader(second >> 7, second & 0x7F, sequence, timestamp, ssrc, csrcs, extension, data[offset:size])
+
+
+class RTPReceiver:
+    """recvfrom_into a preallocated buffer, parsed without copying
+
+    Each receive overwrites the buffer, so a returned packet (and its
+    payload view) is only valid until the next call.
+    """
+
+    __slots__ = ('sock', '_buffer', '_view')
+
+    def __init__(self, sock, buffer_size=RECEIVE_BUFFER_SIZE):
+        self.sock = sock
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+
+    def receive(self):
+        """(view of the datagram, sender address); blocks per the socket's mode"""
+        size, addr = self.sock.recvfrom_into(self._buffer)
+        return self._view[:size], addr
+
+    def receive_rtp(self):
+        """(RTPHeader or None if not valid RTP, sender address)"""
+        size, addr = self.sock.recvfrom_into(self._buffer)
+        return parse_rtp(self._view[:size]), addr
+
+
+class RTPPacket:
+    """Parse and create RTP packets"""
+    
+    @staticmethod
+    def parse(data):
+        """Parse RTP packet into a dict with a copied payload (see parse_rtp)"""
+        packet = parse_rtp(data)
+        if packet is None:
+            return None
+        return {
+            'version': RTP_VERSION,
+            'payload_type': packet.payload_type,
+            'sequence': packet.sequence,
+            'timestamp': packet.timestamp,
+            'ssrc': packet.ssrc,
+            'payload': bytes(packet.payload)
+        }
+    
+    @staticmethod
+    def create(payload, sequence, timestamp, ssrc, payload_type=0, marker=False):
+        """Create RTP packet"""
+        header = _HEADER.pack(
+            0x80,  # V=2, P=0, X=0, CC=0
+            (0x80 if marker else 0) | payload_type,
+            sequence,
+            timestamp,
+            ssrc
+        )
+        return header + payload
+
+
+def is_rtcp(data):
+    """True for RTCP packets (RFC 5761 demux when RTP and RTCP share a port)"""
+    return len(data) >= 8 and 192 <= data[1] <= 223
+
+
+def rtcp_bye_ssrcs(data):
+    """SSRCs announced in any BYE of a (compound) RTCP packet"""
+    ssrcs = []
+    offset = 0
+    while offset + 4 <= len(data):
+        first, packet_type, length = struct.unpack_from('!BBH', data, offset)
+        if first >> 6 != 2:
+            break
+        end = offset + (length + 1) * 4
+        if packet_type == RTCP_BYE:
+            count = first & 0x1F
+            for i in range(count):
+                position = offset + 4 + i * 4
+                if position + 4 > min(end, len(data)):
+                    break
+                ssrcs.append(struct.unpack_from('!I', data, position)[0])
+        offset = end
+    return ssrcs
@@ -0,0 +1,215 @@
+"""
+Single-socket-per-port asyncio RTP engine
+- One event loop (uvloop if installed) multiplexes every RTP port
+- Readable sockets are drained with recvfrom_into into one preallocated
+  buffer and parsed without copying (rtp.parse_rtp)
+- Demuxes packets by (local port, SSRC) into call sessions
+- Reports RTCP BYE (muxed on the RTP port or on port + offset)
+- Hands packets to the service through a synchronous callback
+- Tracks per-packet handling latency (p50/p99)
+"""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+from collections import deque
+
+from metrics import summarize_latencies
+from rtp import RECEIVE_BUFFER_SIZE, is_rtcp, parse_rtp, rtcp_bye_ssrcs
+
+try:
+    import uvloop  # Optional, faster event loop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# Kernel receive buffer per RTP socket (bytes)
+RTP_SOCKET_RCVBUF = 1 << 20
+
+# Number of recent packet latencies kept for percentile reporting
+LATENCY_SAMPLES = 10000
+
+# Datagrams read per readiness callback before yielding to other sockets
+RECEIVE_BATCH = 64
+
+
+class RTPEngine:
+    """Receives RTP for a whole port range on one event loop thread
+
+    session_factory(port, ssrc, addr, packet) is called for the first packet
+    of a new stream and returns the session object (or None to ignore it).
+    packet_handler(session, packet) is called for every packet of a known
+    stream, on the event loop thread; it must not block. packet is an
+    rtp.RTPHeader whose payload is a view into the engine's receive buffer:
+    it is only valid during the callback, so copy what must be kept.
+    bye_handler(session) is called when RTCP BYE arrives for a known stream.
+    RTCP is always accepted muxed on the RTP port; with rtcp_offset set it is
+    also received on RTP port + rtcp_offset.
+    """
+
+    def __init__(self, listen_ip, ports, session_factory, packet_handler,
+                 bye_handler=None, rtcp_offset=None):
+        self.listen_ip = listen_ip
+        self.ports = list(ports)
+        self.session_factory = session_factory
+        self.packet_handler = packet_handler
+        self.bye_handler = bye_handler
+        self.rtcp_offset = rtcp_offset
+
+        self.streams = {}  # (port, ssrc) -> session
+        self.sockets = []
+        self._buffer = bytearray(RECEIVE_BUFFER_SIZE)  # Shared: everything runs on the loop thread
+        self._view = memoryview(self._buffer)
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+
+        self.packets = 0
+        self.rtcp_packets = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """Start the event loop thread and bind all ports"""
+        self.thread = threading.Thread(target=self._run, name="rtp-engine", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        """Close all sockets and stop the event loop"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def _run(self):
+        """Event loop thread body"""
+        self.loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        try:
+            self.loop.run_until_complete(self._bind_all())
+        finally:
+            self.ready.set()
+
+        try:
+            self.loop.run_forever()
+        finally:
+            for sock in self.sockets:
+                self.loop.remove_reader(sock.fileno())
+                sock.close()
+            self.loop.close()
+
+    async def _bind_all(self):
+        """Bind one non-blocking UDP socket per port and watch it for reads"""
+        for port in self.ports:
+            if not self._bind(port, port, rtcp=False):
+                continue
+            if self.rtcp_offset:
+                self._bind(port + self.rtcp_offset, port, rtcp=True)
+
+        logger.info(f"RTP engine listening on {len(self.sockets)} ports "
+                    f"({'uvloop' if uvloop else 'asyncio'})")
+
+    def _bind(self, local_port, rtp_port, rtcp):
+        """Bind one socket; its datagrams are reported for rtp_port"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RTP_SOCKET_RCVBUF)
+        except OSError:
+            pass
+        try:
+            sock.bind((self.listen_ip, local_port))
+        except OSError as e:
+            sock.close()
+            logger.error(f"Failed to bind {'RTCP' if rtcp else 'RTP'} port {local_port}: {e}")
+            self.errors += 1
+            return False
+        sock.setblocking(False)
+        self.loop.add_reader(sock.fileno(), self._drain, sock, rtp_port, rtcp)
+        self.sockets.append(sock)
+        return True
+
+    def _drain(self, sock, port, rtcp):
+        """Read up to RECEIVE_BATCH datagrams into the shared buffer and dispatch each"""
+        buffer, view = self._buffer, self._view
+        for _ in range(RECEIVE_BATCH):
+            try:
+                size, addr = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.error(f"RTP socket error on port {port}: {e}")
+                self.errors += 1
+                return
+            if rtcp:
+                self.handle_rtcp(port, view[:size])
+            else:
+                self.handle_datagram(port, view[:size], addr)
+
+    def handle_datagram(self, port, data, addr):
+        """Parse, demux and dispatch one datagram"""
+        started = time.perf_counter()
+
+        try:
+            if is_rtcp(data):
+                self.handle_rtcp(port, data)
+                return
+
+            packet = parse_rtp(data)
+            if packet is None:
+                return
+
+            key = (port, packet.ssrc)
+            session = self.streams.get(key)
+            if session is None:
+                session = self.session_factory(port, packet.ssrc, addr, packet)
+                if session is None:
+                    return
+                self.streams[key] = session
+
+            self.packets += 1
+            self.packet_handler(session, packet)
+        except Exception as e:
+            logger.error(f"RTP engine error on port {port}: {e}")
+            self.errors += 1
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    def handle_rtcp(self, port, data):
+        """Look for BYE in an RTCP packet received for an RTP port"""
+        self.rtcp_packets += 1
+        try:
+            for ssrc in rtcp_bye_ssrcs(data):
+                session = self.streams.pop((port, ssrc), None)
+                if session is not None and self.bye_handler:
+                    self.bye_handler(session)
+        except Exception as e:
+            logger.error(f"RTCP error on port {port}: {e}")
+            self.errors += 1
+
+    def remove_stream(self, port, ssrc):
+        """Forget a stream; safe to call from any thread"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.streams.pop, (port, ssrc), None)
+        else:
+            self.streams.pop((port, ssrc), None)
+
+    def latency_percentiles(self):
+        """Packet handling latency percentiles in milliseconds"""
+        return summarize_latencies(self.latencies.copy())
+
+    def get_stats(self):
+        """Engine statistics"""
+        stats = {
+            'ports': len(self.sockets),
+            'streams': len(self.streams),
+            'packets': self.packets,
+            'rtcp_packets': self.rtcp_packets,
+            'errors': self.errors,
+        }
+        stats.update({f'latency_{k}_ms': v for k, v in self.latency_percentiles().items()})
+        return stats
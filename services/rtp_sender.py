@@ -0,0 +1,259 @@
+"""
+Real-time paced RTP sender
+- One long-lived UDP socket for all outbound media
+- Per-session playout queues of 20 ms G.711 frames
+- A single timer thread emits one frame per active call every 20 ms on the
+  monotonic clock (absolute deadlines, no drift)
+- Silence / comfort-noise fill between utterances, marker bit on talkspurt start
+- Send jitter (lateness against the 20 ms schedule) reporting
+- Optional histogram of the time each tick spends building and sending
+"""
+
+import logging
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import g711
+from metrics import summarize_latencies
+from rtp import RTPPacket
+
+logger = logging.getLogger(__name__)
+
+FRAME_SAMPLES = 160  # 20 ms at 8 kHz, 1 byte per sample for G.711
+FRAME_INTERVAL = FRAME_SAMPLES / 8000.0
+
+# What to send while a call has nothing queued
+FILL_NONE = 'none'        # Stop sending (timestamps keep advancing)
+FILL_SILENCE = 'silence'  # Digital silence frames
+FILL_NOISE = 'noise'      # Low-level comfort noise frames
+FILL_MODES = (FILL_NONE, FILL_SILENCE, FILL_NOISE)
+
+COMFORT_NOISE_DBFS = -70.0
+
+# Number of recent tick latenesses kept for jitter reporting
+JITTER_SAMPLES = 10000
+
+
+def _fill_frames(payload_type):
+    """Precomputed silence and comfort-noise frames for a payload type"""
+    silence = bytes([g711.SILENCE_BYTE[payload_type]]) * FRAME_SAMPLES
+    rng = np.random.default_rng(payload_type)
+    noise = rng.standard_normal(FRAME_SAMPLES).astype(np.float32) * (10 ** (COMFORT_NOISE_DBFS / 20))
+    return {FILL_SILENCE: silence, FILL_NOISE: g711.from_linear(noise, payload_type)}
+
+
+_FILL = {pt: _fill_frames(pt) for pt in g711.PAYLOAD_TYPES}
+
+
+class _Playout:
+    """Outbound state for one call"""
+
+    __slots__ = ('session', 'addr', 'frames', 'tail', 'open', 'talking', 'started')
+
+    def __init__(self, session, addr):
+        self.session = session
+        self.addr = addr
+        self.frames = deque()
+        self.tail = b''  # Partial frame held back until more audio of the utterance arrives
+        self.open = False  # Utterance queued in pieces and not finished yet
+        self.talking = False
+        self.started = False
+
+
+class OutboundStream:
+    """Outbound RTP state of one stream, for callers without a session object"""
+
+    __slots__ = ('ssrc', 'payload_type', 'sequence', 'timestamp', 'packets_sent')
+
+    def __init__(self, ssrc, payload_type=g711.PAYLOAD_TYPE_PCMU):
+        self.ssrc = ssrc
+        self.payload_type = payload_type
+        self.sequence = 0
+        self.timestamp = 0
+        self.packets_sent = 0
+
+
+class RTPSender:
+    """Paced outbound RTP for every active call
+
+    Sessions must provide sequence, timestamp, ssrc, payload_type and
+    packets_sent attributes; the sender owns them once a session is added.
+    send_histogram (metrics.Histogram) receives the duration of every tick.
+    """
+
+    def __init__(self, fill=FILL_SILENCE, max_queue_ms=60000, send_histogram=None):
+        if fill not in FILL_MODES:
+            raise ValueError(f"Unknown fill mode: {fill}")
+
+        self.fill = fill
+        self.max_queue_frames = max(1, int(max_queue_ms / (FRAME_INTERVAL * 1000)))
+        self.send_histogram = send_histogram
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._playouts = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.running = False
+
+        self.ticks = 0
+        self.late_ticks = 0
+        self.frames_sent = 0
+        self.fill_frames_sent = 0
+        self.frames_dropped = 0
+        self.gap_frames = 0
+        self.send_errors = 0
+        self.lateness = deque(maxlen=JITTER_SAMPLES)
+
+    def start(self):
+        """Start the pacing thread"""
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="rtp-sender", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the pacing thread and close the socket"""
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.sock.close()
+
+    def add_session(self, session, addr):
+        """Start an outbound stream for a session towards addr"""
+        with self._lock:
+            self._playouts[session] = _Playout(session, addr)
+
+    def remove_session(self, session):
+        """Stop the outbound stream for a session; queued audio is discarded"""
+        with self._lock:
+            self._playouts.pop(session, None)
+
+    def enqueue(self, session, payload, final=True):
+        """Queue G.711 audio for paced playout; returns frames queued
+
+        With final=False the audio is one piece of a longer utterance: a
+        trailing partial frame is held back and joined with the next piece
+        instead of being padded with silence.
+        """
+        playout = self._playouts.get(session)
+        if playout is None:
+            return 0
+
+        if playout.tail:
+            payload = playout.tail + bytes(payload)
+            playout.tail = b''
+
+        playout.open = not final
+        remainder = len(payload) % FRAME_SAMPLES
+        if remainder and not final:
+            playout.tail = bytes(payload[len(payload) - remainder:])
+            payload = payload[:len(payload) - remainder]
+        elif remainder:
+            # Pad the last frame with silence so every packet is a full 20 ms
+            silence = _FILL[session.payload_type][FILL_SILENCE]
+            payload = bytes(payload) + silence[:FRAME_SAMPLES - remainder]
+
+        frames = [payload[i:i + FRAME_SAMPLES] for i in range(0, len(payload), FRAME_SAMPLES)]
+        overflow = len(playout.frames) + len(frames) - self.max_queue_frames
+        if overflow > 0:
+            frames = frames[:len(frames) - overflow]
+            self.frames_dropped += overflow
+
+        playout.frames.extend(frames)
+        return len(frames)
+
+    def queued_ms(self, session):
+        """Audio waiting to be played out for a session, in ms"""
+        playout = self._playouts.get(session)
+        return len(playout.frames) * FRAME_INTERVAL * 1000 if playout else 0.0
+
+    def _run(self):
+        """Pacing thread body: one tick every 20 ms on absolute deadlines"""
+        logger.info(f"RTP sender started (fill={self.fill})")
+        deadline = time.monotonic()
+
+        while self.running:
+            now = time.monotonic()
+            lateness = now - deadline
+            self.lateness.append(max(lateness, 0.0))
+
+            # Far behind (e.g. process suspended): resync rather than burst
+            if lateness > 5 * FRAME_INTERVAL:
+                self.late_ticks += 1
+                deadline = now
+
+            self._tick()
+            self.ticks += 1
+            if self.send_histogram is not None:
+                self.send_histogram.observe(time.monotonic() - now)
+
+            deadline += FRAME_INTERVAL
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _tick(self):
+        """Emit at most one frame per active call"""
+        with self._lock:
+            playouts = list(self._playouts.values())
+
+        for playout in playouts:
+            session = playout.session
+
+            if playout.frames:
+                payload = playout.frames.popleft()
+                # Marker on the first packet of the stream and, when nothing is
+                # sent between utterances, on the first packet of each talkspurt
+                marker = not playout.started or (self.fill == FILL_NONE and not playout.talking)
+                playout.talking = True
+            else:
+                if playout.open:
+                    # Next piece of the utterance is late: audible gap
+                    self.gap_frames += 1
+                playout.talking = False
+                if self.fill == FILL_NONE:
+                    session.timestamp = (session.timestamp + FRAME_SAMPLES) & 0xFFFFFFFF
+                    continue
+                payload = _FILL[session.payload_type][self.fill]
+                marker = not playout.started
+                self.fill_frames_sent += 1
+
+            packet = RTPPacket.create(
+                payload,
+                session.sequence,
+                session.timestamp,
+                session.ssrc,
+                payload_type=session.payload_type,
+                marker=marker
+            )
+            playout.started = True
+
+            try:
+                self.sock.sendto(packet, playout.addr)
+            except OSError as e:
+                self.send_errors += 1
+                logger.debug(f"RTP send error to {playout.addr}: {e}")
+
+            session.sequence = (session.sequence + 1) % 65536
+            session.timestamp = (session.timestamp + FRAME_SAMPLES) & 0xFFFFFFFF
+            session.packets_sent += 1
+            self.frames_sent += 1
+
+    def get_stats(self):
+        """Sender statistics"""
+        stats = {
+            'streams': len(self._playouts),
+            'queued_frames': sum(len(playout.frames) for playout in list(self._playouts.values())),
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'frames_sent': self.frames_sent,
+            'fill_frames_sent': self.fill_frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'gap_frames': self.gap_frames,
+            'send_errors': self.send_errors,
+        }
+        stats.update({f'jitter_{k}_ms': v for k, v in summarize_latencies(self.lateness.copy()).items()})
+        return stats
@@ -0,0 +1,174 @@
+"""
+Call session lifecycle management
+- Tracks active sessions; evicts them on RTCP BYE or after an idle timeout
+- Append-only on-disk translation history (JSON lines) fed by per-session
+  bounded ring buffers, so transcripts do not accumulate in memory
+- Eviction counters and memory-per-session estimates for monitoring
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EVICT_BYE = 'bye'
+EVICT_IDLE = 'idle'
+EVICT_SHUTDOWN = 'shutdown'
+
+
+class TranslationHistoryLog:
+    """Append-only JSON-lines file shared by all sessions"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.records_written = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def append(self, session_id, entries):
+        """Append a batch of translation entries for one session"""
+        if not entries:
+            return
+        lines = ''.join(
+            json.dumps({'session_id': session_id, **entry}, ensure_ascii=False) + '\n'
+            for entry in entries
+        )
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self.records_written += len(entries)
+
+
+def estimate_size(obj, _seen=None):
+    """Rough deep size of an object in bytes (containers, slots and __dict__)"""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if hasattr(obj, 'nbytes'):  # NumPy arrays
+        return size + int(obj.nbytes)
+    if isinstance(obj, dict):
+        return size + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == 'deque':
+        return size + sum(estimate_size(item, seen) for item in obj)
+
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            if hasattr(obj, slot):
+                size += estimate_size(getattr(obj, slot), seen)
+    if hasattr(obj, '__dict__'):
+        size += estimate_size(vars(obj), seen)
+    return size
+
+
+class SessionManager:
+    """Owns the set of active call sessions
+
+    on_evict(session, reason) is called (outside the manager lock) after a
+    session has been removed, so the service can release its resources.
+    Sessions must provide session_id, last_activity (monotonic seconds) and
+    flush_history().
+    """
+
+    def __init__(self, idle_timeout=30.0, sweep_interval=5.0, on_evict=None):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.on_evict = on_evict
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.running = False
+
+        self.total_sessions = 0
+        self.evictions = {EVICT_BYE: 0, EVICT_IDLE: 0, EVICT_SHUTDOWN: 0}
+
+    def start(self):
+        """Start the idle sweeper thread"""
+        self.running = True
+        self._thread = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sweeper and evict every remaining session"""
+        self.running = False
+        for session in self.snapshot():
+            self.evict(session.session_id, EVICT_SHUTDOWN)
+
+    def add(self, session):
+        """Register a new session"""
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self.total_sessions += 1
+
+    def get(self, session_id):
+        """Look up an active session"""
+        return self._sessions.get(session_id)
+
+    def snapshot(self):
+        """List of currently active sessions"""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def evict(self, session_id, reason):
+        """Remove a session, flush its history and notify the service"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return None
+            self.evictions[reason] = self.evictions.get(reason, 0) + 1
+
+        try:
+            session.flush_history()
+        except Exception as e:
+            logger.error(f"[{session_id}] Failed to flush translation history: {e}")
+
+        if self.on_evict:
+            try:
+                self.on_evict(session, reason)
+            except Exception as e:
+                logger.error(f"[{session_id}] Eviction callback error: {e}")
+        return session
+
+    def evict_idle(self):
+        """Evict sessions that have received no media for idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [s.session_id for s in self._sessions.values() if s.last_activity < cutoff]
+        for session_id in idle:
+            self.evict(session_id, EVICT_IDLE)
+        return len(idle)
+
+    def _sweep_loop(self):
+        """Sweeper thread body"""
+        while self.running:
+            time.sleep(self.sweep_interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Session sweep error: {e}")
+
+    def get_stats(self):
+        """Active sessions, evictions and memory per session"""
+        sessions = self.snapshot()
+        seen = set()  # Shared objects (models, filter tables) are counted once
+        total_bytes = sum(estimate_size(session, seen) for session in sessions)
+        return {
+            'active': len(sessions),
+            'total': self.total_sessions,
+            'evicted_bye': self.evictions.get(EVICT_BYE, 0),
+            'evicted_idle': self.evictions.get(EVICT_IDLE, 0),
+            'memory_bytes': total_bytes,
+            'memory_per_session': total_bytes / len(sessions) if sessions else 0,
+        }
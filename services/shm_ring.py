@@ -0,0 +1,95 @@
+"""
+Shared-memory ring buffer for moving PCM between processes
+- One producer and one consumer process per ring; only metadata (offset and
+  length) travels through a pipe/queue, the samples are never pickled
+- Records are contiguous: one that would straddle the end starts again at 0
+- Head and tail are monotonic byte counters stored in the shared block, each
+  written by one side only
+"""
+
+import struct
+from multiprocessing import shared_memory
+
+# head (bytes written), tail (bytes released)
+_HEADER = struct.Struct('<QQ')
+
+
+class RingFull(Exception):
+    """Not enough free space in the ring for a record"""
+
+
+class AudioRing:
+    """Byte ring in a named shared memory block
+
+    The producer calls write() and sends the returned position and length to
+    the consumer, which calls read() and then release() for records in the
+    order they were written.
+    """
+
+    def __init__(self, name=None, capacity=8 << 20, create=True):
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + capacity)
+            _HEADER.pack_into(self._shm.buf, 0, 0, 0)
+        else:
+            try:
+                # Python 3.13+: the creating process alone owns the block's lifetime
+                self._shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.capacity = self._shm.size - _HEADER.size
+        self.owner = create
+        self._data = self._shm.buf[_HEADER.size:]
+
+    @classmethod
+    def attach(cls, name):
+        """Open a ring created by another process"""
+        return cls(name=name, create=False)
+
+    def _head(self):
+        return _HEADER.unpack_from(self._shm.buf, 0)[0]
+
+    def _tail(self):
+        return _HEADER.unpack_from(self._shm.buf, 0)[1]
+
+    def write(self, data):
+        """Copy a record into the ring; returns its position (producer side)"""
+        data = memoryview(data).cast('B')
+        size = len(data)
+        if size > self.capacity:
+            raise RingFull(f"Record of {size} bytes exceeds ring capacity {self.capacity}")
+
+        head = self._head()
+        offset = head % self.capacity
+        if offset + size > self.capacity:
+            head += self.capacity - offset  # Skip the remainder and wrap to 0
+            offset = 0
+        if head + size - self._tail() > self.capacity:
+            raise RingFull(f"Ring {self.name} full")
+
+        self._data[offset:offset + size] = data
+        struct.pack_into('<Q', self._shm.buf, 0, head + size)  # Publish after the data is in place
+        return head
+
+    def read(self, position, size):
+        """Copy a record out of the ring (consumer side)"""
+        offset = position % self.capacity
+        return bytes(self._data[offset:offset + size])
+
+    def release(self, position, size):
+        """Free a record and everything written before it (consumer side)"""
+        struct.pack_into('<Q', self._shm.buf, 8, position + size)
+
+    def used(self):
+        """Bytes currently held (including wrap padding)"""
+        return self._head() - self._tail()
+
+    def close(self):
+        """Detach; the creating side also removes the block"""
+        self._data.release()
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
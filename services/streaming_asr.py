@@ -0,0 +1,162 @@
+"""
+Streaming (incremental) recognition on top of utterance-level Whisper
+- While the caller speaks, the utterance so far is re-decoded every step_ms
+  (each window overlaps the previous one, anchored at the utterance start)
+- Local agreement: words on which two consecutive hypotheses agree are
+  committed and never retracted
+- Committed words are released for translation at clause boundaries, so
+  MT and TTS start before the utterance ends
+- Time-to-first-translated-audio per utterance
+"""
+
+import time
+
+# Words ending a clause; committed text is released for translation after them
+CLAUSE_END = ('.', ',', '?', '!', ';', ':', '。', '，', '？', '！', '،')
+
+# A partial decode that has not come back after this long is presumed dropped
+PARTIAL_TIMEOUT = 5.0
+
+_STRIP = '.,?!;:\'"()[]¿¡…。，？！،'
+
+
+def _word_key(word):
+    """Comparison form of a word (case and punctuation insensitive)"""
+    return word.strip(_STRIP).casefold()
+
+
+def agreement(previous, current):
+    """Number of leading words two hypotheses agree on"""
+    n = 0
+    for a, b in zip(previous, current):
+        if _word_key(a) != _word_key(b):
+            break
+        n += 1
+    return n
+
+
+class AudioJob:
+    """Audio handed to the inference workers for one decode"""
+
+    __slots__ = ('audio', 'final', 'utterance', 'started')
+
+    def __init__(self, audio, final, utterance, started):
+        self.audio = audio
+        self.final = final
+        self.utterance = utterance
+        self.started = started  # Monotonic time the utterance began
+
+
+class StreamingTranscript:
+    """Incremental hypothesis state for one call
+
+    The RTP side calls partial_job() / final_job() as the utterance grows and
+    ends; the inference worker calls update() with each decode result (one
+    at a time per call, in submission order).
+    """
+
+    def __init__(self, step_ms=1000, sample_rate=8000):
+        self.sample_rate = sample_rate
+        self.step_samples = sample_rate * step_ms // 1000
+
+        # RTP side
+        self._utterance = 0
+        self._started = None
+        self._decoded_samples = 0
+        self._partial_sent_at = None
+
+        # Worker side
+        self._worker_utterance = None
+        self._previous = []
+        self._committed = []
+        self._released = 0
+        self._audio_utterance = None
+
+        self.partials = 0
+        self.finals = 0
+        self.early_releases = 0
+
+    def _start(self, samples, now):
+        """Utterance start time, estimated from the audio already buffered"""
+        if self._started is None:
+            self._started = now - samples / self.sample_rate
+        return self._started
+
+    def wants_partial(self, samples, now=None):
+        """True when the utterance grew by a step and no partial is in flight"""
+        now = time.monotonic() if now is None else now
+        if self._partial_sent_at is not None and now - self._partial_sent_at < PARTIAL_TIMEOUT:
+            return False
+        return samples - self._decoded_samples >= self.step_samples
+
+    def partial_job(self, audio, now=None):
+        """Job re-decoding the utterance so far"""
+        now = time.monotonic() if now is None else now
+        self._decoded_samples = len(audio)
+        self._partial_sent_at = now
+        return AudioJob(audio, False, self._utterance, self._start(len(audio), now))
+
+    def final_job(self, audio, now=None):
+        """Job decoding a completed utterance; the next audio starts a new one"""
+        now = time.monotonic() if now is None else now
+        job = AudioJob(audio, True, self._utterance, self._start(len(audio), now))
+        self._utterance += 1
+        self._started = None
+        self._decoded_samples = 0
+        self._partial_sent_at = None
+        return job
+
+    def partial_done(self):
+        """A partial decode finished or was skipped (worker side)"""
+        self._partial_sent_at = None
+
+    def update(self, job, hypothesis):
+        """Feed a decode result; returns newly committed text ready for translation"""
+        if job.utterance != self._worker_utterance:
+            # New utterance (or the previous one's final decode was dropped)
+            self._worker_utterance = job.utterance
+            self._previous = []
+            self._committed = []
+            self._released = 0
+
+        words = hypothesis.split()
+        if job.final:
+            self.finals += 1
+            # Committed words were already spoken; take the rest of the final result
+            self._committed.extend(words[len(self._committed):])
+            ready = self._committed[self._released:]
+            self._released = len(self._committed)
+            self._previous = []
+            return ' '.join(ready)
+
+        self.partials += 1
+        agreed = agreement(self._previous, words)
+        if agreed > len(self._committed):
+            self._committed.extend(words[len(self._committed):agreed])
+        self._previous = words
+
+        # Release up to the last committed clause boundary
+        end = self._released
+        for i in range(len(self._committed) - 1, self._released - 1, -1):
+            if self._committed[i].endswith(CLAUSE_END):
+                end = i + 1
+                break
+        if end == self._released:
+            return ''
+        ready = self._committed[self._released:end]
+        self._released = end
+        self.early_releases += 1
+        return ' '.join(ready)
+
+    @property
+    def committed_text(self):
+        """Words committed so far in the current utterance"""
+        return ' '.join(self._committed)
+
+    def first_audio(self, job, now=None):
+        """Seconds from utterance start to its first translated audio, once per utterance"""
+        if job.utterance == self._audio_utterance:
+            return None
+        self._audio_utterance = job.utterance
+        now = time.monotonic() if now is None else now
+        return now - job.started
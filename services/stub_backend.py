@@ -0,0 +1,96 @@
+"""
+Fixed-latency stand-ins for Whisper, MarianMT and TTS
+- A backends.SpeechBackend like the model backends, so the service runs
+  its full RTP / jitter / VAD / scheduling / codec / pacing path unchanged
+- Each call sleeps for a configured time (like waiting on a GPU, without
+  holding the GIL) and returns deterministic output
+- Transcripts are unique per utterance so the phrase cache never hides the
+  backend latency
+- Language identification always answers the configured language
+- Needs no model libraries: IO-path capacity can be measured on a plain
+  CPU box (see benchmarks/bench_load.py)
+"""
+
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from backends import ROUTED_STAGES, SpeechBackend
+
+TTS_SAMPLE_RATE = 16000
+
+# Synthesized speech length per word and tone level of the stub voice
+SECONDS_PER_WORD = 0.3
+TONE_LEVEL = 0.25
+
+
+class StubBackend(SpeechBackend):
+    """Deterministic ASR / MT / TTS with fixed latencies in milliseconds"""
+
+    name = 'stub'
+
+    def __init__(self, asr_ms=150, mt_ms=50, tts_ms=100, lid_ms=50, language='en', words_per_second=2.5, cost=0.0):
+        super().__init__({stage: cost for stage in ROUTED_STAGES})
+        self.asr_delay = asr_ms / 1000.0
+        self.mt_delay = mt_ms / 1000.0
+        self.tts_delay = tts_ms / 1000.0
+        self.lid_delay = lid_ms / 1000.0
+        self.language = language
+        self.words_per_second = words_per_second
+        self.tts_sample_rate = TTS_SAMPLE_RATE
+
+        self._ids = itertools.count()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _call(self, delay, fn, *args):
+        """Account for one request and wait out its latency"""
+        with self._lock:
+            self._in_flight += 1
+            self.requests += 1
+        try:
+            time.sleep(delay)
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def transcribe(self, audio, language, degraded=False):
+        """One word per 1/words_per_second of 16 kHz audio, tagged with a unique id"""
+        def run():
+            words = max(1, int(len(audio) / 16000.0 * self.words_per_second))
+            return f"utterance {next(self._ids)} " + ' '.join(['word'] * words)
+        return self._call(self.asr_delay, run)
+
+    def translate(self, text, source_lang, target_lang):
+        """The input text, marked with the target language"""
+        return self._call(self.mt_delay, lambda: f"[{target_lang}] {text}")
+
+    def synthesize(self, text, language):
+        """A two-tone signal lasting SECONDS_PER_WORD per word"""
+        def run():
+            samples = int(len(text.split()) * SECONDS_PER_WORD * self.tts_sample_rate)
+            t = np.arange(samples, dtype=np.float32) / self.tts_sample_rate
+            return (TONE_LEVEL * 0.5 * (np.sin(2 * np.pi * 300 * t) + np.sin(2 * np.pi * 700 * t))).astype(np.float32)
+        return self._call(self.tts_delay, run)
+
+    def detect_language(self, audio, candidates=None):
+        """The configured language (the first candidate if it is not one of them)"""
+        language = self.language if not candidates or self.language in candidates else candidates[0]
+        return self._call(self.lid_delay, lambda: (language, 1.0))
+
+    def get_stats(self):
+        """Backend statistics (keys shared with InferenceWorkerPool)"""
+        return {
+            'workers': 0,
+            'ready': 0,
+            'in_flight': self._in_flight,
+            'requests': self.requests,
+            'failures': 0,
+            'retries': 0,
+            'restarts': 0,
+            'served': [],
+        }
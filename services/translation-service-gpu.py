@@ -2,25 +2,46 @@
 """
 GPU-Based Real-Time Translation Service for Asterisk
 Receives RTP from Asterisk, translates using local GPU models, sends back RTP
+Languages can be switched per call over the language control socket, and
+SOURCE_LANGUAGE=auto identifies the caller's language from the first utterance
 """
 
 import os
 import socket
-import struct
 import threading
 import queue
 import logging
+
 import numpy as np
-import torch
-from transformers import pipeline
-import whisper
+
+import g711
+from backends import DEFAULT_CONFIG, STAGE_LID, create_router
+from language_control import LanguageControlServer, LanguageDirectory, normalize_language
+from resample import PolyphaseResampler, resample
+from rtp import RTPReceiver
+from rtp_sender import OutboundStream, RTPSender
+from vad import VADSegmenter, create_vad
 
 # Configuration
 RTP_LISTEN_IP = os.getenv('RTP_LISTEN_IP', '0.0.0.0')
 RTP_LISTEN_PORT = int(os.getenv('RTP_LISTEN_PORT', '4000'))
 RTP_SEND_PORT = int(os.getenv('RTP_SEND_PORT', '4001'))
-SOURCE_LANGUAGE = os.getenv('SOURCE_LANGUAGE', 'en')
+RTP_FILL_MODE = os.getenv('RTP_FILL_MODE', 'silence')  # none | silence | noise between utterances
+SOURCE_LANGUAGE = os.getenv('SOURCE_LANGUAGE', 'en')  # auto = identify from the caller's audio
 TARGET_LANGUAGE = os.getenv('TARGET_LANGUAGE', 'es')
+LANGUAGE_ID_CANDIDATES = [c.strip() for c in os.getenv('LANGUAGE_ID_CANDIDATES', '').split(',') if c.strip()]  # Empty = any
+LANGUAGE_CONTROL_IP = os.getenv('LANGUAGE_CONTROL_IP', '127.0.0.1')
+LANGUAGE_CONTROL_PORT = int(os.getenv('LANGUAGE_CONTROL_PORT', '0'))  # e.g. 9109; 0 = no control socket
+VAD_MODE = os.getenv('VAD_MODE', 'energy')
+VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', '400'))
+VAD_MAX_SEGMENT_MS = int(os.getenv('VAD_MAX_SEGMENT_MS', '8000'))
+# Inference backends (backends.py): models | stub | azure | azure-emulator, comma separated to route
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'models')
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+TTS_MODEL = os.getenv('TTS_MODEL', DEFAULT_CONFIG['tts_model'])
+# Execution profiles: fp32 | fp16 (CUDA) | int8 (CPU) | auto | ctranslate2 (Whisper only)
+WHISPER_PROFILE = os.getenv('WHISPER_PROFILE', 'fp32')
+MT_PROFILE = os.getenv('MT_PROFILE', 'fp32')
 
 # Logging
 logging.basicConfig(
@@ -30,81 +51,44 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class RTPPacket:
-    """Parse and create RTP packets"""
-    
-    def __init__(self, data=None):
-        if data:
-            self.parse(data)
-    
-    def parse(self, data):
-        """Parse RTP packet"""
-        if len(data) < 12:
-            raise ValueError("RTP packet too short")
-        
-        header = struct.unpack('!BBHII', data[:12])
-        self.version = (header[0] >> 6) & 0x03
-        self.padding = (header[0] >> 5) & 0x01
-        self.extension = (header[0] >> 4) & 0x01
-        self.csrc_count = header[0] & 0x0F
-        self.marker = (header[1] >> 7) & 0x01
-        self.payload_type = header[1] & 0x7F
-        self.sequence = header[2]
-        self.timestamp = header[3]
-        self.ssrc = header[4]
-        self.payload = data[12:]
-    
-    @staticmethod
-    def create(payload, sequence, timestamp, ssrc=12345, payload_type=0):
-        """Create RTP packet"""
-        header = struct.pack(
-            '!BBHII',
-            0x80,
-            payload_type,
-            sequence,
-            timestamp,
-            ssrc
-        )
-        return header + payload
-
-
 class GPUTranslationService:
     """GPU-based real-time translation service"""
     
     def __init__(self):
         self.running = False
         self.audio_queue = queue.Queue()
-        self.translation_queue = queue.Queue()
         
-        # RTP state
-        self.sequence = 0
-        self.timestamp = 0
-        self.ssrc = 12345
+        # Outbound RTP: paced 20ms frames on the shared sender
+        self.stream = OutboundStream(ssrc=12345)
+        self.rtp_sender = RTPSender(fill=RTP_FILL_MODE)
+        self.tts_resampler = None
         
         # Sockets
         self.listen_socket = None
-        self.send_socket = None
         self.asterisk_addr = None
         
-        # Load models
-        logger.info("Loading GPU models...")
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {device}")
-        
-        # Whisper for speech-to-text
-        self.whisper_model = whisper.load_model("base", device=device)
+        # Languages of the current call (source None: identify from the audio)
+        self.source_lang = normalize_language(SOURCE_LANGUAGE, allow_auto=True)
+        self.target_lang = normalize_language(TARGET_LANGUAGE)
+        self.languages = LanguageDirectory(on_update=self.languages_registered)
+        self.language_control = None
         
-        # Translation model - use MarianMT directly
-        from transformers import MarianMTModel, MarianTokenizer
-        model_name = f"Helsinki-NLP/opus-mt-{SOURCE_LANGUAGE}-{TARGET_LANGUAGE}"
-        logger.info(f"Loading translation model: {model_name}")
-        self.translation_tokenizer = MarianTokenizer.from_pretrained(model_name)
-        self.translation_model = MarianMTModel.from_pretrained(model_name)
-        if device == "cuda":
-            self.translation_model = self.translation_model.to("cuda")
-        
-        # TTS - TODO: Add later
-        self.tts = None
+        # Load models: Whisper, MarianMT for the configured pair and Coqui TTS
+        # (or whichever backends INFERENCE_BACKEND names); other pairs load on demand
+        logger.info("Loading GPU models...")
+        self.backend = create_router(INFERENCE_BACKEND, dict(
+            DEFAULT_CONFIG,
+            whisper_model=WHISPER_MODEL,
+            whisper_profile=WHISPER_PROFILE,
+            mt_profile=MT_PROFILE,
+            tts_model=TTS_MODEL,
+            translation_prewarm_pairs=[f"{self.source_lang}-{self.target_lang}"] if self.source_lang else [],
+            azure_speech_key=os.getenv('AZURE_SPEECH_KEY'),
+            azure_speech_region=os.getenv('AZURE_SPEECH_REGION'),
+            azure_translator_key=os.getenv('AZURE_TRANSLATOR_KEY'),
+        ))
+        self.backend.start()
+        logger.info(f"Using device: {self.backend.device}")
         
         logger.info("Models loaded successfully")
     
@@ -112,20 +96,23 @@ class GPUTranslationService:
         """Start the translation service"""
         logger.info("Starting GPU Translation Service")
         logger.info(f"Listening on {RTP_LISTEN_IP}:{RTP_LISTEN_PORT}")
-        logger.info(f"Translation: {SOURCE_LANGUAGE} → {TARGET_LANGUAGE}")
+        logger.info(f"Translation: {self.source_lang or 'auto'} → {self.target_lang}")
         
         self.running = True
         
+        if LANGUAGE_CONTROL_PORT:
+            self.language_control = LanguageControlServer(self.languages, LANGUAGE_CONTROL_IP, LANGUAGE_CONTROL_PORT)
+            self.language_control.start()
+        
         # Create sockets
         self.listen_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.listen_socket.bind((RTP_LISTEN_IP, RTP_LISTEN_PORT))
         
-        self.send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rtp_sender.start()
         
         # Start threads
         threading.Thread(target=self.receive_rtp, daemon=True).start()
         threading.Thread(target=self.process_audio, daemon=True).start()
-        threading.Thread(target=self.send_translated_rtp, daemon=True).start()
         
         logger.info("GPU Translation Service running")
         
@@ -135,150 +122,110 @@ class GPUTranslationService:
         except KeyboardInterrupt:
             logger.info("Shutting down...")
             self.running = False
+            self.audio_queue.put(None)
+            if self.language_control:
+                self.language_control.stop()
+            self.rtp_sender.stop()
+            self.backend.stop()
     
     def receive_rtp(self):
         """Receive RTP packets from Asterisk"""
         logger.info("RTP receiver started")
         
+        # One preallocated receive buffer, parsed in place
+        receiver = RTPReceiver(self.listen_socket)
+        
         while self.running:
             try:
-                data, addr = self.listen_socket.recvfrom(2048)
+                packet, addr = receiver.receive_rtp()
                 
                 if not self.asterisk_addr:
                     self.asterisk_addr = addr
+                    self.rtp_sender.add_session(self.stream, (addr[0], RTP_SEND_PORT))
                     logger.info(f"Asterisk connected from {addr}")
+                    registered = self.languages.lookup(RTP_LISTEN_PORT, addr)
+                    if registered:
+                        self.set_languages(*registered)
                 
-                try:
-                    packet = RTPPacket(data)
-                    self.audio_queue.put(packet.payload)
-                except Exception as e:
-                    logger.error(f"RTP parse error: {e}")
+                if packet is None:
+                    logger.error("RTP parse error: malformed packet")
+                    continue
+                # Copied: the receive buffer is reused for the next packet
+                self.audio_queue.put(bytes(packet.payload))
                 
             except Exception as e:
                 logger.error(f"RTP receive error: {e}")
     
-    def pcmu_to_linear(self, pcmu_data):
-        """Convert PCMU (G.711 μ-law) to linear PCM"""
-        # μ-law decompression table
-        pcmu_array = np.frombuffer(pcmu_data, dtype=np.uint8)
-        linear = np.zeros(len(pcmu_array), dtype=np.int16)
-        
-        for i, val in enumerate(pcmu_array):
-            val = ~val
-            sign = (val & 0x80)
-            exponent = (val >> 4) & 0x07
-            mantissa = val & 0x0F
-            
-            sample = ((mantissa << 3) + 0x84) << exponent
-            if sign:
-                sample = -sample
-            linear[i] = sample
-        
-        return linear.astype(np.float32) / 32768.0
-    
-    def linear_to_pcmu(self, linear_data):
-        """Convert linear PCM to PCMU (G.711 μ-law)"""
-        linear_data = np.clip(linear_data * 32768.0, -32768, 32767).astype(np.int16)
-        pcmu = np.zeros(len(linear_data), dtype=np.uint8)
-        
-        for i, sample in enumerate(linear_data):
-            sign = 0x80 if sample < 0 else 0x00
-            sample = abs(sample)
-            
-            exponent = 7
-            for exp in range(8):
-                if sample <= (0x1F << (exp + 3)):
-                    exponent = exp
-                    break
-            
-            mantissa = (sample >> (exponent + 3)) & 0x0F
-            pcmu[i] = ~(sign | (exponent << 4) | mantissa) & 0xFF
-        
-        return pcmu.tobytes()
-    
     def process_audio(self):
         """Process audio with GPU models"""
         logger.info("Audio processor started")
         
-        audio_buffer = bytearray()
+        segmenter = VADSegmenter(
+            create_vad(VAD_MODE),
+            hangover_ms=VAD_HANGOVER_MS,
+            max_segment_ms=VAD_MAX_SEGMENT_MS
+        )
         
-        while self.running:
+        while True:
+            # Blocks until audio arrives; None means shut down
+            payload = self.audio_queue.get()
+            if payload is None:
+                break
+            
             try:
-                if not self.audio_queue.empty():
-                    payload = self.audio_queue.get(timeout=0.1)
-                    audio_buffer.extend(payload)
-                    
-                    # Process every 2 seconds of audio
-                    if len(audio_buffer) >= 16000:  # 2 seconds at 8kHz
-                        # Convert PCMU to linear PCM
-                        linear_audio = self.pcmu_to_linear(bytes(audio_buffer))
-                        
-                        # Resample to 16kHz for Whisper
-                        # Simple upsampling (proper resampling would use librosa)
-                        audio_16k = np.repeat(linear_audio, 2)
-                        
-                        # Speech-to-text with Whisper
-                        result = self.whisper_model.transcribe(audio_16k, language=SOURCE_LANGUAGE)
-                        text = result["text"]
-                        logger.info(f"Recognized: {text}")
-                        
-                        if text.strip():
-                            # Translate using model directly
-                            inputs = self.translation_tokenizer(text, return_tensors="pt", padding=True)
-                            device = "cuda" if torch.cuda.is_available() else "cpu"
-                            if device == "cuda":
-                                inputs = {k: v.to("cuda") for k, v in inputs.items()}
-                            
-                            translated_ids = self.translation_model.generate(**inputs)
-                            translated = self.translation_tokenizer.batch_decode(translated_ids, skip_special_tokens=True)[0]
-                            logger.info(f"Translated: {translated}")
-                            
-                            # Text-to-speech
-                            # For now, echo back original audio (TTS integration needed)
-                            # TODO: Implement proper TTS
-                            self.translation_queue.put(bytes(audio_buffer))
-                        
-                        audio_buffer.clear()
+                # Only complete utterances go to the models; silence is skipped
+                for segment in segmenter.feed(g711.pcmu_to_linear(payload)):
+                    self.process_segment(segment)
+                    logger.info(f"VAD skipped {segmenter.skipped_percent:.1f}% of audio so far")
                 
-            except queue.Empty:
-                continue
             except Exception as e:
                 logger.error(f"Audio processing error: {e}")
     
-    def send_translated_rtp(self):
-        """Send translated audio back to Asterisk as RTP"""
-        logger.info("RTP sender started")
-        
-        while self.running:
-            try:
-                if not self.translation_queue.empty() and self.asterisk_addr:
-                    audio_data = self.translation_queue.get(timeout=0.1)
-                    
-                    # Split into RTP packets (160 bytes = 20ms)
-                    chunk_size = 160
-                    for i in range(0, len(audio_data), chunk_size):
-                        chunk = audio_data[i:i+chunk_size]
-                        
-                        rtp_packet = RTPPacket.create(
-                            chunk,
-                            self.sequence,
-                            self.timestamp,
-                            self.ssrc,
-                            payload_type=0
-                        )
-                        
-                        self.send_socket.sendto(
-                            rtp_packet,
-                            (self.asterisk_addr[0], RTP_SEND_PORT)
-                        )
-                        
-                        self.sequence = (self.sequence + 1) % 65536
-                        self.timestamp += 160
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.error(f"RTP send error: {e}")
+    def set_languages(self, source, target):
+        """Switch languages (source None: identify it from the next utterance)"""
+        self.source_lang = source
+        self.target_lang = target
+        logger.info(f"Translation: {source or 'auto'} → {target}")
+        if source and source != target:
+            self.backend.prepare(source, target)
+    
+    def languages_registered(self, port, remote, source, target):
+        """Control socket registration for this service's stream (control thread)"""
+        if port == RTP_LISTEN_PORT or (remote is not None and remote == self.asterisk_addr):
+            self.set_languages(source, target)
+    
+    def process_segment(self, linear_audio):
+        """Recognize, translate and speak one utterance (8 kHz float32 PCM)"""
+        # Resample to 16kHz for Whisper
+        audio_16k = resample(linear_audio, 8000, 16000)
+        
+        # Unknown source: identify it from this first utterance
+        if self.source_lang is None:
+            language = 'en'
+            if self.backend.supports(STAGE_LID):
+                language, probability = self.backend.detect_language(audio_16k[:16000 * 3], LANGUAGE_ID_CANDIDATES or None)
+                logger.info(f"Identified language {language} (p={probability:.2f})")
+            self.set_languages(language, self.target_lang)
+        source, target = self.source_lang, self.target_lang
+        
+        # Speech-to-text
+        text = self.backend.transcribe(audio_16k, source).strip()
+        logger.info(f"Recognized: {text}")
+        if not text or source == target:
+            return
+        
+        translated = self.backend.translate(text, source, target)
+        if translated is None:
+            logger.warning(f"Translation model {source}-{target} not ready, skipping utterance")
+            return
+        logger.info(f"Translated: {translated}")
+        
+        # Text-to-speech, resampled to 8kHz PCMU for the paced sender
+        tts_audio = self.backend.synthesize(translated, target)
+        if self.tts_resampler is None:
+            self.tts_resampler = PolyphaseResampler(self.backend.tts_sample_rate, 8000)
+        audio_8k = self.tts_resampler.process(np.asarray(tts_audio, dtype=np.float32))
+        self.rtp_sender.enqueue(self.stream, g711.linear_to_pcmu(audio_8k))
 
 
 def main():
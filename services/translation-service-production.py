@@ -3,35 +3,139 @@
 Production Real-Time Translation Service for Phone Company
 - Handles multiple concurrent calls
 - GPU-accelerated with Whisper Large + FastSpeech2
+- Per-call languages (dialplan / ARI / control socket), shared models for
+  every language pair
 - Automatic language detection
 - Call logging and monitoring
 - Graceful error handling
 """
 
 import os
-import socket
-import struct
 import threading
 import queue
 import logging
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from collections import defaultdict
+from collections import deque
 import numpy as np
-import torch
-import whisper
-from transformers import pipeline
-from TTS.api import TTS
+
+# torch, whisper, transformers and TTS are imported when the backends start,
+# so the RTP ports can be bound first
+import g711
+from backends import STAGE_LID, create_router, parse_costs
+from inference_scheduler import InferenceScheduler, POLICY_DEGRADE, POLICY_DROP_OLDEST
+from jitter_buffer import JitterBuffer
+from language_control import ARIChannelLanguages, LanguageControlServer, LanguageDirectory, normalize_language
+from metrics import MetricsRegistry, MetricsServer, summarize_latencies
+from phrase_cache import PhraseCache, PhraseStore
+from resample import PolyphaseResampler, resample
+from rtp_engine import RTPEngine
+from rtp_sender import RTPSender
+from session_manager import EVICT_BYE, SessionManager, TranslationHistoryLog
+from streaming_asr import StreamingTranscript
+from tts_chunker import split_clauses
+from vad import VADSegmenter, create_vad
 
 # Configuration
 RTP_LISTEN_IP = os.getenv('RTP_LISTEN_IP', '0.0.0.0')
 RTP_BASE_PORT = int(os.getenv('RTP_BASE_PORT', '4000'))
+RTP_SAMPLE_RATE = 8000
+ASR_SAMPLE_RATE = 16000
+RTP_FILL_MODE = os.getenv('RTP_FILL_MODE', 'silence')
 MAX_CONCURRENT_CALLS = int(os.getenv('MAX_CONCURRENT_CALLS', '50'))
+AUDIO_QUEUE_SIZE = int(os.getenv('AUDIO_QUEUE_SIZE', '100'))
+# Workers block on the ASR and MT batchers, so keep this >= ASR_BATCH_SIZE and MT_BATCH_SIZE
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', '8'))
+OVERLOAD_POLICY = os.getenv('OVERLOAD_POLICY', POLICY_DROP_OLDEST)
+FALLBACK_WHISPER_MODEL = os.getenv('FALLBACK_WHISPER_MODEL', 'base')
+ASR_BATCH_SIZE = int(os.getenv('ASR_BATCH_SIZE', '8'))
+ASR_BATCH_WINDOW_MS = int(os.getenv('ASR_BATCH_WINDOW_MS', '50'))
+MT_BATCH_SIZE = int(os.getenv('MT_BATCH_SIZE', '8'))
+MT_BATCH_WINDOW_MS = int(os.getenv('MT_BATCH_WINDOW_MS', '20'))
+MT_NUM_BEAMS = int(os.getenv('MT_NUM_BEAMS', '1'))  # 1 = greedy
+VAD_MODE = os.getenv('VAD_MODE', 'energy')
+VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', '400'))
+VAD_MAX_SEGMENT_MS = int(os.getenv('VAD_MAX_SEGMENT_MS', '8000'))
+# Re-decode the utterance in progress every ASR_STREAM_STEP_MS and translate committed clauses early
+STREAMING_ASR = os.getenv('STREAMING_ASR', 'false').lower() in ('1', 'true', 'yes')
+ASR_STREAM_STEP_MS = int(os.getenv('ASR_STREAM_STEP_MS', '1000'))
+# Synthesize translations clause by clause (0 = whole text at once)
+TTS_CLAUSE_MIN_CHARS = int(os.getenv('TTS_CLAUSE_MIN_CHARS', '20'))
+JITTER_MIN_DEPTH = int(os.getenv('JITTER_MIN_DEPTH', '2'))
+JITTER_MAX_DEPTH = int(os.getenv('JITTER_MAX_DEPTH', '10'))
+SESSION_IDLE_TIMEOUT = float(os.getenv('SESSION_IDLE_TIMEOUT', '30'))
+TRANSLATION_HISTORY_SIZE = int(os.getenv('TRANSLATION_HISTORY_SIZE', '32'))
+RTCP_PORT_OFFSET = int(os.getenv('RTCP_PORT_OFFSET', '0'))  # 0 = RTCP muxed on the RTP port only
+TRANSLATION_MODEL_BUDGET_MB = int(os.getenv('TRANSLATION_MODEL_BUDGET_MB', '4096'))
+TRANSLATION_MODEL_WAIT = float(os.getenv('TRANSLATION_MODEL_WAIT', '0.5'))
+TRANSLATION_PREWARM_PAIRS = [p.strip() for p in os.getenv('TRANSLATION_PREWARM_PAIRS', 'en-es,es-en').split(',') if p.strip()]
+PHRASE_CACHE_SIZE = int(os.getenv('PHRASE_CACHE_SIZE', '2000'))
+PHRASE_CACHE_MAX_WORDS = int(os.getenv('PHRASE_CACHE_MAX_WORDS', '8'))
+PHRASE_CACHE_PATH = os.getenv('PHRASE_CACHE_PATH', '')  # Empty = memory only
+PHRASE_CACHE_MAX_MB = int(os.getenv('PHRASE_CACHE_MAX_MB', '256'))
 WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'large-v2')
+TTS_MODEL = os.getenv('TTS_MODEL', 'tts_models/multilingual/multi-dataset/your_tts')
+# Inference backends (backends.py), comma separated to route between them:
+# 'models' = Whisper / MarianMT / TTS; 'azure' = Azure Speech + Translator;
+# 'azure-emulator' = local stand-in for Azure; 'stub' = fixed-latency fakes for IO-path benchmarks
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'models')
+BACKEND_COSTS = os.getenv('BACKEND_COSTS', '')  # e.g. 'models=1,azure=10' (relative cost per request)
+# Per-stage p95 latency budgets: the cheapest backend within budget serves each request (0 = cheapest)
+ASR_BUDGET_MS = int(os.getenv('ASR_BUDGET_MS', '1500'))
+MT_BUDGET_MS = int(os.getenv('MT_BUDGET_MS', '300'))
+TTS_BUDGET_MS = int(os.getenv('TTS_BUDGET_MS', '800'))
+STUB_ASR_MS = int(os.getenv('STUB_ASR_MS', '150'))
+STUB_MT_MS = int(os.getenv('STUB_MT_MS', '50'))
+STUB_TTS_MS = int(os.getenv('STUB_TTS_MS', '100'))
+STUB_LID_MS = int(os.getenv('STUB_LID_MS', '50'))
+AZURE_SPEECH_KEY = os.getenv('AZURE_SPEECH_KEY')
+AZURE_SPEECH_REGION = os.getenv('AZURE_SPEECH_REGION')
+AZURE_TRANSLATOR_KEY = os.getenv('AZURE_TRANSLATOR_KEY')
+AZURE_TRANSLATOR_REGION = os.getenv('AZURE_TRANSLATOR_REGION')
+# > 0: run the models in separate worker processes (one per GPU by default)
+INFERENCE_PROCESSES = int(os.getenv('INFERENCE_PROCESSES', '0'))
+INFERENCE_PROCESS_THREADS = int(os.getenv('INFERENCE_PROCESS_THREADS', '8'))
+# Bind RTP ports first and load models in the background (false = load before binding)
+LAZY_MODEL_LOADING = os.getenv('LAZY_MODEL_LOADING', 'true').lower() in ('1', 'true', 'yes')
+# Execution profiles per model: fp32 | fp16 (CUDA) | int8 (CPU) | auto | ctranslate2 (Whisper only)
+WHISPER_PROFILE = os.getenv('WHISPER_PROFILE', 'fp32')
+FALLBACK_WHISPER_PROFILE = os.getenv('FALLBACK_WHISPER_PROFILE', 'fp32')
+MT_PROFILE = os.getenv('MT_PROFILE', 'fp32')
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', '')  # safetensors cache of Whisper weights (per precision)
+# Per-call languages (language_control.py); the defaults apply to streams nobody registered
+DEFAULT_SOURCE_LANGUAGE = os.getenv('DEFAULT_SOURCE_LANGUAGE', 'en')  # auto = identify from the caller's audio
+DEFAULT_TARGET_LANGUAGE = os.getenv('DEFAULT_TARGET_LANGUAGE', 'es')
+LANGUAGE_CONTROL_IP = os.getenv('LANGUAGE_CONTROL_IP', '127.0.0.1')
+LANGUAGE_CONTROL_PORT = int(os.getenv('LANGUAGE_CONTROL_PORT', '9109'))  # 0 = no control socket
+ARI_URL = os.getenv('ARI_URL', '')  # e.g. http://127.0.0.1:8088/ari; empty = no channel variable lookup
+ARI_USER = os.getenv('ARI_USER', '')
+ARI_PASSWORD = os.getenv('ARI_PASSWORD', '')
+# Spoken language identification when the source is 'auto'
+LANGUAGE_ID_SECONDS = float(os.getenv('LANGUAGE_ID_SECONDS', '3'))  # Speech used per attempt
+LANGUAGE_ID_MIN_SECONDS = float(os.getenv('LANGUAGE_ID_MIN_SECONDS', '1'))  # Partial utterances shorter than this wait
+LANGUAGE_ID_THRESHOLD = float(os.getenv('LANGUAGE_ID_THRESHOLD', '0.6'))  # Below this the next utterance is tried too
+LANGUAGE_ID_ATTEMPTS = int(os.getenv('LANGUAGE_ID_ATTEMPTS', '3'))
+LANGUAGE_ID_CANDIDATES = [c.strip() for c in os.getenv('LANGUAGE_ID_CANDIDATES', '').split(',') if c.strip()]  # Empty = any
+LANGUAGE_ID_FALLBACK = os.getenv('LANGUAGE_ID_FALLBACK', 'en')  # When no backend identifies languages
+METRICS_LISTEN_IP = os.getenv('METRICS_LISTEN_IP', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))  # 0 = no /metrics endpoint
+READY_FILE = os.getenv('READY_FILE', '')  # Written with startup timings once models are loaded
 LOG_DIR = os.getenv('LOG_DIR', '/var/log/translation-service')
 CALL_RECORDINGS_DIR = os.getenv('CALL_RECORDINGS_DIR', '/var/recordings')
 
+# Stages timed into translation_stage_seconds{stage=...}
+PIPELINE_STAGES = ('jitter', 'decode', 'vad', 'lid', 'asr', 'mt', 'tts', 'encode', 'send')
+
+# Where a call's languages came from
+ORIGIN_DEFAULT = 'default'
+ORIGIN_CONTROL = 'control'
+ORIGIN_ARI = 'ari'
+ORIGIN_DETECTED = 'detected'
+ORIGIN_GUESSED = 'guessed'  # Low-confidence identification, retried on the next utterances
+ORIGIN_FALLBACK = 'fallback'
+
 # Logging
 os.makedirs(LOG_DIR, exist_ok=True)
 logging.basicConfig(
@@ -48,27 +152,69 @@ logger = logging.getLogger(__name__)
 class CallSession:
     """Represents a single call translation session"""
     
-    def __init__(self, session_id, source_lang, target_lang):
+    __slots__ = (
+        'session_id', 'source_lang', 'target_lang', 'language_origin', 'language_attempts',
+        'start_time', 'last_activity',
+        'vad', 'transcript', 'jitter_buffer', 'tts_resampler',
+        'asterisk_addr', 'rtp_port', 'remote_ssrc', 'sequence', 'timestamp', 'ssrc',
+        'payload_type', 'packets_received', 'packets_sent',
+        'translations', 'translations_count', 'history_log', 'history_lock', 'ended',
+    )
+    
+    def __init__(self, session_id, source_lang, target_lang, history_log=None, language_origin=ORIGIN_DEFAULT):
         self.session_id = session_id
-        self.source_lang = source_lang
+        self.source_lang = source_lang  # None until identified from the caller's audio
         self.target_lang = target_lang
+        self.language_origin = language_origin
+        self.language_attempts = 0
         self.start_time = datetime.now()
-        self.audio_buffer = bytearray()
+        self.last_activity = time.monotonic()
+        self.vad = VADSegmenter(
+            create_vad(VAD_MODE),
+            hangover_ms=VAD_HANGOVER_MS,
+            max_segment_ms=VAD_MAX_SEGMENT_MS
+        )
+        self.transcript = StreamingTranscript(step_ms=ASR_STREAM_STEP_MS, sample_rate=RTP_SAMPLE_RATE)
+        self.jitter_buffer = None
+        self.tts_resampler = None
         self.asterisk_addr = None
+        self.rtp_port = None
+        self.remote_ssrc = None
         self.sequence = 0
         self.timestamp = 0
         self.ssrc = hash(session_id) % (2**32)
+        self.payload_type = g711.PAYLOAD_TYPE_PCMU
         self.packets_received = 0
         self.packets_sent = 0
-        self.translations = []
+        
+        # Recent translations only; full history goes to the on-disk log
+        self.translations = deque(maxlen=TRANSLATION_HISTORY_SIZE)
+        self.translations_count = 0
+        self.history_log = history_log
+        # Inference workers log translations while the RTP loop or the sweeper flushes
+        self.history_lock = threading.RLock()
+        self.ended = False  # Call is over; its last utterances are still processed
         
     def log_translation(self, original, translated):
         """Log translation for this call"""
-        self.translations.append({
-            'timestamp': datetime.now().isoformat(),
-            'original': original,
-            'translated': translated
-        })
+        with self.history_lock:
+            self.translations.append({
+                'timestamp': datetime.now().isoformat(),
+                'original': original,
+                'translated': translated
+            })
+            self.translations_count += 1
+            
+            if len(self.translations) >= TRANSLATION_HISTORY_SIZE:
+                self.flush_history()
+    
+    def flush_history(self):
+        """Append buffered translations to the on-disk history log"""
+        with self.history_lock:
+            entries = self.translations
+            self.translations = deque(maxlen=TRANSLATION_HISTORY_SIZE)
+            if self.history_log:
+                self.history_log.append(self.session_id, list(entries))
     
     def get_stats(self):
         """Get call statistics"""
@@ -78,43 +224,16 @@ class CallSession:
             'duration': duration,
             'packets_received': self.packets_received,
             'packets_sent': self.packets_sent,
-            'translations_count': len(self.translations),
+            'translations_count': self.translations_count,
+            'utterances': self.vad.segments,
+            'vad_skipped_pct': round(self.vad.skipped_percent, 1),
+            'asr_partials': self.transcript.partials,
+            'early_releases': self.transcript.early_releases,
+            'jitter_buffer': self.jitter_buffer.get_stats() if self.jitter_buffer else None,
             'source_lang': self.source_lang,
-            'target_lang': self.target_lang
-        }
-
-
-class RTPPacket:
-    """Parse and create RTP packets"""
-    
-    @staticmethod
-    def parse(data):
-        """Parse RTP packet"""
-        if len(data) < 12:
-            return None
-        
-        header = struct.unpack('!BBHII', data[:12])
-        return {
-            'version': (header[0] >> 6) & 0x03,
-            'payload_type': header[1] & 0x7F,
-            'sequence': header[2],
-            'timestamp': header[3],
-            'ssrc': header[4],
-            'payload': data[12:]
+            'target_lang': self.target_lang,
+            'language_origin': self.language_origin
         }
-    
-    @staticmethod
-    def create(payload, sequence, timestamp, ssrc, payload_type=0):
-        """Create RTP packet"""
-        header = struct.pack(
-            '!BBHII',
-            0x80,  # V=2, P=0, X=0, CC=0
-            payload_type,
-            sequence,
-            timestamp,
-            ssrc
-        )
-        return header + payload
 
 
 class ProductionTranslationService:
@@ -122,64 +241,234 @@ class ProductionTranslationService:
     
     def __init__(self):
         self.running = False
-        self.sessions = {}
-        self.session_lock = threading.Lock()
-        
-        # GPU device
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        if self.device == "cpu":
-            logger.warning("GPU not available! Running on CPU (slow)")
-        else:
-            logger.info(f"Using GPU: {torch.cuda.get_device_name(0)}")
-            logger.info(f"GPU Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB")
-        
-        # Load models
-        logger.info("Loading production models...")
-        self.load_models()
-        logger.info("Models loaded successfully")
         
-        # Statistics
+        # Metrics: sharded counters / per-stage histograms, scraped at /metrics
+        self.metrics = MetricsRegistry()
+        self.metrics_server = None
+        self.stage_latency = {
+            stage: self.metrics.histogram(
+                'translation_stage_seconds', 'Time spent in each pipeline stage', {'stage': stage}
+            )
+            for stage in PIPELINE_STAGES
+        }
+        
+        self.sessions = SessionManager(
+            idle_timeout=SESSION_IDLE_TIMEOUT,
+            on_evict=self.release_session
+        )
+        self.history_log = TranslationHistoryLog(f'{LOG_DIR}/translation-history.jsonl')
+        
+        # Per-call languages: registered over the control socket, read from the
+        # ExternalMedia channel over ARI, or identified from the caller's audio
+        self.default_languages = (normalize_language(DEFAULT_SOURCE_LANGUAGE, allow_auto=True),
+                                  normalize_language(DEFAULT_TARGET_LANGUAGE))
+        self.languages = LanguageDirectory(on_update=self.languages_registered)
+        self.language_control = None
+        self.ari = ARIChannelLanguages(ARI_URL, ARI_USER, ARI_PASSWORD) if ARI_URL else None
+        self.ari_lookups = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ari-lookup") if ARI_URL else None
+        
+        # Completed audio chunks waiting for inference (bounded)
+        self.scheduler = InferenceScheduler(
+            self.process_session_audio,
+            workers=INFERENCE_THREADS,
+            max_backlog=AUDIO_QUEUE_SIZE,
+            policy=OVERLOAD_POLICY
+        )
+        self.rtp_engine = None
+        self.rtp_sender = RTPSender(fill=RTP_FILL_MODE, send_histogram=self.stage_latency['send'])
+        
+        # Translated text + encoded audio for short, frequently repeated phrases
+        self.phrase_cache = PhraseCache(
+            max_entries=PHRASE_CACHE_SIZE,
+            max_words=PHRASE_CACHE_MAX_WORDS,
+            store=PhraseStore(PHRASE_CACHE_PATH, max_bytes=PHRASE_CACHE_MAX_MB * 1024 * 1024) if PHRASE_CACHE_PATH else None
+        )
+        
+        # Backends are started by load_all_models(), before or after the RTP ports are bound
+        self.device = None
+        self.backend = None
+        self.tts_sample_rate = None
+        self.models_ready = threading.Event()
+        self.started_at = time.monotonic()
+        self.startup = {'rtp_listening_s': None, 'ready_s': None, 'models': {}}
+        
+        # Statistics (updated from many threads, hence sharded counters)
         self.stats = {
-            'total_calls': 0,
-            'active_calls': 0,
-            'total_translations': 0,
-            'errors': 0,
-            'start_time': datetime.now()
+            'total_translations': self.metrics.counter(
+                'translation_utterances_translated', 'Utterances translated, including phrase cache hits'),
+            'skipped_translations': self.metrics.counter(
+                'translation_skipped_utterances', 'Utterances skipped because their translation model was loading'),
+            'not_ready_utterances': self.metrics.counter(
+                'translation_not_ready_utterances', 'Utterances received before the models were ready'),
+            'errors': self.metrics.counter(
+                'translation_errors', 'Utterance processing errors'),
+            'languages_identified': self.metrics.counter(
+                'translation_languages_identified', 'Calls whose source language was identified from audio'),
         }
+        self.start_time = datetime.now()
+        
+        # Utterance start -> first translated audio queued, per utterance
+        self.first_audio_latencies = deque(maxlen=10000)
+        self.first_audio_histogram = self.metrics.histogram(
+            'translation_first_audio_seconds', 'Utterance start to first translated audio queued'
+        )
+        self.register_metrics()
+    
+    def register_metrics(self):
+        """Gauges and totals read from the components at scrape time"""
+        m = self.metrics
+        
+        m.gauge_callback('translation_active_sessions', 'Active call sessions',
+                         lambda: len(self.sessions))
+        m.gauge_callback('translation_models_ready', '1 once all models are loaded',
+                         lambda: int(self.models_ready.is_set()))
+        m.gauge_callback('translation_queue_depth', 'Items waiting in each queue', self.queue_depths)
+        m.gauge_callback('translation_gpu_memory_bytes', 'CUDA memory of this process', self.gpu_memory)
+        m.counter_callback('translation_pivot_translations', 'Translations pivoted through English while a model loads',
+                           self.pivot_translations)
+        m.counter_callback('translation_backend_requests', 'Inference requests per backend and stage',
+                           lambda: self.route_stats('requests'))
+        m.counter_callback('translation_backend_failures', 'Failed inference requests per backend and stage',
+                           lambda: self.route_stats('failures'))
+        
+        # Per-session packet counters (labelled by session id)
+        m.counter_callback('translation_session_packets_received', 'RTP packets received per call',
+                           lambda: [({'session': s.session_id}, s.packets_received) for s in self.sessions.snapshot()])
+        m.counter_callback('translation_session_packets_sent', 'RTP packets sent per call',
+                           lambda: [({'session': s.session_id}, s.packets_sent) for s in self.sessions.snapshot()])
+        
+        # Totals the components already keep
+        m.counter_callback('translation_rtp_packets_received', 'RTP packets received by the engine',
+                           lambda: self.rtp_engine.packets if self.rtp_engine else None)
+        m.counter_callback('translation_rtp_frames_sent', 'RTP frames sent, by kind',
+                           lambda: [({'kind': 'audio'}, self.rtp_sender.frames_sent - self.rtp_sender.fill_frames_sent),
+                                    ({'kind': 'fill'}, self.rtp_sender.fill_frames_sent)])
+        m.counter_callback('translation_rtp_frames_dropped', 'Outbound frames dropped on full playout queues',
+                           lambda: self.rtp_sender.frames_dropped)
+        m.counter_callback('translation_rtp_gap_frames', 'Fill frames sent inside an utterance',
+                           lambda: self.rtp_sender.gap_frames)
+        m.counter_callback('translation_inference_dropped', 'Audio chunks dropped by the overload policy',
+                           lambda: self.scheduler.dropped)
+        m.counter_callback('translation_inference_degraded', 'Audio chunks run on the fallback model',
+                           lambda: self.scheduler.degraded)
+        m.counter_callback('translation_language_registrations', 'Per-call language registrations received',
+                           lambda: self.languages.registrations)
+        m.gauge_callback('translation_active_language_pairs', 'Active calls per language pair',
+                         lambda: [({'pair': pair}, count) for pair, count in self.language_pairs().items()])
+    
+    def queue_depths(self):
+        """(labels, depth) for every queue on the call path"""
+        sched = self.scheduler.get_stats()
+        depths = [
+            ({'queue': 'inference'}, sched['queue_depth']),
+            ({'queue': 'inference_in_flight'}, sched['in_flight']),
+            ({'queue': 'rtp_out_frames'}, self.rtp_sender.get_stats()['queued_frames']),
+        ]
+        if self.models_ready.is_set():
+            backend = self.backend.get_stats()
+            depths.append(({'queue': 'worker_in_flight'}, backend['in_flight']))
+            for stats in backend['backends'].values():
+                if 'asr' in stats:
+                    depths.append(({'queue': 'asr_batch'}, stats['asr']['queued']))
+                    depths.append(({'queue': 'mt_batch'}, stats['mt']['queued']))
+        return depths
+    
+    def pivot_translations(self):
+        """Translations pivoted through English by in-process models"""
+        if not self.models_ready.is_set():
+            return 0
+        return sum(stats.get('pivots', 0) for stats in self.backend.get_stats()['backends'].values())
+    
+    def route_stats(self, key):
+        """(labels, value) per backend and stage that has served requests"""
+        if not self.models_ready.is_set():
+            return None
+        result = []
+        for route, stats in self.backend.get_stats()['routes'].items():
+            backend, stage = route.split('/')
+            result.append(({'backend': backend, 'stage': stage}, stats[key]))
+        return result
     
-    def load_models(self):
-        """Load all AI models"""
-        # Whisper for speech-to-text (large model for production)
-        logger.info(f"Loading Whisper {WHISPER_MODEL}...")
-        self.whisper_model = whisper.load_model(WHISPER_MODEL, device=self.device)
-        
-        # Translation models (load on demand per language pair)
-        self.translation_models = {}
-        
-        # TTS model (Coqui TTS - multilingual)
-        logger.info("Loading TTS model...")
-        self.tts = TTS(model_name="tts_models/multilingual/multi-dataset/your_tts", 
-                       progress_bar=False, 
-                       gpu=True if self.device == "cuda" else False)
+    def gpu_memory(self):
+        """(labels, bytes) of CUDA memory allocated / reserved by this process"""
+        if self.device != "cuda":
+            return None
+        import torch
+        return [({'kind': 'allocated'}, torch.cuda.memory_allocated(0)),
+                ({'kind': 'reserved'}, torch.cuda.memory_reserved(0))]
+    
+    def load_all_models(self):
+        """Start the inference backends (models load in worker processes when INFERENCE_PROCESSES > 0) and mark the service ready"""
+        try:
+            self.start_backend()
+        except Exception as e:
+            logger.critical(f"Model loading failed, translation disabled: {e}")
+            self.stats['errors'].inc()
+            return
+        
+        self.startup['ready_s'] = round(time.monotonic() - self.started_at, 2)
+        self.models_ready.set()
+        logger.info(f"Models loaded successfully; time to ready: {self.startup['ready_s']:.1f}s "
+                    f"({', '.join(f'{k} {v:.1f}s' for k, v in self.startup['models'].items())})")
+        
+        if READY_FILE:
+            with open(READY_FILE, 'w') as f:
+                json.dump(self.startup, f)
     
-    def get_translation_model(self, source_lang, target_lang):
-        """Get or load translation model for language pair"""
-        key = f"{source_lang}-{target_lang}"
-        
-        if key not in self.translation_models:
-            logger.info(f"Loading translation model: {key}")
-            model_name = f"Helsinki-NLP/opus-mt-{source_lang}-{target_lang}"
-            try:
-                self.translation_models[key] = pipeline(
-                    "translation", 
-                    model=model_name, 
-                    device=0 if self.device == "cuda" else -1
-                )
-            except Exception as e:
-                logger.error(f"Failed to load translation model {key}: {e}")
-                return None
-        
-        return self.translation_models[key]
+    def start_backend(self):
+        """Build the backends named by INFERENCE_BACKEND and start them behind the router"""
+        backend = create_router(
+            INFERENCE_BACKEND,
+            {
+                'whisper_model': WHISPER_MODEL,
+                'fallback_whisper_model': FALLBACK_WHISPER_MODEL if OVERLOAD_POLICY == POLICY_DEGRADE else None,
+                'asr_batch_size': ASR_BATCH_SIZE,
+                'asr_batch_window_ms': ASR_BATCH_WINDOW_MS,
+                'mt_batch_size': MT_BATCH_SIZE,
+                'mt_batch_window_ms': MT_BATCH_WINDOW_MS,
+                'mt_num_beams': MT_NUM_BEAMS,
+                'translation_model_budget_mb': TRANSLATION_MODEL_BUDGET_MB,
+                'translation_model_wait': TRANSLATION_MODEL_WAIT,
+                'translation_prewarm_pairs': TRANSLATION_PREWARM_PAIRS,
+                'tts_model': TTS_MODEL,
+                'inference_processes': INFERENCE_PROCESSES,
+                'worker_threads': INFERENCE_PROCESS_THREADS,
+                'model_cache_dir': MODEL_CACHE_DIR,
+                'whisper_profile': WHISPER_PROFILE,
+                'fallback_whisper_profile': FALLBACK_WHISPER_PROFILE,
+                'mt_profile': MT_PROFILE,
+                'stub_asr_ms': STUB_ASR_MS,
+                'stub_mt_ms': STUB_MT_MS,
+                'stub_tts_ms': STUB_TTS_MS,
+                'stub_lid_ms': STUB_LID_MS,
+                'azure_speech_key': AZURE_SPEECH_KEY,
+                'azure_speech_region': AZURE_SPEECH_REGION,
+                'azure_translator_key': AZURE_TRANSLATOR_KEY,
+                'azure_translator_region': AZURE_TRANSLATOR_REGION,
+            },
+            costs=parse_costs(BACKEND_COSTS),
+            budgets_ms={'asr': ASR_BUDGET_MS, 'mt': MT_BUDGET_MS, 'tts': TTS_BUDGET_MS}
+        )
+        for candidate in backend.backends:
+            if candidate.name == 'stub':
+                logger.warning(f"STUB inference backend: ASR {STUB_ASR_MS}ms, MT {STUB_MT_MS}ms, TTS {STUB_TTS_MS}ms")
+            logger.info(f"Inference backend {candidate.name}: "
+                        f"{', '.join(f'{stage} cost {cost:g}' for stage, cost in candidate.costs.items())}")
+        
+        logger.info("Loading production models...")
+        backend.start()
+        self.startup['models'].update(backend.load_times)
+        self.device = backend.device
+        self.tts_sample_rate = backend.tts_sample_rate
+        logger.info(f"TTS output sample rate: {self.tts_sample_rate} Hz")
+        self.phrase_cache.set_voice(backend.tts_voice, self.tts_sample_rate)
+        if not backend.supports(STAGE_LID):
+            logger.warning(f"No backend identifies languages; calls with source 'auto' use {LANGUAGE_ID_FALLBACK}")
+        self.backend = backend
+        
+        # Calls that connected while loading: start loading their translation models
+        for session in self.sessions.snapshot():
+            self.prepare_languages(session)
     
     def start(self):
         """Start the translation service"""
@@ -189,21 +478,52 @@ class ProductionTranslationService:
         logger.info(f"Max concurrent calls: {MAX_CONCURRENT_CALLS}")
         logger.info(f"RTP base port: {RTP_BASE_PORT}")
         logger.info(f"Whisper model: {WHISPER_MODEL}")
-        logger.info(f"Device: {self.device}")
+        logger.info(f"Inference workers: {INFERENCE_THREADS}, backlog: {AUDIO_QUEUE_SIZE}, "
+                    f"overload policy: {OVERLOAD_POLICY}")
+        if INFERENCE_PROCESSES > 0:
+            logger.info(f"Inference processes: {INFERENCE_PROCESSES}")
+        logger.info(f"Model loading: {'background' if LAZY_MODEL_LOADING else 'before binding RTP'}")
+        logger.info(f"Default languages: {self.default_languages[0] or 'auto'} -> {self.default_languages[1]}"
+                    f"{f' (ARI lookups at {ARI_URL})' if self.ari else ''}")
         
         self.running = True
         
+        if METRICS_PORT:
+            self.metrics_server = MetricsServer(self.metrics, METRICS_LISTEN_IP, METRICS_PORT)
+            self.metrics_server.start()
+        
+        if LANGUAGE_CONTROL_PORT:
+            self.language_control = LanguageControlServer(self.languages, LANGUAGE_CONTROL_IP, LANGUAGE_CONTROL_PORT)
+            self.language_control.start()
+        
+        if not LAZY_MODEL_LOADING:
+            self.load_all_models()
+        
         # Start monitoring thread
         threading.Thread(target=self.monitor_stats, daemon=True).start()
         
-        # Start RTP listener for each port
-        for i in range(MAX_CONCURRENT_CALLS):
-            port = RTP_BASE_PORT + (i * 2)
-            threading.Thread(
-                target=self.rtp_listener, 
-                args=(port,), 
-                daemon=True
-            ).start()
+        # Fixed worker pool consumes completed chunks
+        self.scheduler.start()
+        self.rtp_sender.start()
+        self.sessions.start()
+        
+        # One event loop receives RTP for the whole port range
+        ports = [RTP_BASE_PORT + (i * 2) for i in range(MAX_CONCURRENT_CALLS)]
+        self.rtp_engine = RTPEngine(
+            RTP_LISTEN_IP,
+            ports,
+            session_factory=self.create_session,
+            packet_handler=self.handle_packet,
+            bye_handler=self.handle_bye,
+            rtcp_offset=RTCP_PORT_OFFSET or None
+        )
+        self.rtp_engine.start()
+        self.startup['rtp_listening_s'] = round(time.monotonic() - self.started_at, 2)
+        logger.info(f"RTP listening after {self.startup['rtp_listening_s']:.2f}s")
+        
+        # Calls get paced silence until the models are ready
+        if LAZY_MODEL_LOADING:
+            threading.Thread(target=self.load_all_models, name="model-loader", daemon=True).start()
         
         logger.info("Translation service running")
         logger.info("=" * 60)
@@ -215,201 +535,420 @@ class ProductionTranslationService:
             logger.info("Shutting down...")
             self.shutdown()
     
-    def rtp_listener(self, port):
-        """Listen for RTP on specific port"""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.bind((RTP_LISTEN_IP, port))
-        sock.settimeout(1.0)
+    def create_session(self, port, ssrc, addr, packet):
+        """Create a session for a new RTP stream (runs on the RTP engine loop)"""
+        if packet.payload_type not in g711.PAYLOAD_TYPES:
+            return None
         
-        logger.info(f"RTP listener started on port {port}")
+        session_id = f"{addr[0]}:{addr[1]}/{ssrc:08x}"
         
-        while self.running:
-            try:
-                data, addr = sock.recvfrom(2048)
-                
-                # Parse RTP packet
-                packet = RTPPacket.parse(data)
-                if not packet:
-                    continue
-                
-                # Get or create session
-                session_id = f"{addr[0]}:{addr[1]}"
-                
-                with self.session_lock:
-                    if session_id not in self.sessions:
-                        # New call - auto-detect languages or use defaults
-                        self.sessions[session_id] = CallSession(
-                            session_id, 
-                            source_lang='en',  # TODO: Auto-detect
-                            target_lang='es'   # TODO: From dialplan
-                        )
-                        self.sessions[session_id].asterisk_addr = addr
-                        self.stats['total_calls'] += 1
-                        self.stats['active_calls'] += 1
-                        logger.info(f"New call session: {session_id}")
-                    
-                    session = self.sessions[session_id]
-                
-                # Update session
-                session.packets_received += 1
-                session.audio_buffer.extend(packet['payload'])
-                
-                # Process when we have enough audio (2 seconds)
-                if len(session.audio_buffer) >= 16000:
-                    threading.Thread(
-                        target=self.process_session_audio,
-                        args=(session_id, port + 1),
-                        daemon=True
-                    ).start()
-                
-            except socket.timeout:
-                continue
-            except Exception as e:
-                logger.error(f"RTP listener error on port {port}: {e}")
-                self.stats['errors'] += 1
+        # Languages registered for this stream, else the defaults until an ARI
+        # lookup answers (source None: identified from the first utterance)
+        registered = self.languages.lookup(port, addr)
+        source, target = registered or self.default_languages
+        session = CallSession(
+            session_id,
+            source_lang=source,
+            target_lang=target,
+            history_log=self.history_log,
+            language_origin=ORIGIN_CONTROL if registered else ORIGIN_DEFAULT
+        )
+        session.asterisk_addr = addr
+        session.rtp_port = port
+        session.remote_ssrc = ssrc
+        session.payload_type = packet.payload_type
+        session.jitter_buffer = JitterBuffer(
+            silence_byte=g711.SILENCE_BYTE[session.payload_type],
+            min_depth=JITTER_MIN_DEPTH,
+            max_depth=JITTER_MAX_DEPTH
+        )
+        self.rtp_sender.add_session(session, (addr[0], port + 1))
+        
+        self.sessions.add(session)
+        
+        if registered is None and self.ari is not None:
+            self.ari_lookups.submit(self.lookup_channel_languages, session)
+        self.prepare_languages(session)
+        
+        logger.info(f"New call session: {session_id} on port {port} "
+                    f"({source or 'auto'} -> {target}, {session.language_origin})")
+        return session
     
-    def process_session_audio(self, session_id, send_port):
-        """Process audio for a session"""
+    def set_languages(self, session, source, target, origin):
+        """Switch a call's languages (source None: identify it from the next utterance)"""
+        session.source_lang = source
+        session.target_lang = target
+        session.language_origin = origin
+        if source is None:
+            session.language_attempts = 0
+        logger.info(f"[{session.session_id}] Languages: {source or 'auto'} -> {target} ({origin})")
+        self.prepare_languages(session)
+    
+    def prepare_languages(self, session):
+        """Start loading the call's translation model before its first utterance needs it"""
+        if self.models_ready.is_set() and session.source_lang and session.source_lang != session.target_lang:
+            self.backend.prepare(session.source_lang, session.target_lang)
+    
+    def languages_registered(self, port, remote, source, target):
+        """Control socket registration: switches a call already streaming only if it names its remote address (control thread)
+
+        A port alone does not identify a call (every stream to the port
+        shares it), so such a registration only waits for the next new stream.
+        """
+        if remote is None:
+            return
+        for session in self.sessions.snapshot():
+            if tuple(session.asterisk_addr) == remote and (port is None or session.rtp_port == port):
+                self.set_languages(session, source, target, ORIGIN_CONTROL)
+    
+    def lookup_channel_languages(self, session):
+        """Apply TRANSLATION_SOURCE_LANG / TRANSLATION_TARGET_LANG of the call's ExternalMedia channel (ARI thread)"""
+        found = self.ari.lookup(session.rtp_port, session.asterisk_addr)
+        if found is None or session.language_origin == ORIGIN_CONTROL:
+            return
         try:
-            with self.session_lock:
-                if session_id not in self.sessions:
-                    return
-                session = self.sessions[session_id]
-                audio_data = bytes(session.audio_buffer)
-                session.audio_buffer.clear()
-            
-            # Convert PCMU to linear PCM
-            linear_audio = self.pcmu_to_linear(audio_data)
-            
-            # Resample to 16kHz for Whisper
-            audio_16k = np.repeat(linear_audio, 2)
+            source = normalize_language(found[0], allow_auto=True) if found[0] else session.source_lang
+            target = normalize_language(found[1]) if found[1] else session.target_lang
+        except ValueError as e:
+            logger.warning(f"[{session.session_id}] Ignoring ARI channel languages: {e}")
+            return
+        self.set_languages(session, source, target, ORIGIN_ARI)
+    
+    def language_pairs(self):
+        """Active calls per "source-target" pair ("auto-es" while unidentified)"""
+        pairs = {}
+        for session in self.sessions.snapshot():
+            pair = f"{session.source_lang or 'auto'}-{session.target_lang}"
+            pairs[pair] = pairs.get(pair, 0) + 1
+        return pairs
+    
+    def handle_bye(self, session):
+        """RTCP BYE received for a call (runs on the RTP engine loop)"""
+        logger.info(f"[{session.session_id}] RTCP BYE received")
+        self.sessions.evict(session.session_id, EVICT_BYE)
+    
+    def release_session(self, session, reason):
+        """Free everything held for an evicted session"""
+        self.rtp_engine.remove_stream(session.rtp_port, session.remote_ssrc)
+        self.rtp_sender.remove_session(session)
+        self.languages.release(session.asterisk_addr)
+        
+        # The utterance still inside the hangover window is transcribed too;
+        # translations logged by the call's remaining work are flushed after it
+        session.ended = True
+        if self.models_ready.is_set():
+            for segment in session.vad.flush():
+                self.scheduler.submit(session, session.transcript.final_job(segment))
+        self.scheduler.close(session, self.finish_session)
+        logger.info(f"Call ended ({reason}) {session.session_id}: {json.dumps(session.get_stats())}")
+    
+    def finish_session(self, session):
+        """All work of an ended call is done: write its last translations (scheduler thread)"""
+        session.flush_history()
+    
+    def handle_packet(self, session, packet):
+        """Buffer one RTP packet (runs on the RTP engine loop, must not block)"""
+        if packet.payload_type != session.payload_type:
+            return
+        
+        session.packets_received += 1
+        session.last_activity = started = time.monotonic()
+        latency = self.stage_latency
+        
+        # Restore sequence order (with loss concealment) before decoding; the
+        # payload is a view of the engine's receive buffer, the buffer keeps a copy
+        payloads = session.jitter_buffer.push(packet.sequence, bytes(packet.payload))
+        jittered = time.monotonic()
+        latency['jitter'].observe(jittered - started)
+        if not payloads:
+            return
+        
+        # Decode to linear PCM and hand off complete utterances only;
+        # silence never reaches the inference workers
+        linear_audio = g711.to_linear(b''.join(payloads), session.payload_type)
+        decoded = time.monotonic()
+        latency['decode'].observe(decoded - jittered)
+        segments = session.vad.feed(linear_audio)
+        latency['vad'].observe(time.monotonic() - decoded)
+        if not self.models_ready.is_set():
+            # Still starting up: the call is connected but nothing can be translated yet
+            self.stats['not_ready_utterances'].inc(len(segments))
+            return
+        for segment in segments:
+            self.scheduler.submit(session, session.transcript.final_job(segment))
+        
+        # Streaming mode: also decode the utterance in progress as it grows
+        if STREAMING_ASR and session.transcript.wants_partial(session.vad.partial_samples):
+            self.scheduler.submit(session, session.transcript.partial_job(session.vad.partial()))
+    
+    def process_session_audio(self, session, job, degraded=False):
+        """Decode one utterance (or the utterance so far) and translate committed text"""
+        session_id = session.session_id
+        transcript = session.transcript
+        try:
+            if not job.final:
+                transcript.partial_done()
+                if degraded or session.ended:
+                    return  # Partial decodes are optional work; skip them while overloaded or after hangup
             
-            # Speech-to-text
-            result = self.whisper_model.transcribe(
-                audio_16k, 
-                language=session.source_lang
-            )
-            text = result["text"].strip()
+            # Source language unknown (or uncertain): identify it from the speech
+            if session.source_lang is None or session.language_origin == ORIGIN_GUESSED:
+                if not self.identify_language(session, job):
+                    return
             
-            if not text:
-                return
+            # Resample to 16kHz for Whisper (each decode is a separate stream)
+            audio_16k = resample(job.audio, RTP_SAMPLE_RATE, ASR_SAMPLE_RATE)
             
-            logger.info(f"[{session_id}] Recognized: {text}")
+            # Speech-to-text (smaller model while overloaded)
+            started = time.monotonic()
+            text = self.backend.transcribe(audio_16k, session.source_lang, degraded)
+            self.stage_latency['asr'].observe(time.monotonic() - started)
             
-            # Translate
-            translator = self.get_translation_model(
-                session.source_lang, 
-                session.target_lang
-            )
+            # Commit stable words; translation starts at clause boundaries
+            ready = transcript.update(job, text)
+            if job.final:
+                if text:
+                    logger.info(f"[{session_id}] Recognized: {text}")
+            else:
+                logger.debug(f"[{session_id}] Partial: {text} (committed: {transcript.committed_text})")
             
-            if translator:
-                translated = translator(text)[0]['translation_text']
-                logger.info(f"[{session_id}] Translated: {translated}")
-                
-                session.log_translation(text, translated)
-                self.stats['total_translations'] += 1
-                
-                # Text-to-speech
-                tts_audio = self.tts.tts(
-                    text=translated,
-                    language=session.target_lang
-                )
-                
-                # Convert TTS output to PCMU and send as RTP
-                self.send_audio_as_rtp(
-                    session, 
-                    tts_audio, 
-                    send_port
-                )
+            if ready and session.source_lang == session.target_lang:
+                logger.debug(f"[{session_id}] Caller speaks {session.target_lang}, nothing to translate")
+            elif ready:
+                self.translate_and_speak(session, job, ready)
             
         except Exception as e:
             logger.error(f"Audio processing error for {session_id}: {e}")
-            self.stats['errors'] += 1
+            self.stats['errors'].inc()
     
-    def pcmu_to_linear(self, pcmu_data):
-        """Convert PCMU to linear PCM"""
-        pcmu_array = np.frombuffer(pcmu_data, dtype=np.uint8)
-        linear = np.zeros(len(pcmu_array), dtype=np.int16)
-        
-        for i, val in enumerate(pcmu_array):
-            val = ~val
-            sign = (val & 0x80)
-            exponent = (val >> 4) & 0x07
-            mantissa = val & 0x0F
-            sample = ((mantissa << 3) + 0x84) << exponent
-            if sign:
-                sample = -sample
-            linear[i] = sample
-        
-        return linear.astype(np.float32) / 32768.0
-    
-    def linear_to_pcmu(self, linear_data):
-        """Convert linear PCM to PCMU"""
-        linear_data = np.clip(linear_data * 32768.0, -32768, 32767).astype(np.int16)
-        pcmu = np.zeros(len(linear_data), dtype=np.uint8)
-        
-        for i, sample in enumerate(linear_data):
-            sign = 0x80 if sample < 0 else 0x00
-            sample = abs(sample)
-            exponent = 7
-            for exp in range(8):
-                if sample <= (0x1F << (exp + 3)):
-                    exponent = exp
-                    break
-            mantissa = (sample >> (exponent + 3)) & 0x0F
-            pcmu[i] = ~(sign | (exponent << 4) | mantissa) & 0xFF
-        
-        return pcmu.tobytes()
+    def identify_language(self, session, job):
+        """Identify the caller's language from the first seconds of an utterance
+
+        Returns False when a partial utterance is too short or too uncertain
+        to decide on (the final one decides). A low-confidence answer is used
+        but retried on the next utterances, up to LANGUAGE_ID_ATTEMPTS.
+        """
+        if not self.backend.supports(STAGE_LID):
+            self.set_languages(session, LANGUAGE_ID_FALLBACK, session.target_lang, ORIGIN_FALLBACK)
+            return True
+        if not job.final and len(job.audio) < LANGUAGE_ID_MIN_SECONDS * RTP_SAMPLE_RATE:
+            return False
+        
+        audio_16k = resample(job.audio[:int(LANGUAGE_ID_SECONDS * RTP_SAMPLE_RATE)], RTP_SAMPLE_RATE, ASR_SAMPLE_RATE)
+        started = time.monotonic()
+        try:
+            language, probability = self.backend.detect_language(audio_16k, LANGUAGE_ID_CANDIDATES or None)
+        except Exception as e:
+            logger.error(f"[{session.session_id}] Language identification failed: {e}")
+            language, probability = None, 0.0
+        self.stage_latency['lid'].observe(time.monotonic() - started)
+        session.language_attempts += 1
+        
+        confident = probability >= LANGUAGE_ID_THRESHOLD or session.language_attempts >= LANGUAGE_ID_ATTEMPTS
+        if not confident and not job.final and session.source_lang is None:
+            return False
+        if language is None:
+            language = session.source_lang or LANGUAGE_ID_FALLBACK
+        if session.source_lang is None:
+            self.stats['languages_identified'].inc()
+        logger.info(f"[{session.session_id}] Identified language {language} (p={probability:.2f}, "
+                    f"attempt {session.language_attempts})")
+        self.set_languages(session, language, session.target_lang, ORIGIN_DETECTED if confident else ORIGIN_GUESSED)
+        return True
     
-    def send_audio_as_rtp(self, session, audio_data, port):
-        """Send audio back to Asterisk as RTP"""
-        if not session.asterisk_addr:
+    def translate_and_speak(self, session, job, text):
+        """Translate recognized text and queue the synthesized speech"""
+        session_id = session.session_id
+        
+        # Common phrases: reuse the cached translation and encoded audio
+        cached = self.phrase_cache.get(text, session.source_lang, session.target_lang)
+        if cached is not None:
+            translated, pcmu = cached
+            logger.info(f"[{session_id}] Translated (cached): {translated}")
+            session.log_translation(text, translated)
+            self.stats['total_translations'].inc()
+            self.send_g711_as_rtp(session, pcmu, g711.PAYLOAD_TYPE_PCMU)
+            self.record_first_audio(session, job)
             return
         
-        # Convert audio to PCMU
-        pcmu_data = self.linear_to_pcmu(audio_data)
+        started = time.monotonic()
         
-        # Send as RTP packets
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        chunk_size = 160  # 20ms
+        # Translate (batched with other calls on the same language pair)
+        translated = self.backend.translate(text, session.source_lang, session.target_lang)
+        self.stage_latency['mt'].observe(time.monotonic() - started)
         
-        for i in range(0, len(pcmu_data), chunk_size):
-            chunk = pcmu_data[i:i+chunk_size]
-            
-            rtp_packet = RTPPacket.create(
-                chunk,
-                session.sequence,
-                session.timestamp,
-                session.ssrc
-            )
-            
-            sock.sendto(
-                rtp_packet,
-                (session.asterisk_addr[0], port)
-            )
-            
-            session.sequence = (session.sequence + 1) % 65536
-            session.timestamp += 160
-            session.packets_sent += 1
+        if translated is None:
+            self.stats['skipped_translations'].inc()
+            logger.warning(f"[{session_id}] Translation model "
+                           f"{session.source_lang}-{session.target_lang} not ready, skipping utterance")
+            return
+        
+        logger.info(f"[{session_id}] Translated: {translated}")
+        
+        session.log_translation(text, translated)
+        self.stats['total_translations'].inc()
+        if session.ended:
+            return  # Caller hung up: keep the translation, nobody is left to hear it
         
-        sock.close()
+        # Text-to-speech, one clause at a time: each clause is queued for
+        # playout as soon as it is synthesized, overlapping the next one
+        clauses = split_clauses(translated, TTS_CLAUSE_MIN_CHARS) if TTS_CLAUSE_MIN_CHARS else [translated]
+        encoded = []
+        sent = 0
+        try:
+            for i, clause in enumerate(clauses):
+                synthesis_started = time.monotonic()
+                tts_audio = self.backend.synthesize(clause, session.target_lang)
+                
+                # Resample TTS output to 8kHz; the outbound stream keeps filter
+                # state, so consecutive clauses join without clicks
+                if session.tts_resampler is None:
+                    session.tts_resampler = PolyphaseResampler(self.tts_sample_rate, RTP_SAMPLE_RATE)
+                audio_8k = session.tts_resampler.process(np.asarray(tts_audio, dtype=np.float32))
+                self.stage_latency['tts'].observe(time.monotonic() - synthesis_started)
+                encoded.append(g711.linear_to_pcmu(audio_8k))
+                
+                # Convert to the call's codec and send as RTP
+                self.send_audio_as_rtp(session, audio_8k, final=i == len(clauses) - 1)
+                sent += 1
+                if i == 0:
+                    self.record_first_audio(session, job)
+        finally:
+            if sent < len(clauses):
+                # A clause failed: close the utterance so the held-back tail
+                # plays and the open playout is not counted as gaps
+                self.rtp_sender.enqueue(session, b'', final=True)
+        
+        # Only complete utterances are cached (a failure above skips this)
+        self.phrase_cache.put(
+            text, session.source_lang, session.target_lang,
+            translated, b''.join(encoded), time.monotonic() - started
+        )
+    
+    def record_first_audio(self, session, job):
+        """Track time from utterance start to its first translated audio being queued"""
+        elapsed = session.transcript.first_audio(job)
+        if elapsed is not None:
+            self.first_audio_latencies.append(elapsed)
+            self.first_audio_histogram.observe(elapsed)
+    
+    def send_audio_as_rtp(self, session, audio_data, final=True):
+        """Queue audio for paced RTP playout back to Asterisk"""
+        if not session.asterisk_addr:
+            return
+        
+        # Convert audio to the call's G.711 codec; the sender paces it at 20 ms
+        started = time.monotonic()
+        payload = g711.from_linear(audio_data, session.payload_type)
+        self.stage_latency['encode'].observe(time.monotonic() - started)
+        self.rtp_sender.enqueue(session, payload, final=final)
+    
+    def send_g711_as_rtp(self, session, payload, payload_type):
+        """Queue already encoded G.711 audio, transcoding to the call's codec"""
+        if not session.asterisk_addr:
+            return
+        
+        self.rtp_sender.enqueue(session, g711.transcode(payload, payload_type, session.payload_type))
     
     def monitor_stats(self):
         """Monitor and log statistics"""
         while self.running:
             time.sleep(60)  # Every minute
             
-            uptime = (datetime.now() - self.stats['start_time']).total_seconds()
+            uptime = (datetime.now() - self.start_time).total_seconds()
             
             logger.info("=" * 60)
             logger.info("SERVICE STATISTICS")
             logger.info(f"Uptime: {uptime/3600:.2f} hours")
-            logger.info(f"Total calls: {self.stats['total_calls']}")
-            logger.info(f"Active calls: {self.stats['active_calls']}")
-            logger.info(f"Total translations: {self.stats['total_translations']}")
-            logger.info(f"Errors: {self.stats['errors']}")
+            if self.models_ready.is_set():
+                logger.info(f"Models ready (time to ready {self.startup['ready_s']:.1f}s, "
+                            f"RTP listening after {self.startup['rtp_listening_s']:.2f}s)")
+            else:
+                logger.info(f"Models loading, {self.stats['not_ready_utterances'].value} utterances not translated yet")
+            backends = self.backend.get_stats() if self.models_ready.is_set() else None
+            
+            sessions = self.sessions.get_stats()
+            logger.info(f"Total calls: {sessions['total']}")
+            logger.info(f"Active calls: {sessions['active']}")
+            logger.info(f"Evicted calls: {sessions['evicted_bye']} by BYE, {sessions['evicted_idle']} idle")
+            logger.info(f"Session memory: {sessions['memory_bytes'] / 1024:.1f} KB total, "
+                        f"{sessions['memory_per_session'] / 1024:.1f} KB per session")
+            logger.info(f"Total translations: {self.stats['total_translations'].value} "
+                        f"({self.pivot_translations()} via fallback, "
+                        f"{self.stats['skipped_translations'].value} skipped while loading)")
+            
+            first_audio = summarize_latencies(self.first_audio_latencies.copy())
+            logger.info(f"Time to first translated audio: p50={first_audio['p50']:.0f}ms "
+                        f"p99={first_audio['p99']:.0f}ms max={first_audio['max']:.0f}ms "
+                        f"(streaming ASR {'on' if STREAMING_ASR else 'off'})")
+            
+            if backends is not None:
+                for name, stats in backends['backends'].items():
+                    if 'translation_models' in stats:
+                        # In-process models
+                        pool = stats['translation_models']
+                        logger.info(f"Translation models: {', '.join(pool['loaded']) or 'none'} "
+                                    f"({pool['used_bytes'] / 1e6:.0f}/{pool['budget_bytes'] / 1e6:.0f} MB), "
+                                    f"loading: {', '.join(pool['loading']) or 'none'}")
+                        logger.info(f"Translation model pool: {pool['hits']} hits, {pool['misses']} misses, "
+                                    f"{pool['evictions']} evictions, avg load {pool['avg_load_seconds']:.1f}s")
+                        asr = stats['asr']
+                        logger.info(f"ASR batches: {asr['batches']} (avg size {asr['avg_batch_size']:.2f}), "
+                                    f"latency p50={asr['latency_p50_ms']:.1f}ms p99={asr['latency_p99_ms']:.1f}ms")
+                        mt = stats['mt']
+                        logger.info(f"MT batches: {mt['batches']} (avg size {mt['avg_batch_size']:.2f}), "
+                                    f"latency p50={mt['latency_p50_ms']:.1f}ms p99={mt['latency_p99_ms']:.1f}ms")
+                    elif stats.get('workers'):
+                        logger.info(f"Inference processes: {stats['ready']}/{stats['workers']} ready, "
+                                    f"{stats['in_flight']} in flight, {stats['requests']} requests, "
+                                    f"{stats['failures']} failed, {stats['restarts']} restarts")
+                    else:
+                        logger.info(f"{name.capitalize()} inference: {stats.get('requests', 0)} requests, "
+                                    f"{stats.get('failures', 0)} failed")
+                for route, stats in backends['routes'].items():
+                    logger.info(f"Route {route}: {stats['requests']} requests, p95={stats['p95_ms']:.0f}ms, "
+                                f"{stats['failures']} failed")
+            logger.info(f"Errors: {self.stats['errors'].value}")
+            
+            languages = self.languages.get_stats()
+            pairs = self.language_pairs()
+            logger.info(f"Language pairs: {', '.join(f'{pair} {count}' for pair, count in sorted(pairs.items())) or 'none'}")
+            logger.info(f"Languages: {languages['registrations']} registrations ({languages['pending']} pending), "
+                        f"{self.stats['languages_identified'].value} identified from audio")
+            if self.ari:
+                ari = self.ari.get_stats()
+                logger.info(f"ARI channel lookups: {ari['lookups']} ({ari['found']} found, {ari['failures']} failed)")
+            
+            sched = self.scheduler.get_stats()
+            logger.info(f"Inference queue: {sched['queue_depth']}/{sched['max_backlog']} "
+                        f"(in flight: {sched['in_flight']})")
+            logger.info(f"Inference chunks: {sched['processed']} processed, "
+                        f"{sched['dropped']} dropped, {sched['degraded']} degraded")
+            logger.info(f"Inference wait: p50={sched['wait_p50_ms']:.1f}ms "
+                        f"p99={sched['wait_p99_ms']:.1f}ms max={sched['wait_max_ms']:.1f}ms")
+            
+            sender = self.rtp_sender.get_stats()
+            logger.info(f"RTP out: {sender['streams']} streams, {sender['frames_sent']} frames "
+                        f"({sender['fill_frames_sent']} fill), {sender['frames_dropped']} dropped, "
+                        f"{sender['late_ticks']} late ticks, {sender['gap_frames']} gap frames")
+            logger.info(f"RTP send jitter: p50={sender['jitter_p50_ms']:.3f}ms "
+                        f"p99={sender['jitter_p99_ms']:.3f}ms max={sender['jitter_max_ms']:.3f}ms")
+            
+            phrases = self.phrase_cache.get_stats()
+            logger.info(f"Phrase cache: {phrases['hit_ratio'] * 100:.1f}% hits "
+                        f"({phrases['memory_hits']} memory, {phrases['disk_hits']} disk, {phrases['misses']} misses), "
+                        f"{phrases['entries']} entries, saved {phrases['saved_seconds']:.1f}s "
+                        f"({phrases['saved_ms_per_hit']:.0f}ms/hit)")
+            
+            if self.rtp_engine:
+                engine = self.rtp_engine.get_stats()
+                logger.info(f"RTP: {engine['streams']} streams on {engine['ports']} ports, "
+                            f"{engine['packets']} packets, {engine['errors']} errors")
+                logger.info(f"RTP packet latency: p50={engine['latency_p50_ms']:.3f}ms "
+                            f"p99={engine['latency_p99_ms']:.3f}ms max={engine['latency_max_ms']:.3f}ms")
             
             if self.device == "cuda":
+                import torch
                 logger.info(f"GPU Memory Used: {torch.cuda.memory_allocated(0) / 1e9:.2f} GB")
             
             logger.info("=" * 60)
@@ -419,11 +958,22 @@ class ProductionTranslationService:
         logger.info("Shutting down translation service...")
         self.running = False
         
-        # Save call logs
-        with self.session_lock:
-            for session_id, session in self.sessions.items():
-                stats = session.get_stats()
-                logger.info(f"Call {session_id}: {json.dumps(stats)}")
+        if self.rtp_engine:
+            self.rtp_engine.stop()
+        self.scheduler.stop()
+        if self.backend is not None:
+            self.backend.stop()
+        self.rtp_sender.stop()
+        self.phrase_cache.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.language_control:
+            self.language_control.stop()
+        if self.ari_lookups:
+            self.ari_lookups.shutdown(wait=False)
+        
+        # End remaining calls: flushes translation history and logs call stats
+        self.sessions.stop()
         
         logger.info("Shutdown complete")
 
@@ -4,31 +4,68 @@ Real-Time Translation Service for Asterisk
 Receives RTP from Asterisk ExternalMedia(), translates via Azure, sends back RTP
 """
 
+import io
 import os
 import socket
-import struct
 import threading
 import queue
 import logging
+import wave
 from datetime import datetime
 
-# Azure Speech SDK
-try:
-    import azure.cognitiveservices.speech as speechsdk
-except ImportError:
-    print("ERROR: Azure Speech SDK not installed")
-    print("Install with: pip3 install azure-cognitiveservices-speech")
-    exit(1)
+import numpy as np
+
+import g711
+from resample import PolyphaseResampler
+from rtp import RTPReceiver
+from rtp_sender import OutboundStream, RTPSender
 
 # Configuration
 RTP_LISTEN_IP = os.getenv('RTP_LISTEN_IP', '127.0.0.1')
 RTP_LISTEN_PORT = int(os.getenv('RTP_LISTEN_PORT', '4000'))
 RTP_SEND_PORT = int(os.getenv('RTP_SEND_PORT', '4001'))
+RTP_FILL_MODE = os.getenv('RTP_FILL_MODE', 'silence')  # none | silence | noise between utterances
 
 AZURE_SPEECH_KEY = os.getenv('AZURE_SPEECH_KEY')
 AZURE_SPEECH_REGION = os.getenv('AZURE_SPEECH_REGION')
 SOURCE_LANGUAGE = os.getenv('SOURCE_LANGUAGE', 'en-US')
 TARGET_LANGUAGE = os.getenv('TARGET_LANGUAGE', 'es-ES')
+TARGET_VOICE = os.getenv('TARGET_VOICE', 'es-ES-ElviraNeural')  # Azure neural voice for the target language
+
+# 'azure' = Azure Speech SDK, 'fake' = local recognizer with the same callbacks (no account needed)
+SPEECH_BACKEND = os.getenv('SPEECH_BACKEND', 'azure')
+
+# Azure Speech SDK
+if SPEECH_BACKEND == 'fake':
+    import fake_speech as speechsdk
+else:
+    try:
+        import azure.cognitiveservices.speech as speechsdk
+    except ImportError:
+        print("ERROR: Azure Speech SDK not installed")
+        print("Install with: pip3 install azure-cognitiveservices-speech")
+        exit(1)
+
+# PCMU on the wire; the push stream carries it decoded to 16-bit PCM
+SAMPLE_RATE = 8000
+SYNTHESIS_SAMPLE_RATE = 16000  # Translation synthesis audio (when it has no WAV header)
+
+# Speech translation targets that are not the language part of the locale
+TRANSLATION_TARGETS = {'zh-CN': 'zh-Hans', 'zh-TW': 'zh-Hant'}
+
+
+def translation_target(locale):
+    """Azure translation target for a locale ('es-ES' -> 'es')"""
+    return TRANSLATION_TARGETS.get(locale, locale.split('-')[0])
+
+
+def synthesis_pcm(audio):
+    """(int16 samples, sample rate) of a synthesizing event's audio (WAV or raw PCM)"""
+    if audio[:4] == b'RIFF':
+        with wave.open(io.BytesIO(audio), 'rb') as wav:
+            return np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2'), wav.getframerate()
+    return np.frombuffer(audio[:len(audio) - len(audio) % 2], dtype='<i2'), SYNTHESIS_SAMPLE_RATE
+
 
 # Logging
 logging.basicConfig(
@@ -38,87 +75,47 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class RTPPacket:
-    """Parse and create RTP packets"""
-    
-    def __init__(self, data=None):
-        if data:
-            self.parse(data)
-    
-    def parse(self, data):
-        """Parse RTP packet"""
-        if len(data) < 12:
-            raise ValueError("RTP packet too short")
-        
-        # RTP header (12 bytes minimum)
-        header = struct.unpack('!BBHII', data[:12])
-        
-        self.version = (header[0] >> 6) & 0x03
-        self.padding = (header[0] >> 5) & 0x01
-        self.extension = (header[0] >> 4) & 0x01
-        self.csrc_count = header[0] & 0x0F
-        
-        self.marker = (header[1] >> 7) & 0x01
-        self.payload_type = header[1] & 0x7F
-        
-        self.sequence = header[2]
-        self.timestamp = header[3]
-        self.ssrc = header[4]
-        
-        # Payload starts after header
-        self.payload = data[12:]
-    
-    @staticmethod
-    def create(payload, sequence, timestamp, ssrc=12345, payload_type=0):
-        """Create RTP packet"""
-        # RTP header
-        header = struct.pack(
-            '!BBHII',
-            0x80,  # V=2, P=0, X=0, CC=0
-            payload_type,  # M=0, PT=0 (PCMU)
-            sequence,
-            timestamp,
-            ssrc
-        )
-        return header + payload
-
-
 class TranslationService:
     """Real-time translation service"""
     
     def __init__(self):
         self.running = False
-        self.audio_queue = queue.Queue()
-        self.translation_queue = queue.Queue()
+        self.audio_queue = queue.Queue()  # PCMU payloads, None = stop
+        self.stopped = threading.Event()
         
-        # RTP state
-        self.sequence = 0
-        self.timestamp = 0
-        self.ssrc = 12345
+        # Outbound RTP: paced 20ms frames on the shared sender
+        self.stream = OutboundStream(ssrc=12345)
+        self.rtp_sender = RTPSender(fill=RTP_FILL_MODE)
         
         # Sockets
         self.listen_socket = None
-        self.send_socket = None
         self.asterisk_addr = None
         
+        # Streaming recognition (created in start_recognition)
+        self.push_stream = None
+        self.recognizer = None
+        self.resampler = None
+        self.resampler_rate = None
+        
         # Azure Speech Config
-        if not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION:
+        if SPEECH_BACKEND != 'fake' and (not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION):
             logger.error("Azure credentials not set!")
             logger.error("Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION")
             exit(1)
         
-        self.speech_config = speechsdk.SpeechConfig(
+        self.translation_config = speechsdk.translation.SpeechTranslationConfig(
             subscription=AZURE_SPEECH_KEY,
             region=AZURE_SPEECH_REGION
         )
-        self.speech_config.speech_recognition_language = SOURCE_LANGUAGE
-        self.speech_config.speech_synthesis_language = TARGET_LANGUAGE
+        self.translation_config.speech_recognition_language = SOURCE_LANGUAGE
+        self.translation_config.add_target_language(translation_target(TARGET_LANGUAGE))
+        self.translation_config.voice_name = TARGET_VOICE
     
     def start(self):
         """Start the translation service"""
         logger.info("Starting Translation Service")
         logger.info(f"Listening on {RTP_LISTEN_IP}:{RTP_LISTEN_PORT}")
-        logger.info(f"Translation: {SOURCE_LANGUAGE} → {TARGET_LANGUAGE}")
+        logger.info(f"Translation: {SOURCE_LANGUAGE} → {TARGET_LANGUAGE} ({SPEECH_BACKEND})")
         
         self.running = True
         
@@ -126,119 +123,139 @@ class TranslationService:
         self.listen_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.listen_socket.bind((RTP_LISTEN_IP, RTP_LISTEN_PORT))
         
-        self.send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.start_recognition()
+        self.rtp_sender.start()
         
         # Start threads
         threading.Thread(target=self.receive_rtp, daemon=True).start()
         threading.Thread(target=self.process_audio, daemon=True).start()
-        threading.Thread(target=self.send_translated_rtp, daemon=True).start()
         
         logger.info("Translation Service running")
         
         # Keep running
         try:
-            while self.running:
-                threading.Event().wait(1)
+            self.stopped.wait()
         except KeyboardInterrupt:
             logger.info("Shutting down...")
-            self.running = False
+            self.stop()
+    
+    def stop(self):
+        """Stop recognition and wake the worker threads"""
+        self.running = False
+        self.audio_queue.put(None)
+        if self.recognizer:
+            self.recognizer.stop_continuous_recognition()
+        self.rtp_sender.stop()
+        self.stopped.set()
+    
+    def start_recognition(self):
+        """Open the push stream and start continuous translation on it"""
+        stream_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=SAMPLE_RATE,
+            bits_per_sample=16,
+            channels=1
+        )
+        self.push_stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=self.push_stream)
+        
+        self.recognizer = speechsdk.translation.TranslationRecognizer(
+            translation_config=self.translation_config,
+            audio_config=audio_config
+        )
+        
+        # SDK callbacks run on SDK threads: they only log or hand off to queues
+        self.recognizer.recognizing.connect(self.on_recognizing)
+        self.recognizer.recognized.connect(self.on_recognized)
+        self.recognizer.synthesizing.connect(self.on_synthesizing)
+        self.recognizer.canceled.connect(self.on_canceled)
+        self.recognizer.session_stopped.connect(self.on_session_stopped)
+        
+        self.recognizer.start_continuous_recognition()
+        logger.info("Continuous recognition started")
+    
+    def on_recognizing(self, evt):
+        """Partial hypothesis"""
+        logger.debug(f"Recognizing: {evt.result.text}")
+    
+    def on_recognized(self, evt):
+        """Final result for one utterance (its audio follows in synthesizing events)"""
+        if evt.result.reason == speechsdk.ResultReason.TranslatedSpeech:
+            translated = evt.result.translations.get(translation_target(TARGET_LANGUAGE), '')
+            logger.info(f"Translated: '{evt.result.text}' → '{translated}'")
+        elif evt.result.reason == speechsdk.ResultReason.NoMatch:
+            logger.debug("No speech recognized")
+    
+    def on_synthesizing(self, evt):
+        """Synthesized translation audio: convert to PCMU and queue it for paced playout"""
+        audio = evt.result.audio
+        if not audio:
+            # Utterance complete: flush the partial frame held back by the sender
+            self.rtp_sender.enqueue(self.stream, b'', final=True)
+            return
+        
+        samples, rate = synthesis_pcm(audio)
+        if rate != self.resampler_rate:
+            self.resampler = PolyphaseResampler(rate, SAMPLE_RATE)
+            self.resampler_rate = rate
+        pcm = self.resampler.process(samples.astype(np.float32) / 32768.0)
+        self.rtp_sender.enqueue(self.stream, g711.linear_to_pcmu(pcm), final=False)
+    
+    def on_canceled(self, evt):
+        """Recognition ended by an error or by the end of the stream"""
+        details = evt.cancellation_details
+        if details.reason == speechsdk.CancellationReason.Error:
+            logger.error(f"Recognition canceled: {details.error_details}")
+        else:
+            logger.info(f"Recognition canceled: {details.reason}")
+    
+    def on_session_stopped(self, evt):
+        """Recognition session finished"""
+        logger.info(f"Recognition session stopped: {evt.session_id}")
     
     def receive_rtp(self):
         """Receive RTP packets from Asterisk"""
         logger.info("RTP receiver started")
         
+        # One preallocated receive buffer, parsed in place
+        receiver = RTPReceiver(self.listen_socket)
+        
         while self.running:
             try:
-                data, addr = self.listen_socket.recvfrom(2048)
+                packet, addr = receiver.receive_rtp()
                 
                 # Store Asterisk address for sending back
                 if not self.asterisk_addr:
                     self.asterisk_addr = addr
+                    self.rtp_sender.add_session(self.stream, (addr[0], RTP_SEND_PORT))
                     logger.info(f"Asterisk connected from {addr}")
                 
-                # Parse RTP packet
-                try:
-                    packet = RTPPacket(data)
-                    
-                    # Queue audio payload for processing
-                    self.audio_queue.put(packet.payload)
-                    
-                except Exception as e:
-                    logger.error(f"RTP parse error: {e}")
+                if packet is None:
+                    logger.error("RTP parse error: malformed packet")
+                    continue
+                
+                # Queue audio payload for processing (copied: the buffer is reused)
+                self.audio_queue.put(bytes(packet.payload))
                 
             except Exception as e:
                 logger.error(f"RTP receive error: {e}")
     
     def process_audio(self):
-        """Process audio with Azure Speech"""
+        """Push received audio into the recognizer's stream"""
         logger.info("Audio processor started")
         
-        # This is a simplified version
-        # In production, you'd use Azure's streaming recognition
-        
-        audio_buffer = bytearray()
-        
-        while self.running:
+        while True:
+            # Blocks until audio arrives; None means shut down
+            payload = self.audio_queue.get()
+            if payload is None:
+                break
+            
             try:
-                # Get audio from queue
-                if not self.audio_queue.empty():
-                    payload = self.audio_queue.get(timeout=0.1)
-                    audio_buffer.extend(payload)
-                    
-                    # Process when we have enough audio (e.g., 1 second)
-                    # PCMU is 8000 samples/sec, 1 byte per sample
-                    if len(audio_buffer) >= 8000:
-                        # TODO: Send to Azure Speech-to-Text
-                        # TODO: Translate text
-                        # TODO: Convert to speech with TTS
-                        # TODO: Queue translated audio
-                        
-                        # For now, just echo back (placeholder)
-                        self.translation_queue.put(bytes(audio_buffer))
-                        audio_buffer.clear()
-                
-            except queue.Empty:
-                continue
+                self.push_stream.write(g711.decode(payload).astype('<i2').tobytes())
             except Exception as e:
                 logger.error(f"Audio processing error: {e}")
-    
-    def send_translated_rtp(self):
-        """Send translated audio back to Asterisk as RTP"""
-        logger.info("RTP sender started")
         
-        while self.running:
-            try:
-                if not self.translation_queue.empty() and self.asterisk_addr:
-                    audio_data = self.translation_queue.get(timeout=0.1)
-                    
-                    # Split into RTP packets (160 bytes = 20ms of PCMU audio)
-                    chunk_size = 160
-                    for i in range(0, len(audio_data), chunk_size):
-                        chunk = audio_data[i:i+chunk_size]
-                        
-                        # Create RTP packet
-                        rtp_packet = RTPPacket.create(
-                            chunk,
-                            self.sequence,
-                            self.timestamp,
-                            self.ssrc,
-                            payload_type=0  # PCMU
-                        )
-                        
-                        # Send to Asterisk
-                        self.send_socket.sendto(
-                            rtp_packet,
-                            (self.asterisk_addr[0], RTP_SEND_PORT)
-                        )
-                        
-                        # Update RTP state
-                        self.sequence = (self.sequence + 1) % 65536
-                        self.timestamp += 160
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.error(f"RTP send error: {e}")
+        self.push_stream.close()
+        logger.info("Audio processor stopped")
 
 
 def main():
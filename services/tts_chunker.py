@@ -0,0 +1,32 @@
+"""
+Clause splitting for incremental text-to-speech
+- Splits translated text at sentence and clause punctuation
+- Merges very short pieces so each synthesized chunk sounds natural
+- Lets the service queue each clause for playout while the next one is
+  still being synthesized
+"""
+
+import re
+
+# Split after clause punctuation followed by whitespace (keeps the punctuation)
+_CLAUSE_BREAK = re.compile(r'(?<=[.,;:!?。，；：！？،])\s+')
+
+
+def split_clauses(text, min_chars=20):
+    """Split text into clauses of at least min_chars (except possibly the last)"""
+    pieces = [piece.strip() for piece in _CLAUSE_BREAK.split(text.strip()) if piece.strip()]
+
+    clauses = []
+    current = ''
+    for piece in pieces:
+        current = f"{current} {piece}" if current else piece
+        if len(current) >= min_chars:
+            clauses.append(current)
+            current = ''
+
+    if current:
+        if clauses and len(current) < min_chars // 2:
+            clauses[-1] = f"{clauses[-1]} {current}"
+        else:
+            clauses.append(current)
+    return clauses
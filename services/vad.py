@@ -0,0 +1,217 @@
+"""
+Streaming voice activity detection and utterance segmentation
+- Energy VAD with an adaptive noise floor (NumPy only, default)
+- Optional WebRTC VAD model on CPU (pip install webrtcvad)
+- Emits utterance segments on end-of-speech, capped at a maximum length
+- Silent audio never reaches ASR; the skipped share is reported per call
+"""
+
+import logging
+from collections import deque
+
+import numpy as np
+
+try:
+    import webrtcvad  # Optional CPU VAD model
+except ImportError:
+    webrtcvad = None
+
+logger = logging.getLogger(__name__)
+
+VAD_MODE_ENERGY = 'energy'
+VAD_MODE_WEBRTC = 'webrtc'
+
+
+class EnergyVAD:
+    """Frame energy VAD with an adaptive noise floor
+
+    The floor is tracked by minimum statistics: the lowest smoothed frame
+    level over the last window_frames (kept as per-block minima). Pauses
+    between words pull it down to the background level, and steady noise
+    raises it within one window even when every frame so far looked like
+    speech. Until a full window has been seen it never exceeds threshold_db.
+    """
+
+    def __init__(self, threshold_db=-50.0, margin_db=10.0, window_frames=150, block_frames=15, smoothing=0.2):
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.noise_floor_db = threshold_db
+        self.block_frames = block_frames
+        self.smoothing = smoothing
+
+        self._smoothed_db = None
+        self._block_min = float('inf')
+        self._block_count = 0
+        self._minima = deque(maxlen=max(1, window_frames // block_frames))
+
+    def is_speech(self, frame):
+        """True when a float32 frame is louder than the noise floor + margin"""
+        energy = float(np.dot(frame, frame)) / max(len(frame), 1)
+        level_db = 10.0 * np.log10(energy + 1e-12)
+        speech = level_db > max(self.noise_floor_db + self.margin_db, self.threshold_db)
+        self._track_floor(level_db)
+        return speech
+
+    def _track_floor(self, level_db):
+        """Update the noise floor with one frame level"""
+        if self._smoothed_db is None:
+            self._smoothed_db = level_db
+        else:
+            self._smoothed_db += self.smoothing * (level_db - self._smoothed_db)
+
+        self._block_min = min(self._block_min, self._smoothed_db)
+        self._block_count += 1
+        if self._block_count >= self.block_frames:
+            self._minima.append(self._block_min)
+            self._block_min = float('inf')
+            self._block_count = 0
+
+        floor = min(min(self._minima, default=self._block_min), self._block_min)
+        if len(self._minima) < self._minima.maxlen:
+            floor = min(floor, self.threshold_db)  # Not a full window yet: the call may open with speech
+        self.noise_floor_db = floor
+
+
+class WebRTCVAD:
+    """WebRTC VAD model (10/20/30 ms frames at 8/16/32/48 kHz)"""
+
+    def __init__(self, sample_rate=8000, aggressiveness=2):
+        if webrtcvad is None:
+            raise RuntimeError("webrtcvad not installed (pip install webrtcvad)")
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame):
+        """True when the model classifies a float32 frame as speech"""
+        pcm = np.clip(frame * 32768.0, -32768, 32767).astype(np.int16)
+        return self.vad.is_speech(pcm.tobytes(), self.sample_rate)
+
+
+def create_vad(mode=VAD_MODE_ENERGY, sample_rate=8000):
+    """Build a VAD for the given mode, falling back to energy VAD"""
+    if mode == VAD_MODE_WEBRTC:
+        if webrtcvad is not None:
+            return WebRTCVAD(sample_rate)
+        logger.warning("webrtcvad not installed, falling back to energy VAD")
+    elif mode != VAD_MODE_ENERGY:
+        raise ValueError(f"Unknown VAD mode: {mode}")
+    return EnergyVAD()
+
+
+class VADSegmenter:
+    """Turns a stream of PCM samples into utterance segments
+
+    feed() accepts float32 samples of any length and returns the list of
+    utterances that ended within them. An utterance ends after hangover_ms of
+    silence or when it reaches max_segment_ms. Utterances with less than
+    min_speech_ms of speech are discarded as clicks/noise.
+    """
+
+    def __init__(self, vad, sample_rate=8000, frame_ms=20, hangover_ms=400,
+                 max_segment_ms=8000, min_speech_ms=200, preroll_ms=200):
+        self.vad = vad
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_frames = max(1, max_segment_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+
+        self._pending = np.empty(0, dtype=np.float32)
+        self._preroll = deque(maxlen=max(0, preroll_ms // frame_ms))
+        self._segment = []
+        self._in_speech = False
+        self._silence_run = 0
+        self._speech_frames = 0
+
+        self.total_frames = 0
+        self.sent_frames = 0
+        self.segments = 0
+
+    def feed(self, samples):
+        """Add samples; returns completed utterance segments"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+
+        segments = []
+        usable = len(samples) - len(samples) % self.frame_size
+        for start in range(0, usable, self.frame_size):
+            segment = self._process_frame(samples[start:start + self.frame_size])
+            if segment is not None:
+                segments.append(segment)
+
+        self._pending = samples[usable:].copy()
+        return segments
+
+    def flush(self):
+        """Emit the utterance in progress, if any (e.g. at end of call)"""
+        segment = self._emit() if self._in_speech else None
+        self._in_speech = False
+        return [segment] if segment is not None else []
+
+    def _process_frame(self, frame):
+        """Advance the state machine by one frame"""
+        self.total_frames += 1
+        speech = self.vad.is_speech(frame)
+
+        if not self._in_speech:
+            if not speech:
+                self._preroll.append(frame)
+                return None
+            self._in_speech = True
+            self._segment = list(self._preroll)
+            self._preroll.clear()
+            self._silence_run = 0
+            self._speech_frames = 0
+
+        self._segment.append(frame)
+        if speech:
+            self._silence_run = 0
+            self._speech_frames += 1
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.hangover_frames:
+            self._in_speech = False
+            return self._emit()
+        if len(self._segment) >= self.max_frames:
+            # Cap reached mid-speech: cut here and keep listening
+            return self._emit()
+        return None
+
+    def _emit(self):
+        """Finish the current segment; None if it is too short to be speech"""
+        frames = self._segment
+        speech_frames = self._speech_frames
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_run = 0
+
+        if speech_frames < self.min_speech_frames:
+            return None
+
+        self.sent_frames += len(frames)
+        self.segments += 1
+        return np.concatenate(frames)
+
+    @property
+    def in_speech(self):
+        """True while an utterance is in progress"""
+        return self._in_speech
+
+    @property
+    def partial_samples(self):
+        """Length of the utterance in progress, in samples"""
+        return len(self._segment) * self.frame_size if self._in_speech else 0
+
+    def partial(self):
+        """Audio of the utterance in progress so far (None between utterances)"""
+        if not self._in_speech or not self._segment:
+            return None
+        return np.concatenate(self._segment)
+
+    @property
+    def skipped_percent(self):
+        """Share of received audio that was never sent to ASR"""
+        if not self.total_frames:
+            return 0.0
+        return 100.0 * (1.0 - self.sent_frames / self.total_frames)
@@ -0,0 +1,309 @@
+"""
+Multi-process inference for the translation service (IO process side)
+- N worker processes, each pinned to a GPU and/or CPU set, run Whisper,
+  MarianMT and TTS (see inference_worker.py); the IO process keeps RTP,
+  jitter buffering, VAD and codec work free of model GIL contention
+- PCM moves through per-worker shared-memory rings, requests and results
+  carry only metadata
+- Requests go to the least-loaded ready worker
+- A supervisor restarts crashed workers; calls stay up, the requests that
+  were in flight on the crashed worker are retried once elsewhere
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from backends import ROUTED_STAGES, SpeechBackend
+from inference_worker import worker_main
+from shm_ring import AudioRing
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashed(Exception):
+    """The worker serving a request exited before answering"""
+
+
+class _Worker:
+    """IO-side handle for one worker process"""
+
+    __slots__ = ('index', 'process', 'jobs', 'results', 'requests', 'responses',
+                 'lock', 'pending', 'alive', 'ready', 'pid', 'info', 'served', 'collector')
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.lock = threading.Lock()
+        self.pending = {}  # request id -> Future
+        self.alive = True
+        self.ready = False
+        self.pid = None
+        self.info = {}
+        self.served = 0
+        self.collector = None
+
+
+def split_cpus(workers, cpus=None):
+    """Divide the CPUs this process may use into one set per worker"""
+    if cpus is None:
+        if not hasattr(os, 'sched_getaffinity'):
+            return [None] * workers
+        cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < workers:
+        return [None] * workers
+    per_worker = len(cpus) // workers
+    return [set(cpus[i * per_worker:(i + 1) * per_worker]) for i in range(workers)]
+
+
+class InferenceWorkerPool(SpeechBackend):
+    """Model inference in separate processes
+
+    config is passed to inference_worker.InferenceBackend. gpus lists the
+    CUDA device indices to spread workers over (round robin); an empty list
+    runs every worker on CPU.
+    """
+
+    name = 'models'
+
+    def __init__(self, workers, config, gpus=(), cpu_sets=None, ring_bytes=16 << 20,
+                 request_timeout=120.0, cost=1.0):
+        super().__init__({stage: cost for stage in ROUTED_STAGES})
+        self.workers = max(1, workers)
+        self.config = config
+        self.gpus = list(gpus)
+        self.device = "cuda" if self.gpus else "cpu"
+        self.cpu_sets = cpu_sets if cpu_sets is not None else split_cpus(self.workers)
+        self.ring_bytes = ring_bytes
+        self.request_timeout = request_timeout
+
+        self._ctx = multiprocessing.get_context('spawn')  # CUDA cannot be used after fork
+        self._workers = []
+        self._ids = itertools.count()
+        self._supervisor = None
+        self.running = False
+
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.restarts = 0
+
+    @property
+    def tts_voice(self):
+        """The workers' Coqui TTS model"""
+        return f"{self.name}:{self.config['tts_model']}"
+
+    def start(self, timeout=900.0):
+        """Start all workers and wait until they have loaded their models"""
+        self.running = True
+        self._workers = [self._spawn(index) for index in range(self.workers)]
+
+        deadline = time.monotonic() + timeout
+        while not all(worker.ready for worker in self._workers):
+            if time.monotonic() > deadline:
+                raise RuntimeError("Inference workers did not become ready in time")
+            if any(not worker.process.is_alive() for worker in self._workers):
+                raise RuntimeError("Inference worker exited during startup")
+            time.sleep(0.5)
+
+        self._supervisor = threading.Thread(target=self._supervise, name="worker-supervisor", daemon=True)
+        self._supervisor.start()
+        logger.info(f"{self.workers} inference workers ready")
+
+    @property
+    def tts_sample_rate(self):
+        """Output sample rate of the workers' TTS model"""
+        return self._workers[0].info['tts_sample_rate']
+
+    def _spawn(self, index):
+        """Start a worker process with fresh rings and a result collector"""
+        worker = _Worker(index)
+        worker.requests = AudioRing(capacity=self.ring_bytes)
+        worker.responses = AudioRing(capacity=self.ring_bytes)
+        worker.jobs = self._ctx.Queue()
+        worker.results = self._ctx.Queue()
+
+        gpu = self.gpus[index % len(self.gpus)] if self.gpus else None
+        worker.process = self._ctx.Process(
+            target=worker_main,
+            args=(index, self.config, worker.jobs, worker.results,
+                  worker.requests.name, worker.responses.name, gpu, self.cpu_sets[index]),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.pid = worker.process.pid
+
+        worker.collector = threading.Thread(
+            target=self._collect, args=(worker,), name=f"worker-{index}-results", daemon=True
+        )
+        worker.collector.start()
+        return worker
+
+    def _collect(self, worker):
+        """Route results from one worker to the waiting callers; frees its rings on exit"""
+        try:
+            self._collect_results(worker)
+        finally:
+            worker.requests.close()
+            worker.responses.close()
+
+    def _collect_results(self, worker):
+        """Collector loop for one worker"""
+        while worker.alive:
+            try:
+                request_id, ok, value, position, size = worker.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if request_id is None:
+                worker.info = value
+                worker.ready = True
+                logger.info(f"Inference worker {worker.index} ready (pid {value['pid']})")
+                continue
+
+            if position is not None:
+                value = np.frombuffer(worker.responses.read(position, size), dtype=np.float32)
+                worker.responses.release(position, size)
+
+            with worker.lock:
+                future = worker.pending.pop(request_id, None)
+                worker.served += 1
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _supervise(self):
+        """Restart workers whose process has exited"""
+        while self.running:
+            time.sleep(1.0)
+            for index, worker in enumerate(self._workers):
+                if self.running and not worker.process.is_alive():
+                    self._restart(index)
+
+    def _restart(self, index):
+        """Replace a crashed worker; its in-flight requests fail with WorkerCrashed"""
+        old = self._workers[index]
+        logger.error(f"Inference worker {index} (pid {old.pid}) exited with code "
+                     f"{old.process.exitcode}, restarting")
+        # Under the lock: a concurrent _submit_to either lands in pending
+        # before the swap or sees the worker dead and raises WorkerCrashed
+        with old.lock:
+            old.alive = False
+            pending, old.pending = old.pending, {}
+        for future in pending.values():
+            future.set_exception(WorkerCrashed(f"Inference worker {index} crashed"))
+
+        self._workers[index] = self._spawn(index)
+        self.restarts += 1
+
+    def _pick(self):
+        """Least-loaded ready worker"""
+        ready = [worker for worker in self._workers if worker.ready and worker.alive]
+        if not ready:
+            raise RuntimeError("No inference workers available")
+        return min(ready, key=lambda worker: len(worker.pending))
+
+    def _submit(self, op, args, audio=None):
+        """Send one request to the least-loaded worker; returns its Future"""
+        return self._submit_to(self._pick(), op, args, audio)
+
+    def _submit_to(self, worker, op, args, audio=None):
+        """Send one request to a given worker; returns its Future
+
+        Raises WorkerCrashed if the worker died since it was picked (its
+        rings may already be closed), so call() retries on another one.
+        """
+        request_id = next(self._ids)
+        future = Future()
+        with worker.lock:
+            if not worker.alive:
+                raise WorkerCrashed(f"Inference worker {worker.index} crashed")
+            position = size = None
+            if audio is not None:
+                audio = np.ascontiguousarray(audio, dtype=np.float32)
+                position, size = worker.requests.write(audio), audio.nbytes
+            worker.pending[request_id] = future
+            worker.jobs.put((request_id, op, args, position, size))
+        return future
+
+    def call(self, op, args, audio=None):
+        """Run an operation on a worker and wait for the result"""
+        self.requests += 1
+        try:
+            try:
+                return self._submit(op, args, audio).result(self.request_timeout)
+            except WorkerCrashed as e:
+                logger.warning(f"{e}, retrying {op} on another worker")
+                self.retries += 1
+                return self._submit(op, args, audio).result(self.request_timeout)
+        except Exception:
+            self.failures += 1
+            raise
+
+    def transcribe(self, audio, language, degraded=False):
+        """16 kHz float32 audio -> text"""
+        return self.call('transcribe', (language, degraded), audio)
+
+    def translate(self, text, source_lang, target_lang):
+        """Text -> translated text, or None while the model is loading"""
+        return self.call('translate', (text, source_lang, target_lang))
+
+    def synthesize(self, text, language):
+        """Text -> float32 audio at tts_sample_rate"""
+        return self.call('synthesize', (text, language))
+
+    def detect_language(self, audio, candidates=None):
+        """16 kHz float32 audio -> (language, probability)"""
+        return tuple(self.call('detect_language', (candidates,), audio))
+
+    def prepare(self, source_lang, target_lang):
+        """Prewarm a translation model on every worker (each has its own model pool)"""
+        for worker in self._workers:
+            if worker.ready and worker.alive:
+                try:
+                    self._submit_to(worker, 'prepare', (source_lang, target_lang))
+                except WorkerCrashed:
+                    pass  # Its replacement loads models on demand
+
+    def stop(self):
+        """Stop every worker process and free the rings"""
+        self.running = False
+        for worker in self._workers:
+            try:
+                worker.jobs.put(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            with worker.lock:
+                worker.alive = False
+            worker.collector.join(timeout=2)
+        super().stop()
+
+    def get_stats(self):
+        """Worker pool statistics"""
+        return {
+            'workers': self.workers,
+            'ready': sum(1 for worker in self._workers if worker.ready and worker.alive),
+            'in_flight': sum(len(worker.pending) for worker in self._workers),
+            'requests': self.requests,
+            'failures': self.failures,
+            'retries': self.retries,
+            'restarts': self.restarts,
+            'served': [worker.served for worker in self._workers],
+        }